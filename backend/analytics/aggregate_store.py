@@ -0,0 +1,157 @@
+import os, sqlite3, threading
+from typing import Dict, Optional
+import numpy as np, pandas as pd
+from analytics.ingest import RunningKPIs, as_flag, infer_date_column
+from analytics.sketch import KLLSketch
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.getenv("DWPNXT_AGG_DB", os.path.join(BACKEND_DIR, "data", "aggregates.sqlite"))
+TICKET_COLUMNS = ["number", "ticket_number", "ticket", "ticket_id", "incident_number", "request_number", "sys_id", "id"]
+UNKNOWN_MONTH = "Unknown"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS seen (ticket TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS agg (
+    driver TEXT NOT NULL,
+    month TEXT NOT NULL,
+    tickets INTEGER NOT NULL,
+    aht_n INTEGER NOT NULL,
+    aht_sum REAL NOT NULL,
+    sla_n INTEGER NOT NULL,
+    sla_sum REAL NOT NULL,
+    breaches INTEGER NOT NULL,
+    reopened INTEGER NOT NULL,
+    aht_sketch TEXT NOT NULL,
+    PRIMARY KEY (driver, month)
+);
+"""
+
+def ticket_column(columns) -> Optional[str]:
+    for c in TICKET_COLUMNS:
+        if c in columns:
+            return c
+    return None
+
+def ticket_keys(raw: pd.Series) -> pd.Series:
+    """Ticket numbers as stripped strings, the dedup key.
+
+    A numeric number column with gaps reads as float64; its whole values are
+    keyed without the ``.0`` so the same ticket matches across uploads with
+    and without gaps.
+    """
+    keys = raw.astype(str).str.strip()
+    if pd.api.types.is_float_dtype(raw):
+        whole = (raw % 1 == 0).to_numpy()
+        keys[whole] = raw[whole].astype("int64").astype(str)
+    return keys
+
+class AggregateStore:
+    """Persistent per-(driver, month) KPI aggregates, folded in incrementally.
+
+    Every row holds counts, sums, breach/reopen counts and a mergeable AHT
+    sketch, so folding in a new batch of tickets costs O(batch) and the
+    KPI table for the whole history is a merge over the stored rows.
+    Tickets are deduplicated by their number across uploads.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _new_tickets(self, cur, tickets: pd.Series) -> np.ndarray:
+        cur.execute("CREATE TEMP TABLE IF NOT EXISTS batch (ticket TEXT PRIMARY KEY)")
+        cur.execute("DELETE FROM batch")
+        cur.executemany("INSERT OR IGNORE INTO batch VALUES (?)", ((t,) for t in tickets.unique()))
+        new = {r[0] for r in cur.execute(
+            "SELECT b.ticket FROM batch b LEFT JOIN seen s ON s.ticket = b.ticket WHERE s.ticket IS NULL")}
+        cur.execute("INSERT INTO seen SELECT b.ticket FROM batch b WHERE b.ticket NOT IN (SELECT ticket FROM seen)")
+        return tickets.isin(new).to_numpy() & ~tickets.duplicated().to_numpy()
+
+    def fold(self, df: pd.DataFrame, driver_col: str = "driver") -> Dict[str, int]:
+        """Fold a labeled chunk into the store; rows already seen are skipped.
+
+        Rows without a ticket number cannot be deduplicated; they are folded
+        in as they come and counted as ``missing_number``.
+        """
+        tcol = ticket_column(df.columns)
+        if tcol is None:
+            raise ValueError(f"Ticket number column required (one of: {', '.join(TICKET_COLUMNS)})")
+        raw = df[tcol]
+        tickets = ticket_keys(raw)
+        missing = (raw.isna() | tickets.eq("")).to_numpy()
+        with self._lock, self._conn:
+            cur = self._conn.cursor()
+            keep = missing.copy()
+            keep[~missing] = self._new_tickets(cur, tickets[~missing])
+            new = df.loc[keep]
+            if len(new):
+                self._upsert(cur, new, driver_col)
+        fresh = int(keep.sum() - missing.sum())
+        return {"rows": int(len(df)), "new": fresh, "duplicates": int(len(df) - keep.sum()),
+                "missing_number": int(missing.sum())}
+
+    def _upsert(self, cur, df: pd.DataFrame, driver_col: str):
+        date_col = infer_date_column(df.columns)
+        month = (pd.to_datetime(df[date_col], errors="coerce").dt.to_period("M").astype(str)
+                 .where(lambda m: m != "NaT", UNKNOWN_MONTH) if date_col else pd.Series(UNKNOWN_MONTH, index=df.index))
+        aht = pd.to_numeric(df["aht_min"], errors="coerce") if "aht_min" in df.columns else pd.Series(np.nan, index=df.index)
+        sla = as_flag(df["sla_breached_bool"]) if "sla_breached_bool" in df.columns else pd.Series(np.nan, index=df.index)
+        reopen = pd.to_numeric(df["reopen_count_num"], errors="coerce") if "reopen_count_num" in df.columns else pd.Series(0, index=df.index)
+        part = pd.DataFrame({"driver": df[driver_col].astype(str).to_numpy(), "month": month.to_numpy(),
+                             "aht": aht.to_numpy(dtype=float), "sla": sla.to_numpy(dtype=float),
+                             "breach": (sla.fillna(0) > 0).to_numpy(), "re": reopen.fillna(0).gt(0).to_numpy()})
+        for (d, m), g in part.groupby(["driver", "month"], sort=False):
+            row = cur.execute("SELECT tickets, aht_n, aht_sum, sla_n, sla_sum, breaches, reopened, aht_sketch "
+                              "FROM agg WHERE driver = ? AND month = ?", (d, m)).fetchone()
+            sk = KLLSketch.from_json(row[7]) if row else KLLSketch()
+            sk.update(g["aht"].to_numpy())
+            vals = [len(g), int(g["aht"].notna().sum()), float(g["aht"].sum()), int(g["sla"].notna().sum()),
+                    float(g["sla"].sum()), int(g["breach"].sum()), int(g["re"].sum())]
+            if row:
+                vals = [a + b for a, b in zip(vals, row[:7])]
+            cur.execute("INSERT OR REPLACE INTO agg VALUES (?,?,?,?,?,?,?,?,?,?)", (d, m, *vals, sk.to_json()))
+
+    def snapshot(self) -> "StoredKPIs":
+        with self._lock:
+            rows = self._conn.execute("SELECT driver, month, tickets, aht_n, sla_n, sla_sum, breaches, reopened, "
+                                      "aht_sketch FROM agg").fetchall()
+        return StoredKPIs(rows)
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM agg")
+            self._conn.execute("DELETE FROM seen")
+
+class StoredKPIs(RunningKPIs):
+    """The store's rows merged per driver, served through the ``RunningKPIs`` interface."""
+
+    def __init__(self, rows):
+        super().__init__(date_col="")
+        for d, m, n, aht_n, sla_n, sla_sum, breaches, reopened, sk in rows:
+            self.rows += n
+            self.sla_breaches += breaches
+            self.tickets[d] += n
+            self.sla_n[d] += sla_n
+            self.sla_sum[d] += sla_sum
+            self.reopened[d] += reopened
+            s = KLLSketch.from_json(sk)
+            self.aht[d] = self.aht[d].merge(s) if d in self.aht else s
+            if m != UNKNOWN_MONTH:
+                self.months[m] += n
+
+_store: Optional[AggregateStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> AggregateStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AggregateStore()
+        return _store
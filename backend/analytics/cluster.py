@@ -1,39 +1,54 @@
-import numpy as np, pandas as pd, re
-from typing import Tuple, Dict
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
-from sklearn.decomposition import TruncatedSVD
+import os
+from functools import lru_cache
+import numpy as np, pandas as pd
+from typing import Tuple, Dict, Iterator, List, Optional
 from collections import Counter
-from sklearn.feature_extraction import text
+from analytics.textprep import CLEAN_COL, clean_series
+from analytics.prefs import DEFAULT_PREFS
+from analytics.sampling import SAMPLE_K, representatives
+from analytics import dedup as _dedup
 
-CUSTOM_STOPWORDS = set(text.ENGLISH_STOP_WORDS) | {
+# "auto" mode switches to the out-of-core pipeline above this many texts
+STREAMING_MIN_ROWS = int(os.getenv("DWPNXT_STREAMING_ROWS", "200000"))
+HASH_FEATURES = 2 ** 20
+PROJECTION_DIM = 256
+
+# scikit-learn is imported on first use (it costs ~1 s of startup otherwise);
+# CUSTOM_STOPWORDS is resolved lazily through the module __getattr__ below
+_EXTRA_STOPWORDS = {
     "please","issue","help","error","need","user","problem","thanks","thank",
     "unable","required","received","message","login","logon","link","click",
     "etc","still","using","tried","request","report","ticket","service","desk",
     "x000d","http","https","attachment","attachments","screenshot","screenshots"
 }
 
-def _clean_text(s):
-    s = str(s).lower()
-    s = re.sub(r"_x\d{4}_", " ", s)   # remove excel artifacts like _x000D_
-    s = re.sub(r"[^a-z0-9\s]", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
+@lru_cache(maxsize=1)
+def _stopwords() -> frozenset:
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+    return frozenset(ENGLISH_STOP_WORDS | _EXTRA_STOPWORDS)
+
+def __getattr__(name):
+    if name == "CUSTOM_STOPWORDS":
+        return set(_stopwords())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def _build_vectorizer():
+    from sklearn.feature_extraction.text import TfidfVectorizer
     return TfidfVectorizer(
         lowercase=True,
         strip_accents="unicode",
         ngram_range=(1,2),
         analyzer="word",
-        stop_words=list(CUSTOM_STOPWORDS),
+        stop_words=list(_stopwords()),
         min_df=2,
         max_df=0.85,
         max_features=30000
     )
 
-def featurize(texts: pd.Series):
-    texts = texts.map(_clean_text)
+def featurize(texts: pd.Series, cleaned: bool = False):
+    if not cleaned:
+        texts = clean_series(texts)
+    from sklearn.decomposition import TruncatedSVD
     vec = _build_vectorizer()
     X = vec.fit_transform(texts.tolist())
     svd = TruncatedSVD(n_components=min(100, max(2, int(X.shape[1]*0.2))), random_state=42)
@@ -50,28 +65,229 @@ def try_hdbscan(Xs, min_cluster_size=25, min_samples=None):
     except Exception:
         return None, "none", None
 
+def _batches(n: int, size: int) -> Iterator[slice]:
+    """Fixed-size slices over ``range(n)``; a short tail joins the previous batch."""
+    size = max(1, int(size))
+    starts = list(range(0, n, size))
+    if len(starts) > 1 and n - starts[-1] < size:
+        starts.pop()
+    for i, a in enumerate(starts):
+        yield slice(a, starts[i + 1] if i + 1 < len(starts) else n)
+
+class StreamingTfidf:
+    """TF-IDF over a stateless ``HashingVectorizer``, fitted batch by batch.
+
+    Only the document frequencies (one counter per hash bucket) are kept,
+    so the vocabulary never has to fit in memory; ``min_df``/``max_df``
+    prune buckets the way ``_build_vectorizer`` prunes terms.
+    """
+
+    def __init__(self, n_features=HASH_FEATURES, min_df=2, max_df=0.85):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.hasher = HashingVectorizer(
+            lowercase=True,
+            strip_accents="unicode",
+            ngram_range=(1,2),
+            analyzer="word",
+            stop_words=list(_stopwords()),
+            n_features=n_features,
+            alternate_sign=False,
+            norm=None,
+        )
+        self.min_df, self.max_df = min_df, max_df
+        self.df_ = np.zeros(n_features, dtype=np.int64)
+        self.n_docs_ = 0
+        self.idf_ = None
+
+    def partial_fit(self, texts) -> "StreamingTfidf":
+        X = self.hasher.transform(texts)
+        self.df_ += np.bincount(X.indices, minlength=X.shape[1])
+        self.n_docs_ += X.shape[0]
+        self.idf_ = None
+        return self
+
+    def _idf(self) -> np.ndarray:
+        if self.idf_ is None:
+            n = self.n_docs_
+            idf = np.log((1 + n) / (1 + self.df_)) + 1.0
+            idf[(self.df_ < self.min_df) | (self.df_ > self.max_df * n)] = 0.0
+            self.idf_ = idf
+        return self.idf_
+
+    def transform(self, texts):
+        from sklearn.preprocessing import normalize
+        X = self.hasher.transform(texts)
+        X.data *= self._idf()[X.indices]
+        X.eliminate_zeros()
+        return normalize(X, copy=False)
+
+def run_streaming_clustering(texts: pd.Series,
+                             min_cluster_size=25,
+                             kmeans_k=12,
+                             batch_size=10000,
+                             cleaned: bool = False,
+                             n_components=100,
+                             sample_weight=None) -> Tuple[np.ndarray,str,Dict]:
+    """Out-of-core variant of :func:`run_clustering` for very large "Other" sets.
+
+    Hashing TF-IDF -> sparse random projection -> ``IncrementalPCA`` ->
+    ``MiniBatchKMeans.partial_fit``, each pass walking *texts* in batches
+    of *batch_size*, so peak memory is bounded by the batch, the hash
+    buckets and the reduced ``Xs`` (float32) rather than by a full
+    vocabulary matrix and an all-pairs clusterer.
+    """
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+    from sklearn.decomposition import IncrementalPCA
+    from sklearn.pipeline import make_pipeline
+    from sklearn.random_projection import SparseRandomProjection
+    if not cleaned:
+        texts = clean_series(texts)
+    docs = texts.tolist()
+    n = len(docs)
+    if n == 0:
+        return (np.empty(0, dtype=int), "minibatch-kmeans",
+                {"vec":None, "svd":None, "model":None, "X":None, "Xs":np.empty((0, n_components), dtype=np.float32)})
+    # the first batch seeds all k centroids, so it needs at least k rows
+    batches = list(_batches(n, max(int(batch_size), int(kmeans_k))))
+    vec = StreamingTfidf()
+    for b in batches:
+        vec.partial_fit(docs[b])
+    n_components = max(1, min(n_components, PROJECTION_DIM, min(b.stop - b.start for b in batches)))
+    proj = SparseRandomProjection(n_components=PROJECTION_DIM, dense_output=True, random_state=42)
+    proj.fit(vec.transform(docs[batches[0]][:1]))
+    ipca = IncrementalPCA(n_components=n_components)
+    for b in batches:
+        ipca.partial_fit(proj.transform(vec.transform(docs[b])))
+    svd = make_pipeline(proj, ipca)
+    w = None if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    k = min(kmeans_k, max(2, int((n if w is None else w.sum())/min_cluster_size)), n)
+    Xs = np.empty((n, n_components), dtype=np.float32)
+    km = None
+    for b in batches:
+        Xs[b] = svd.transform(vec.transform(docs[b]))
+        if km is None:
+            # seed from a well-restarted KMeans on the first batch; partial_fit's
+            # own single k-means++ init often splits one topic and merges two
+            init = KMeans(n_clusters=k, random_state=42, n_init=10).fit(
+                Xs[b], sample_weight=None if w is None else w[b]).cluster_centers_
+            km = MiniBatchKMeans(n_clusters=k, init=init, n_init=1, random_state=42, batch_size=min(batch_size, n))
+        km.partial_fit(Xs[b], sample_weight=None if w is None else w[b])
+    labels = np.concatenate([km.predict(Xs[b]) for b in batches])
+    return labels, "minibatch-kmeans", {"vec":vec, "svd":svd, "model":km, "X":None, "Xs":Xs}
+
+def _hdbscan_groups(Xs, sample_weight, min_cluster_size=25):
+    """HDBSCAN over collapsed duplicate groups (*sample_weight* tickets per row of *Xs*).
+
+    HDBSCAN takes no weights, and repeating a row puts identical points at
+    zero distance, which wrecks its density estimate. A group of at least
+    *min_cluster_size* tickets already is a cluster, so it gets an id of
+    its own after HDBSCAN's; the smaller groups are clustered as usual.
+    """
+    w = np.asarray(sample_weight)
+    big = w >= min_cluster_size
+    if (~big).sum() <= min_cluster_size:
+        return None, "none", None
+    small, algo, model = try_hdbscan(Xs[~big], min_cluster_size=min_cluster_size)
+    if small is None:
+        return None, algo, model
+    labels = np.full(len(w), -1, dtype=int)
+    labels[~big] = small
+    labels[big] = max(int(np.max(small)), -1) + 1 + np.arange(int(big.sum()))
+    return labels, algo, model
+
 def run_clustering(texts: pd.Series,
                    min_cluster_size=25,
-                   kmeans_k=12) -> Tuple[np.ndarray,str,Dict]:
-    X, Xs, vec, svd = featurize(texts)
-    labels, algo, model = try_hdbscan(Xs, min_cluster_size=min_cluster_size)
+                   kmeans_k=12,
+                   cleaned: bool = False,
+                   mode: str = "batch",
+                   batch_size: int = 10000,
+                   sample_weight=None) -> Tuple[np.ndarray,str,Dict]:
+    """Cluster *texts*; *mode* is ``batch`` (TF-IDF/SVD + HDBSCAN or KMeans),
+    ``streaming`` (:func:`run_streaming_clustering`) or ``auto`` (streaming
+    from ``STREAMING_MIN_ROWS`` texts up).
+
+    *sample_weight*: how many tickets each text stands for (see
+    :func:`analytics.dedup.collapse`); KMeans weighs its centroids and the
+    cluster count by it; for HDBSCAN see :func:`_hdbscan_groups`.
+    """
+    if mode not in ("batch", "auto", "streaming"):
+        raise ValueError(f"Unknown clustering mode: {mode}")
+    if mode == "streaming" or (mode == "auto" and len(texts) >= STREAMING_MIN_ROWS):
+        return run_streaming_clustering(texts, min_cluster_size=min_cluster_size, kmeans_k=kmeans_k,
+                                        batch_size=batch_size, cleaned=cleaned, sample_weight=sample_weight)
+    X, Xs, vec, svd = featurize(texts, cleaned=cleaned)
+    if sample_weight is None:
+        labels, algo, model = try_hdbscan(Xs, min_cluster_size=min_cluster_size)
+    else:
+        labels, algo, model = _hdbscan_groups(Xs, sample_weight, min_cluster_size)
     if labels is None or (labels.astype(int) < 0).all():
-        km = KMeans(n_clusters=min(kmeans_k, max(2, int(len(texts)/min_cluster_size))), random_state=42, n_init="auto")
-        labels = km.fit_predict(Xs)
+        from sklearn.cluster import KMeans
+        n = len(texts) if sample_weight is None else float(np.sum(sample_weight))
+        km = KMeans(n_clusters=min(kmeans_k, max(2, int(n/min_cluster_size)), len(texts)), random_state=42, n_init="auto")
+        labels = km.fit_predict(Xs, sample_weight=sample_weight)
         algo, model = "kmeans", km
     return labels, algo, {"vec":vec, "svd":svd, "model":model, "X":X, "Xs":Xs}
 
 def iterative_other_reduction(df: pd.DataFrame,
                               target_other_pct=0.12,
                               max_rounds=3,
-                              min_cluster_size=25) -> pd.DataFrame:
+                              min_cluster_size=25,
+                              registry=None,
+                              tenant="default",
+                              taxonomy_version="0",
+                              mode=DEFAULT_PREFS["cluster_mode"],
+                              batch_size=DEFAULT_PREFS["cluster_batch_size"],
+                              examples: Optional[Dict[str, List]] = None,
+                              examples_k: int = SAMPLE_K,
+                              dedup=DEFAULT_PREFS["cluster_dedup"],
+                              notes: Optional[Dict] = None) -> pd.DataFrame:
+    """Cluster the "Other" tickets into ``cluster_<id>`` drivers.
+
+    With a :class:`~analytics.model_registry.ModelRegistry` the first round
+    assigns tickets with the stored model for (*tenant*, *taxonomy_version*)
+    (refitting only on drift or schedule), so its cluster ids are stable
+    across uploads; later rounds fit the residual as ``cluster_r<n>_<id>``.
+    *mode* / *batch_size* select the clustering pipeline (see :func:`run_clustering`).
+    *examples*, when given, is filled with ``{driver: row index labels}`` of
+    up to *examples_k* representative tickets per cluster, chosen from the
+    clustering embeddings (see :func:`analytics.sampling.representatives`).
+    With *dedup*, identical and near-duplicate texts (from
+    ``DEDUP_MIN_ROWS`` texts up) are collapsed first
+    (:func:`analytics.dedup.collapse`): only one representative per group is
+    clustered, weighted by the group size, and its label is broadcast to
+    the group. *notes*, when given, receives ``cluster_rows``,
+    ``cluster_representatives`` and ``duplicate_ratio`` over all rounds.
+    """
     df = df.copy()
-    for _ in range(max_rounds):
+    text_col, cleaned = (CLEAN_COL, True) if CLEAN_COL in df.columns else ("text", False)
+    for rnd in range(max_rounds):
         mask = df["driver"]=="Other"
         if not mask.any(): break
         if mask.mean() <= target_other_pct: break
-        labels, algo, ctx = run_clustering(df.loc[mask,"text"], min_cluster_size=min_cluster_size)
+        texts = df.loc[mask, text_col] if cleaned else clean_series(df.loc[mask, text_col])
+        groups = (_dedup.collapse(texts) if dedup and len(texts) >= _dedup.DEDUP_MIN_ROWS else None)
+        reps = texts if groups is None else texts.iloc[groups.reps]
+        weight = None if groups is None else groups.weights
+        if notes is not None:
+            notes["cluster_rows"] = notes.get("cluster_rows", 0) + len(texts)
+            notes["cluster_representatives"] = notes.get("cluster_representatives", 0) + len(reps)
+            notes["duplicate_ratio"] = round(1 - notes["cluster_representatives"] / notes["cluster_rows"], 4)
+        prefix = "cluster_"
+        if registry is not None and rnd == 0:
+            labels, ctx = registry.cluster(reps, tenant=tenant, taxonomy_version=taxonomy_version,
+                                           min_cluster_size=min_cluster_size, mode=mode, batch_size=batch_size,
+                                           sample_weight=weight)
+        else:
+            labels, algo, ctx = run_clustering(reps, min_cluster_size=min_cluster_size, cleaned=True,
+                                               mode=mode, batch_size=batch_size, sample_weight=weight)
+            if registry is not None:
+                prefix = f"cluster_r{rnd}_"
+        if examples is not None:
+            for c, pos in representatives(ctx["Xs"], labels, examples_k).items():
+                examples[f"{prefix}{c}"] = reps.index[pos].tolist()
+        if groups is not None:
+            labels = np.asarray(labels)[groups.inverse]
         # label names → lightweight top-term strings (pre-LLM/Python labeling happens elsewhere)
         sub = pd.Series(labels, index=df.index[mask])
-        df.loc[mask, "driver"] = sub.map(lambda x: f"cluster_{x}" if x != -1 else "Other")
+        df.loc[mask, "driver"] = sub.map(lambda x: f"{prefix}{x}" if x != -1 else "Other")
     return df
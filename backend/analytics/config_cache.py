@@ -0,0 +1,95 @@
+import hashlib, os, threading
+from typing import Any, Callable, Dict, Tuple
+from analytics.rule_engine import RuleMatcher
+from analytics.tcd import load_rules
+from analytics.taxonomy import TaxonomyIndex, load_taxonomy
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RULES_PATH = os.path.join(BACKEND_DIR, "analytics", "rules.yaml")
+TAXONOMY_PATH = os.path.join(BACKEND_DIR, "config", "taxonomy.yaml")
+
+class FileCache:
+    """Process-wide cache of objects derived from config files.
+
+    An entry is rebuilt only when its file changes: the (mtime, size) stat
+    is checked on every access and, when it moved, the content hash decides
+    whether the loader has to run again (a touch or a checkout that
+    rewrites the same bytes keeps the compiled object).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    @staticmethod
+    def _stat(path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _digest(path):
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+
+    def get(self, kind: str, path: str, loader: Callable[[str], Any]):
+        key = (kind, os.path.abspath(path))
+        stat = self._stat(path)
+        e = self._entries.get(key)
+        if e is not None and e["stat"] == stat:
+            return e["value"]
+        with self._lock:
+            e = self._entries.get(key)
+            if e is not None and e["stat"] == stat:
+                return e["value"]
+            digest = self._digest(path)
+            if e is not None and e["sha256"] == digest:
+                e["stat"] = stat
+                return e["value"]
+            value = loader(path)
+            self._entries[key] = {"stat": stat, "sha256": digest, "value": value}
+            return value
+
+    def digest(self, kind: str, path: str) -> str:
+        """sha256 of the file behind a cached entry (loaded by :meth:`get` first)."""
+        return self._entries[(kind, os.path.abspath(path))]["sha256"]
+
+    def info(self) -> Dict[str, Dict[str, Any]]:
+        return {k: {"file": os.path.basename(p), "sha256": e["sha256"]} for (k, p), e in self._entries.items()}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+_cache = FileCache()
+
+def get_rules(path: str = RULES_PATH) -> RuleMatcher:
+    """Compiled driver rules for *path*, recompiled only when the file changes."""
+    return _cache.get("rules", path, lambda p: RuleMatcher(load_rules(p)))
+
+def get_rules_digest(path: str = RULES_PATH) -> str:
+    """sha256 of the rules file in effect (keys cached analyses, so a rules change relabels)."""
+    get_rules(path)
+    return _cache.digest("rules", path)
+
+def get_taxonomy(path: str = TAXONOMY_PATH):
+    """Parsed taxonomy entries for *path*, re-read only when the file changes."""
+    return _cache.get("taxonomy", path, load_taxonomy)
+
+def get_taxonomy_index(path: str = TAXONOMY_PATH) -> TaxonomyIndex:
+    """The taxonomy of *path* compiled for matching, rebuilt only when the file changes."""
+    return _cache.get("taxonomy_index", path, lambda p: TaxonomyIndex(load_taxonomy(p)))
+
+def get_taxonomy_version(path: str = TAXONOMY_PATH) -> str:
+    """The ``version`` field of taxonomy.yaml (keys persisted cluster models)."""
+    def _version(p):
+        import yaml
+        with open(p) as f:
+            return str((yaml.safe_load(f) or {}).get("version", "0"))
+    return _cache.get("taxonomy_version", path, _version)
+
+def reload(rules_path: str = RULES_PATH, taxonomy_path: str = TAXONOMY_PATH) -> Dict[str, Any]:
+    """Drop everything cached and eagerly reload the default config files."""
+    _cache.clear()
+    rules = get_rules(rules_path)
+    entries = get_taxonomy(taxonomy_path)
+    return {"rules": len(rules.names), "taxonomy": len(entries), "files": _cache.info()}
@@ -0,0 +1,114 @@
+import io, zlib
+from typing import Iterator, List, Optional
+import pandas as pd
+from analytics.xlsx_export import data_table
+
+CHUNK_ROWS = 50_000
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet", "ndjson": "application/x-ndjson"}
+COMPRESSIONS = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+
+def filename(fmt: str, compression: Optional[str] = None, stem: str = "dwpnxt_tickets") -> str:
+    # Parquet compresses its column chunks internally; the file keeps its extension
+    ext = "" if fmt == "parquet" else COMPRESSIONS[compression or "none"]
+    return f"{stem}.{fmt}{ext}"
+
+def media_type(fmt: str, compression: Optional[str] = None) -> str:
+    if fmt == "parquet" or (compression or "none") == "none":
+        return FORMATS[fmt]
+    return "application/gzip" if compression == "gzip" else "application/zstd"
+
+def _stringify_cols(df: pd.DataFrame) -> List[str]:
+    """Object columns Arrow cannot type as a whole (mixed values); they are written as text."""
+    import pyarrow as pa
+    out = []
+    for c in df.columns:
+        if df[c].dtype == object:
+            try:
+                pa.array(df[c], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                out.append(c)
+    return out
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands its bytes out on :meth:`drain` but keeps
+    ``tell()`` absolute, so the Parquet writer's offsets stay right."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._pos = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self._parts.append(bytes(b))
+        self._pos += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._pos
+
+    def drain(self) -> bytes:
+        out, self._parts = b"".join(self._parts), []
+        return out
+
+def _parquet_chunks(df: pd.DataFrame, compression: str, chunk_rows: int) -> Iterator[bytes]:
+    import pyarrow as pa, pyarrow.parquet as pq
+    text = _stringify_cols(df)
+    if text:
+        df = df.assign(**{c: df[c].astype("string") for c in text})
+    # one schema for the whole table: a chunk of all-null values must not change a column's type
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    sink = _Sink()
+    with pq.ParquetWriter(sink, schema, compression=compression) as w:
+        for a in range(0, len(df), chunk_rows):
+            w.write_table(pa.Table.from_pandas(df.iloc[a:a + chunk_rows], schema=schema, preserve_index=False))
+            yield sink.drain()
+    yield sink.drain()
+
+def _text_chunks(df: pd.DataFrame, fmt: str, chunk_rows: int) -> Iterator[bytes]:
+    if len(df) == 0 and fmt == "csv":
+        yield df.to_csv(index=False).encode()
+    for a in range(0, len(df), chunk_rows):
+        part = df.iloc[a:a + chunk_rows]
+        if fmt == "csv":
+            yield part.to_csv(index=False, header=a == 0).encode()
+        else:
+            yield part.to_json(orient="records", lines=True, date_format="iso", force_ascii=False).encode()
+
+def _compressed(chunks: Iterator[bytes], compression: str) -> Iterator[bytes]:
+    if compression == "gzip":
+        z = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for b in chunks:
+            out = z.compress(b)
+            if out:
+                yield out
+        yield z.flush()
+    else:
+        # one zstd frame per chunk; concatenated frames are a valid zstd stream
+        import pyarrow as pa
+        codec = pa.Codec("zstd")
+        for b in chunks:
+            if b:
+                yield codec.compress(b, asbytes=True)
+
+def iter_data(refined: pd.DataFrame, fmt: str = "csv", compression: Optional[str] = None,
+              chunk_rows: int = CHUNK_ROWS) -> Iterator[bytes]:
+    """The labeled ticket table (same columns as the XLSX Data sheet) as *fmt*
+    bytes, *chunk_rows* rows at a time.
+
+    *compression* ``gzip`` / ``zstd`` wraps CSV and NDJSON in a compressed
+    stream; for Parquet it is the column codec (default snappy).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r} (expected one of {', '.join(FORMATS)})")
+    compression = compression or "none"
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression {compression!r} (expected one of {', '.join(COMPRESSIONS)})")
+    df = data_table(refined)[0]
+    if fmt == "parquet":
+        yield from _parquet_chunks(df, "snappy" if compression == "none" else compression, chunk_rows)
+    elif compression == "none":
+        yield from _text_chunks(df, fmt, chunk_rows)
+    else:
+        yield from _compressed(_text_chunks(df, fmt, chunk_rows), compression)
@@ -0,0 +1,95 @@
+from typing import Iterable, List, Optional
+import numpy as np, pandas as pd
+
+SAMPLE_ROWS = 400   # values per column the format is inferred from
+MIN_MATCH = 0.8     # share of the sample one explicit format must parse
+# tried in order (ties go to the earlier one, so month-first like pandas' own guess)
+FORMATS = [
+    "ISO8601",
+    "%m/%d/%Y %H:%M:%S", "%m/%d/%Y %H:%M", "%m/%d/%Y %I:%M:%S %p", "%m/%d/%Y %I:%M %p", "%m/%d/%Y",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+    "%d-%m-%Y %H:%M:%S", "%d-%m-%Y %H:%M", "%d-%m-%Y",
+    "%d.%m.%Y %H:%M:%S", "%d.%m.%Y %H:%M", "%d.%m.%Y",
+    "%Y/%m/%d %H:%M:%S", "%Y/%m/%d",
+    "%d-%b-%Y %H:%M:%S", "%d-%b-%Y", "%d %b %Y %H:%M", "%d %b %Y", "%b %d %Y", "%b %d, %Y",
+]
+DATETIME = "datetime"  # already datetime64
+MIXED = "mixed"        # no single format; pandas guesses per element
+
+def _sample(s: pd.Series, n: int = SAMPLE_ROWS) -> pd.Series:
+    vals = s[s.notna()]
+    if len(vals) > n:
+        vals = vals.iloc[np.linspace(0, len(vals) - 1, n).astype(int)]
+    return vals.astype(str).str.strip()
+
+def _to_datetime(values, fmt: str):
+    return pd.to_datetime(values, format=fmt, errors="coerce", cache=False)
+
+def infer_format(s: pd.Series, sample: int = SAMPLE_ROWS) -> Optional[str]:
+    """The date format of column *s*, from a sample of its non-null values.
+
+    One of :data:`FORMATS` when it parses at least ``MIN_MATCH`` of the
+    sample, :data:`DATETIME` for datetime64 columns, :data:`MIXED` when only
+    per-element guessing parses anything, ``None`` when nothing is a date
+    (numeric columns included: they are counts, not epochs).
+    """
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return DATETIME
+    if pd.api.types.is_numeric_dtype(s) or pd.api.types.is_bool_dtype(s):
+        return None
+    vals = _sample(s, sample)
+    vals = vals[vals != ""]
+    if vals.empty:
+        return None
+    best, hits = None, 0.0
+    for fmt in FORMATS:
+        ok = float(_to_datetime(vals, fmt).notna().mean())
+        if ok > hits:
+            best, hits = fmt, ok
+            if ok == 1.0:
+                break
+    if hits >= MIN_MATCH:
+        return best
+    return MIXED if _to_datetime(vals, MIXED).notna().any() else None
+
+def parse(s: pd.Series, fmt: Optional[str] = None) -> pd.Series:
+    """*s* as datetime64 (NaT where unparseable) with one explicit format.
+
+    *fmt* defaults to :func:`infer_format`; each distinct value is parsed
+    once and broadcast back to the rows (ticket exports repeat timestamps).
+    """
+    if fmt is None:
+        fmt = infer_format(s)
+    if fmt == DATETIME:
+        return s
+    if fmt is None:
+        return pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    codes, uniques = pd.factorize(s, sort=False)
+    parsed = _to_datetime(pd.Index(uniques).astype(str).str.strip(), fmt)
+    out = parsed.take(codes, allow_fill=True, fill_value=pd.NaT) if len(parsed) else \
+        pd.DatetimeIndex(np.full(len(s), np.datetime64("NaT"), dtype="datetime64[ns]"))
+    return pd.Series(out, index=s.index, name=s.name)
+
+def coalesce(df: pd.DataFrame, columns: Iterable[str]) -> Optional[pd.Series]:
+    """Parse *columns* of *df* into one datetime series, later columns first.
+
+    Same result as ``combine_first``-ing every parsed column in order, but
+    a column's format is inferred from a sample, columns that are not dates
+    are never parsed in full, and earlier columns are parsed only for the
+    rows still missing. ``None`` when no column holds a date.
+    """
+    fmts: List = [(c, infer_format(df[c])) for c in columns]
+    fmts = [(c, f) for c, f in fmts if f is not None]
+    best = None
+    for c, fmt in reversed(fmts):
+        if best is None:
+            s = parse(df[c], fmt)
+            best = (s.copy() if fmt == DATETIME else s) if s.notna().any() else None
+            continue
+        gap = best.isna().to_numpy()
+        if not gap.any():
+            break
+        fill = parse(df[c][gap], fmt)
+        if fill.notna().any():
+            best[gap] = fill.to_numpy()
+    return best
@@ -0,0 +1,104 @@
+import os, re
+from typing import NamedTuple
+import numpy as np, pandas as pd
+
+# Jaccard similarity (of word 1-2 gram shingles) from which two tickets count as one
+DEDUP_THRESHOLD = float(os.getenv("DWPNXT_DEDUP_THRESHOLD", "0.8"))
+# below this many texts clustering is cheap and collapsing is skipped
+DEDUP_MIN_ROWS = int(os.getenv("DWPNXT_DEDUP_MIN_ROWS", "2000"))
+NUM_PERM = 64
+BANDS = 8             # 8 bands x 8 rows: candidate pairs from ~0.77 Jaccard
+_DIGITS = re.compile(r"\d+")  # alert ids, hosts and counters differ only in their numbers
+_BLOCK_NNZ = 1 << 18  # shingles hashed per step (x NUM_PERM x 4 bytes of scratch)
+_EMPTY = np.iinfo(np.uint32).max
+
+class Collapsed(NamedTuple):
+    """Near-duplicate groups of *n* texts.
+
+    ``reps``: row position of each group's first member; ``inverse``: group
+    of every row (``reps[inverse]`` is a row's representative);
+    ``weights``: group sizes.
+    """
+    reps: np.ndarray
+    inverse: np.ndarray
+    weights: np.ndarray
+
+    @property
+    def duplicate_ratio(self) -> float:
+        n = len(self.inverse)
+        return 1.0 - len(self.reps) / n if n else 0.0
+
+def _shingles(texts):
+    from sklearn.feature_extraction.text import HashingVectorizer
+    hv = HashingVectorizer(analyzer="word", ngram_range=(1, 2), token_pattern=r"\S+", lowercase=False,
+                           preprocessor=lambda s: _DIGITS.sub("0", s), n_features=(1 << 31) - 1,
+                           alternate_sign=False, norm=None, binary=True)
+    X = hv.transform(texts)
+    X.sum_duplicates()
+    return X
+
+def minhash(texts, num_perm: int = NUM_PERM, seed: int = 42) -> np.ndarray:
+    """``(len(texts), num_perm)`` MinHash signatures of the texts' word 1-2 gram shingles.
+
+    Digit runs are masked before shingling. Each permutation is
+    ``(a*x + b) mod 2**32`` with odd *a* (a bijection of uint32) applied to
+    the murmur-hashed shingle; empty texts get an all-``0xffffffff`` row.
+    """
+    X = _shingles(texts)
+    rnd = np.random.RandomState(seed)
+    a = rnd.randint(0, 1 << 31, num_perm).astype(np.uint32) * np.uint32(2) + np.uint32(1)
+    b = rnd.randint(0, 1 << 31, num_perm).astype(np.uint32)
+    sig = np.full((X.shape[0], num_perm), _EMPTY, dtype=np.uint32)
+    indptr, idx = X.indptr, X.indices.astype(np.uint32)
+    row = 0
+    while row < X.shape[0]:
+        stop = max(row + 1, int(np.searchsorted(indptr, indptr[row] + _BLOCK_NNZ, side="right")) - 1)
+        lo, hi = indptr[row], indptr[stop]
+        starts = indptr[row:stop] - lo
+        filled = np.flatnonzero(np.diff(indptr[row:stop + 1]))
+        if len(filled):
+            h = idx[lo:hi, None] * a + b  # wraps mod 2**32
+            sig[row + filled] = np.minimum.reduceat(h, starts[filled], axis=0)
+        row = stop
+    return sig
+
+def _groups(sig: np.ndarray, threshold: float, bands: int) -> np.ndarray:
+    """Connected components of rows that share an LSH band and agree on >= *threshold* of *sig*."""
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    n, width = sig.shape[0], sig.shape[1] // bands
+    src, dst = [], []
+    for band in range(bands):
+        keys = np.ascontiguousarray(sig[:, band * width:(band + 1) * width]).view(np.dtype((np.void, 4 * width)))[:, 0]
+        _, first, inv = np.unique(keys, return_index=True, return_inverse=True)
+        head = first[inv]
+        cand = np.flatnonzero(head != np.arange(n))
+        if len(cand):
+            agree = (sig[cand] == sig[head[cand]]).mean(axis=1)
+            keep = cand[agree >= threshold]
+            src.append(keep)
+            dst.append(head[keep])
+    if not src:
+        return np.arange(n)
+    src, dst = np.concatenate(src), np.concatenate(dst)
+    graph = coo_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+def collapse(texts: pd.Series, threshold: float = DEDUP_THRESHOLD, bands: int = BANDS) -> Collapsed:
+    """Group identical and near-duplicate *texts* (already cleaned).
+
+    Identical texts are merged first; the distinct ones are compared by
+    MinHash with LSH banding, so the cost stays linear in the number of
+    texts. Groups are connected components of the near-duplicate pairs.
+    """
+    codes, uniques = pd.factorize(texts.fillna(""), sort=False)
+    if len(uniques) > 1:
+        comp = _groups(minhash(list(uniques)), threshold, bands)
+        codes = comp[codes]
+    groups, reps, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    # number groups in order of first appearance so representatives stay in row order
+    order = np.argsort(reps, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    inverse = rank[inverse].reshape(-1)
+    return Collapsed(reps[order], inverse, np.bincount(inverse, minlength=len(order)))
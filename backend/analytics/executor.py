@@ -0,0 +1,193 @@
+import asyncio, math, os, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+THREADS = int(os.getenv("DWPNXT_EXEC_THREADS", str(min(8, (os.cpu_count() or 2) + 2))))
+# "0" runs the handlers' work inline on the event loop (the old behaviour; for load tests)
+OFFLOAD = os.getenv("DWPNXT_OFFLOAD", "1") != "0"
+DEFAULT_LIMITS = {"analyze": 4, "ingest": 2, "xlsx": 2, "pdf": 2, "data": 2, "jobs": 2}
+
+def parse_limits(spec: str) -> Dict[str, int]:
+    """``"analyze=4,xlsx=2"`` -> ``{"analyze": 4, "xlsx": 2}``."""
+    out = {}
+    for part in filter(None, (p.strip() for p in (spec or "").split(","))):
+        name, _, n = part.partition("=")
+        out[name.strip()] = max(1, int(n))
+    return out
+
+class Saturated(Exception):
+    """Raised when a lane's running slots and its queue are all taken."""
+
+    def __init__(self, lane: str, retry_after: int):
+        super().__init__(f"{lane} is saturated; retry in {retry_after}s")
+        self.lane = lane
+        self.retry_after = retry_after
+
+class Lane:
+    """Per-endpoint admission control in front of the shared worker pool.
+
+    At most *limit* calls run at once and *queue* more may wait for a slot;
+    beyond that :meth:`run` fails fast with :class:`Saturated`, whose
+    ``retry_after`` is estimated from the lane's recent service times.
+    """
+
+    def __init__(self, name: str, limit: int, queue: Optional[int] = None):
+        self.name = name
+        self.limit = limit
+        self.queue = limit if queue is None else queue
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.avg_seconds = 1.0
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._sem_loop = None
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            if self.running + self.waiting >= self.limit + self.queue:
+                self.rejected += 1
+                backlog = self.waiting + 1
+                raise Saturated(self.name, max(1, math.ceil(self.avg_seconds * backlog / self.limit)))
+            self.waiting += 1
+
+    def _observe(self, seconds: float):
+        with self._lock:
+            self.avg_seconds = 0.8 * self.avg_seconds + 0.2 * seconds
+
+    async def _enter(self) -> asyncio.Semaphore:
+        self._admit()
+        loop = asyncio.get_running_loop()
+        if self._sem_loop is not loop:  # semaphores are bound to one event loop
+            self._sem, self._sem_loop = asyncio.Semaphore(self.limit), loop
+        sem = self._sem
+        try:
+            await sem.acquire()
+        except BaseException:
+            with self._lock:
+                self.waiting -= 1
+            raise
+        with self._lock:
+            self.waiting -= 1
+            self.running += 1
+        return sem
+
+    def _exit(self, sem: asyncio.Semaphore, t0: float):
+        self._observe(time.perf_counter() - t0)
+        with self._lock:
+            self.running -= 1
+        sem.release()
+
+    async def run(self, pool: "Executor", fn: Callable, *args, **kwargs):
+        sem = await self._enter()
+        t0 = time.perf_counter()
+        try:
+            return await pool.call(fn, *args, **kwargs)
+        finally:
+            self._exit(sem, t0)
+
+    async def stream(self, pool: "Executor", fn: Callable, *args, **kwargs) -> "LaneStream":
+        """Take a slot now and hand back ``fn(*args, **kwargs)`` (an iterable) as a
+        :class:`LaneStream`, which holds the slot until it is exhausted or closed."""
+        sem = await self._enter()
+        return LaneStream(self, sem, pool, lambda: iter(fn(*args, **kwargs)))
+
+    def stats(self) -> Dict:
+        return {"limit": self.limit, "queue": self.queue, "running": self.running, "waiting": self.waiting,
+                "rejected": self.rejected, "avg_seconds": round(self.avg_seconds, 3)}
+
+_DONE = object()
+
+class LaneStream:
+    """Async iterator over a blocking iterator, each item produced in the pool.
+
+    For streamed responses whose serialization is the heavy part: the
+    lane slot taken by :meth:`Lane.stream` is released when the iterator
+    ends, fails or is closed (:meth:`aclose` is idempotent, so it can also
+    run as the response's background task in case streaming never starts).
+    """
+
+    def __init__(self, lane: Lane, sem: asyncio.Semaphore, pool: "Executor", start: Callable):
+        self._lane, self._sem, self._pool, self._start = lane, sem, pool, start
+        self._it = None
+        self._t0 = time.perf_counter()
+        self._closed = False
+
+    def __aiter__(self) -> "LaneStream":
+        return self
+
+    async def __anext__(self):
+        if self._closed:
+            raise StopAsyncIteration
+        try:
+            if self._it is None:
+                self._it = await self._pool.call(self._start)
+            item = await self._pool.call(next, self._it, _DONE)
+        except BaseException:
+            await self.aclose()
+            raise
+        if item is _DONE:
+            await self.aclose()
+            raise StopAsyncIteration
+        return item
+
+    async def aclose(self):
+        if not self._closed:
+            self._closed = True
+            close = getattr(self._it, "close", None)
+            try:
+                if close is not None:
+                    close()
+            except ValueError:  # cancelled mid-item: still running in the pool, finalized by GC
+                pass
+            self._lane._exit(self._sem, self._t0)
+
+class Executor:
+    """Runs blocking handler work (parsing, labeling, KPIs, exports) off the event loop.
+
+    A bounded thread pool: pandas, pyarrow and the export writers release
+    the GIL for most of their work, and the upload cache stays shared
+    in-process. With ``offload=False`` the work runs inline instead.
+    """
+
+    def __init__(self, threads: int = THREADS, limits: Optional[Dict[str, int]] = None,
+                 offload: bool = OFFLOAD, queue: Optional[int] = None):
+        limits = {**DEFAULT_LIMITS, **parse_limits(os.getenv("DWPNXT_ENDPOINT_LIMITS", "")), **(limits or {})}
+        self.threads = threads
+        self.offload = offload
+        self.lanes = {name: Lane(name, n, queue) for name, n in limits.items()}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    async def call(self, fn: Callable, *args, **kwargs):
+        if not self.offload:
+            return fn(*args, **kwargs)
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix="dwpnxt")
+        return await asyncio.get_running_loop().run_in_executor(self._pool, lambda: fn(*args, **kwargs))
+
+    async def run(self, lane: str, fn: Callable, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in *lane*'s budget; raises :class:`Saturated` when full."""
+        return await self.lanes[lane].run(self, fn, *args, **kwargs)
+
+    async def stream(self, lane: str, fn: Callable, *args, **kwargs) -> LaneStream:
+        """:meth:`Lane.stream` in *lane*; raises :class:`Saturated` when full."""
+        return await self.lanes[lane].stream(self, fn, *args, **kwargs)
+
+    def stats(self) -> Dict:
+        return {"threads": self.threads, "offload": self.offload,
+                "lanes": {n: l.stats() for n, l in self.lanes.items()}}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+_executor: Optional[Executor] = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> Executor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = Executor()
+        return _executor
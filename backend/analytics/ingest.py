@@ -0,0 +1,270 @@
+import csv
+from collections import defaultdict
+from typing import BinaryIO, Dict, Iterator, List, Optional
+import numpy as np, pandas as pd
+from analytics.sketch import KLLSketch
+from analytics.textprep import string_dtype
+
+SNIFF_BYTES = 64 * 1024
+CHUNK_ROWS = 50_000
+DELIMITERS = ",;\t|"
+DATE_COLUMNS = ["created", "opened", "created_at", "submitted", "date", "opened_at"]
+
+class IngestError(ValueError):
+    pass
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+def sniff_delimiter(head: bytes) -> str:
+    """Guess the CSV delimiter from the first few KB of an upload."""
+    sample = head.decode("utf-8", errors="ignore")
+    # drop a trailing partial line so the sniffer sees whole records only
+    if "\n" in sample:
+        sample = sample[: sample.rfind("\n")]
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        first = sample.splitlines()[0] if sample else ""
+        counts = {d: first.count(d) for d in DELIMITERS}
+        best = max(counts, key=counts.get)
+        return best if counts[best] else ","
+
+def iter_csv_chunks(fileobj: BinaryIO, chunksize: int = CHUNK_ROWS, sep: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """Yield the upload as DataFrames of at most *chunksize* rows.
+
+    Only the first :data:`SNIFF_BYTES` are read up front (to pick the
+    delimiter); the rest is parsed incrementally from the file object.
+    """
+    if sep is None:
+        pos = fileobj.tell()
+        sep = sniff_delimiter(fileobj.read(SNIFF_BYTES))
+        fileobj.seek(pos)
+    try:
+        reader = pd.read_csv(fileobj, sep=sep, chunksize=chunksize,
+                             encoding="utf-8", encoding_errors="ignore")
+        for chunk in reader:
+            yield normalize_columns(chunk)
+    except (pd.errors.ParserError, pd.errors.EmptyDataError, UnicodeDecodeError) as e:
+        raise IngestError(f"Invalid CSV: {e}") from e
+
+def detect_format(fileobj: BinaryIO) -> str:
+    """``"parquet"``, ``"arrow"`` (IPC file), ``"arrow-stream"`` or ``"csv"`` from the magic bytes."""
+    pos = fileobj.tell()
+    head = fileobj.read(8)
+    fileobj.seek(pos)
+    if head[:4] == b"PAR1":
+        return "parquet"
+    if head[:6] == b"ARROW1":
+        return "arrow"
+    if head[:4] == b"\xff\xff\xff\xff":
+        return "arrow-stream"
+    return "csv"
+
+def _arrow_to_pandas(batch) -> pd.DataFrame:
+    # strings stay Arrow-backed; timestamps arrive as datetime64 already
+    import pyarrow as pa
+    df = batch.to_pandas(types_mapper={pa.string(): pd.StringDtype("pyarrow"),
+                                       pa.large_string(): pd.StringDtype("pyarrow")}.get)
+    return normalize_columns(df)
+
+def iter_arrow_chunks(fileobj: BinaryIO, fmt: str, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Yield a Parquet / Arrow IPC upload batch by batch (row groups are read lazily)."""
+    try:
+        import pyarrow.ipc as ipc, pyarrow.parquet as pq
+    except ImportError as e:
+        raise IngestError("Parquet/Arrow uploads need pyarrow installed") from e
+    try:
+        if fmt == "parquet":
+            batches = pq.ParquetFile(fileobj).iter_batches(batch_size=chunksize)
+        elif fmt == "arrow":
+            reader = ipc.open_file(fileobj)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        else:
+            batches = ipc.open_stream(fileobj)
+        for b in batches:
+            yield _arrow_to_pandas(b)
+    except (OSError, ValueError) as e:
+        raise IngestError(f"Invalid {fmt} upload: {e}") from e
+
+def iter_upload_chunks(fileobj: BinaryIO, chunksize: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """CSV, Parquet or Arrow IPC upload as a stream of DataFrame chunks."""
+    fmt = detect_format(fileobj)
+    if fmt == "csv":
+        return iter_csv_chunks(fileobj, chunksize=chunksize)
+    return iter_arrow_chunks(fileobj, fmt, chunksize=chunksize)
+
+# Columns stored as datetime64 / category in the internal ticket table
+DATETIME_COLUMNS = DATE_COLUMNS + ["opened_dt", "resolved_dt", "resolved_at", "closed_at",
+                                   "sys_created_on", "sys_updated_on", "resolved", "closed"]
+CATEGORY_COLUMNS = ["driver", "final_driver", "source", "priority", "category", "subcategory", "assignment_group"]
+
+def to_internal(df: pd.DataFrame, categorize: bool = True, min_date_ratio: float = 0.9,
+                date_formats: Optional[Dict[str, Optional[str]]] = None) -> pd.DataFrame:
+    """Coerce *df* (in place) to the internal ticket-table dtypes.
+
+    Text columns become ``string[pyarrow]``, known date columns become
+    datetime64 when at least *min_date_ratio* of their values parse, and
+    (with *categorize*) driver-like columns become categoricals. Chunks are
+    converted with ``categorize=False`` and categorized once after concat,
+    since concatenating categoricals with different categories yields object.
+
+    A date column's format (:func:`analytics.dates.infer_format`) and whether
+    it is a date at all are decided once, from the first chunk with values,
+    and kept in *date_formats*: pass the same dict for every chunk of an
+    upload so they all parse with that one explicit ``format=``.
+    """
+    from analytics import dates
+    formats = {} if date_formats is None else date_formats
+    sdt = string_dtype()
+    for c in df.columns:
+        col = df[c]
+        if c in DATETIME_COLUMNS and not pd.api.types.is_datetime64_any_dtype(col):
+            decided = c in formats
+            fmt = formats[c] if decided else dates.infer_format(col)
+            parsed = dates.parse(col, fmt) if fmt is not None else None
+            nonnull = int(col.notna().sum())
+            if not decided and nonnull:
+                if parsed is None or parsed.notna().sum() < min_date_ratio * nonnull:
+                    parsed = None
+                formats[c] = fmt if parsed is not None else None
+            if parsed is not None:
+                df[c] = parsed
+                continue
+        if categorize and c in CATEGORY_COLUMNS:
+            if not isinstance(col.dtype, pd.CategoricalDtype):
+                df[c] = col.astype(str).astype("category") if c in ("driver", "final_driver") else col.astype("category")
+            continue
+        if sdt is not None and col.dtype == object and pd.api.types.infer_dtype(col, skipna=True) == "string":
+            df[c] = col.astype(sdt)
+    return df
+
+def infer_date_column(columns) -> Optional[str]:
+    for c in DATE_COLUMNS:
+        if c in columns:
+            return c
+    return None
+
+TRUTHY = {"true": 1.0, "yes": 1.0, "y": 1.0, "1": 1.0, "false": 0.0, "no": 0.0, "n": 0.0, "0": 0.0}
+
+def as_flag(s: pd.Series) -> pd.Series:
+    """Booleans / 0-1 numbers / yes-no strings as float 1.0/0.0 (NaN if unknown)."""
+    if s.dtype == bool:
+        return s.astype(float)
+    num = pd.to_numeric(s, errors="coerce")
+    txt = s.astype(str).str.strip().str.lower().map(TRUTHY)
+    return num.where(num.notna(), txt).astype(float)
+
+AHT_ESTIMATE_COLUMNS = ["u_aht_minutes", "aht", "avg_handle_time"]
+KPI_COLUMNS = ["driver", "Tickets", "With_AHT", "Median_AHT", "P90_AHT", "P95_AHT", "SLA_Breach_%", "Reopen_Rate_%"]
+
+class RunningKPIs:
+    """Per-driver KPI and monthly trend aggregates folded chunk by chunk.
+
+    Produces the same table as :func:`analytics.report.driver_kpis` (plus
+    P90/P95 AHT) without keeping the ticket rows: AHT goes into one
+    mergeable :class:`~analytics.sketch.KLLSketch` per driver, so memory is
+    bounded by the number of drivers, and partial aggregates from chunks
+    or worker processes combine with :meth:`merge`.
+    """
+
+    def __init__(self, date_col: Optional[str] = None, eps: Optional[float] = None):
+        self.date_col = date_col
+        self.eps = eps
+        self.rows = 0
+        self.sla_breaches = 0
+        self.tickets: Dict[str, int] = defaultdict(int)
+        self.sla_sum: Dict[str, float] = defaultdict(float)
+        self.sla_n: Dict[str, int] = defaultdict(int)
+        self.reopened: Dict[str, int] = defaultdict(int)
+        self.aht: Dict[str, KLLSketch] = {}
+        self.months: Dict[str, int] = defaultdict(int)
+        # raw handle-time columns, for tcd.estimate_aht_minutes without the rows
+        self.aht_columns: Dict[str, KLLSketch] = {}
+
+    def _sketch(self, store: Dict[str, KLLSketch], key: str) -> KLLSketch:
+        if key not in store:
+            store[key] = KLLSketch(eps=self.eps)
+        return store[key]
+
+    def update(self, df: pd.DataFrame, driver_col: str = "driver"):
+        if df.empty:
+            return
+        self.rows += len(df)
+        drv = df[driver_col].astype(str)
+        if self.date_col is None:
+            self.date_col = infer_date_column(df.columns) or ""
+        n = len(df)
+        aht = pd.to_numeric(df["aht_min"], errors="coerce") if "aht_min" in df.columns else pd.Series(np.nan, index=df.index)
+        sla = as_flag(df["sla_breached_bool"]) if "sla_breached_bool" in df.columns else pd.Series(0.0, index=df.index)
+        reopen = pd.to_numeric(df["reopen_count_num"], errors="coerce") if "reopen_count_num" in df.columns else pd.Series(0, index=df.index)
+        part = pd.DataFrame({"d": drv.to_numpy(), "sla": sla.to_numpy(), "re": reopen.fillna(0).gt(0).to_numpy()}, index=range(n))
+        g = part.groupby("d", sort=False).agg(n=("d", "size"), sla_sum=("sla", "sum"), sla_n=("sla", "count"), re=("re", "sum"))
+        for d, cnt, ssum, sn, re_ in zip(g.index, g["n"], g["sla_sum"], g["sla_n"], g["re"]):
+            self.tickets[d] += int(cnt)
+            self.sla_sum[d] += float(ssum)
+            self.sla_n[d] += int(sn)
+            self.reopened[d] += int(re_)
+        self.sla_breaches += int((sla.fillna(0) > 0).sum())
+        av = aht.to_numpy(dtype=float)
+        ok = ~np.isnan(av)
+        if ok.any():
+            for d, vals in pd.Series(av[ok]).groupby(drv.to_numpy()[ok]):
+                self._sketch(self.aht, d).update(vals.to_numpy())
+        for c in AHT_ESTIMATE_COLUMNS:
+            if c in df.columns:
+                self._sketch(self.aht_columns, c).update(pd.to_numeric(df[c], errors="coerce").to_numpy(dtype=float))
+        if self.date_col:
+            m = pd.to_datetime(df[self.date_col], errors="coerce").dt.to_period("M").dropna().astype(str)
+            for k, v in m.value_counts().items():
+                self.months[k] += int(v)
+
+    def merge(self, other: "RunningKPIs") -> "RunningKPIs":
+        """Fold another partial aggregate (e.g. from a worker) into this one."""
+        self.rows += other.rows
+        self.sla_breaches += other.sla_breaches
+        for mine, theirs in ((self.tickets, other.tickets), (self.sla_sum, other.sla_sum),
+                             (self.sla_n, other.sla_n), (self.reopened, other.reopened), (self.months, other.months)):
+            for k, v in theirs.items():
+                mine[k] += v
+        for mine, theirs in ((self.aht, other.aht), (self.aht_columns, other.aht_columns)):
+            for k, sk in theirs.items():
+                mine[k] = mine[k].merge(sk) if k in mine else sk
+        if not self.date_col:
+            self.date_col = other.date_col
+        return self
+
+    def estimate_aht_minutes(self, default: float = 8.0) -> float:
+        """Streaming counterpart of :func:`analytics.tcd.estimate_aht_minutes`."""
+        for c in AHT_ESTIMATE_COLUMNS:
+            sk = self.aht_columns.get(c)
+            if sk is not None and sk.n:
+                return sk.median()
+        return float(default)
+
+    def kpis(self) -> pd.DataFrame:
+        rows = []
+        for d in sorted(self.tickets):
+            sk = self.aht.get(d)
+            n_aht = sk.n if sk is not None else 0
+            p50, p90, p95 = sk.quantiles([0.5, 0.9, 0.95]) if n_aht else (0.0, 0.0, 0.0)
+            n = self.tickets[d]
+            rows.append({
+                "driver": d,
+                "Tickets": n,
+                "With_AHT": int(n_aht),
+                "Median_AHT": p50,
+                "P90_AHT": p90,
+                "P95_AHT": p95,
+                "SLA_Breach_%": (self.sla_sum[d] / self.sla_n[d] * 100) if self.sla_n[d] else 0.0,
+                "Reopen_Rate_%": self.reopened[d] / n * 100 if n else 0.0,
+            })
+        return pd.DataFrame(rows, columns=KPI_COLUMNS).sort_values("Tickets", ascending=False)
+
+    def by_driver(self) -> pd.DataFrame:
+        out = pd.DataFrame(sorted(self.tickets.items()), columns=["driver", "tickets"])
+        return out.sort_values("tickets", ascending=False, kind="stable")
+
+    def trends(self) -> List[Dict]:
+        return [{"month": k, "tickets": v} for k, v in sorted(self.months.items())]
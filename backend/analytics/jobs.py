@@ -0,0 +1,317 @@
+import json, os, shutil, threading, time, uuid
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from multiprocessing import get_context
+from typing import Dict, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOB_DIR = os.getenv("DWPNXT_JOB_DIR", os.path.join(BACKEND_DIR, "data", "jobs"))
+WORKERS = int(os.getenv("DWPNXT_JOB_WORKERS", "2"))
+TTL_HOURS = float(os.getenv("DWPNXT_JOB_TTL_HOURS", "24"))
+
+STAGES = ["parse", "label", "cluster", "kpis", "export"]
+EXPORTS = {"xlsx": ("export.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+           "pdf": ("export.pdf", "application/pdf")}
+UPLOAD = "upload.bin"
+LABEL_EXAMPLES = 50  # representative tickets per cluster for the Python labeler
+
+class JobCancelled(Exception):
+    pass
+
+def _write_json(path: str, data: Dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+def _read_json(path: str) -> Optional[Dict]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+class Progress:
+    """Stage-level progress of one job, written to ``status.json`` in its directory.
+
+    Runs in the worker process; every update also checks the job's
+    ``cancel`` flag file and raises :class:`JobCancelled` when it is set.
+    """
+
+    def __init__(self, job_dir: str, stages: List[str], min_interval: float = 0.25):
+        self.dir = job_dir
+        self.min_interval = min_interval
+        self._last = 0.0
+        self.status = {"status": "running", "stage": None, "progress": 0.0,
+                       "stages": {s: {"status": "pending", "progress": 0.0, "seconds": None} for s in STAGES}}
+        for s in STAGES:
+            if s not in stages:
+                self.status["stages"][s]["status"] = "skipped"
+        self._order = [s for s in STAGES if s in stages]
+        self._t0 = time.time()
+
+    def check(self):
+        if os.path.exists(os.path.join(self.dir, "cancel")):
+            raise JobCancelled()
+
+    def _flush(self, force=False):
+        now = time.time()
+        if force or now - self._last >= self.min_interval:
+            _write_json(os.path.join(self.dir, "status.json"), self.status)
+            self._last = now
+
+    def _overall(self):
+        done = sum(1 for s in self._order if self.status["stages"][s]["status"] == "done")
+        cur = self.status["stage"]
+        part = self.status["stages"][cur]["progress"] if cur and self.status["stages"][cur]["status"] == "running" else 0.0
+        self.status["progress"] = round((done + part) / max(1, len(self._order)), 4)
+
+    def stage(self, name: str):
+        self.check()
+        self.status["stage"] = name
+        self.status["stages"][name].update(status="running", progress=0.0)
+        self._t0 = time.time()
+        self._overall()
+        self._flush(force=True)
+
+    def update(self, fraction: float):
+        self.check()
+        st = self.status["stages"][self.status["stage"]]
+        st["progress"] = round(min(1.0, max(0.0, fraction)), 4)
+        self._overall()
+        self._flush()
+
+    def done(self):
+        st = self.status["stages"][self.status["stage"]]
+        st.update(status="done", progress=1.0, seconds=round(time.time() - self._t0, 3))
+        self._overall()
+        self._flush(force=True)
+
+    def finish(self, status: str, **extra):
+        self.status.update(status=status, **extra)
+        if status == "done":
+            self.status["progress"] = 1.0
+        self._flush(force=True)
+
+def run_job(job_dir: str, options: Dict) -> Dict:
+    """The analysis pipeline of one job; runs in a worker process.
+
+    *options*: ``cluster`` (bool) re-clusters the "Other" tickets, ``exports``
+    lists any of ``xlsx`` / ``pdf``. Writes ``result.json`` and the export
+    files next to the upload and returns the result.
+    """
+    import pandas as pd
+    from analytics import config_cache, ingest, payload, textprep
+    from analytics.tcd import apply_rules
+
+    exports = [e for e in options.get("exports", []) if e in EXPORTS]
+    stages = ["parse", "label"] + (["cluster"] if options.get("cluster") else []) + ["kpis"] + (["export"] if exports else [])
+    prog = Progress(job_dir, stages)
+    try:
+        prog.stage("parse")
+        path = os.path.join(job_dir, UPLOAD)
+        size = max(1, os.path.getsize(path))
+        chunks = []
+        with open(path, "rb") as f:
+            try:
+                for chunk in ingest.iter_upload_chunks(f):
+                    textprep.prepare_text(chunk)
+                    chunks.append(chunk)
+                    prog.update(f.tell() / size)
+            except ingest.IngestError:
+                raise ValueError("Invalid upload (expected CSV, Parquet or Arrow IPC)")
+        prog.done()
+
+        prog.stage("label")
+        rules = config_cache.get_rules()
+        for i, chunk in enumerate(chunks):
+            chunks[i], _ = apply_rules(chunk, rules)
+            prog.update((i + 1) / len(chunks))
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=["driver"])
+        del chunks
+        prog.done()
+
+        notes = {"rows": len(df)}
+        if options.get("cluster"):
+            prog.stage("cluster")
+            df = _cluster_other(df, prog, notes)
+            prog.done()
+
+        prog.stage("kpis")
+        agg = ingest.RunningKPIs()
+        step = ingest.CHUNK_ROWS
+        for start in range(0, len(df), step):
+            agg.update(df.iloc[start:start + step])
+            prog.update(min(1.0, (start + step) / len(df)))
+        result = payload.compose_payload(agg)
+        df = ingest.to_internal(df)
+        prog.done()
+
+        if exports:
+            prog.stage("export")
+            for i, kind in enumerate(exports):
+                _export(kind, df, agg, os.path.join(job_dir, EXPORTS[kind][0]))
+                prog.update((i + 1) / len(exports))
+            prog.done()
+
+        result["exports"] = exports
+        result["notes"] = notes
+        _write_json(os.path.join(job_dir, "result.json"), result)
+        prog.finish("done")
+        return result
+    except JobCancelled:
+        prog.finish("cancelled")
+        raise
+    except Exception as e:
+        prog.finish("failed", error=str(e))
+        raise
+
+def _cluster_other(df, prog: Progress, notes: Dict):
+    from analytics import config_cache, prefs, textprep
+    from analytics.cluster import iterative_other_reduction
+    from analytics.model_registry import get_registry
+    from analytics.llm_bridge import best_labels_for_clusters
+    p = prefs.load_prefs(os.path.join(BACKEND_DIR, "config", "user_prefs.yaml"))
+    examples = {}
+    out = iterative_other_reduction(df, target_other_pct=float(p["target_other_pct"]) / 100,
+                                    min_cluster_size=int(p["min_cluster_size"]), registry=get_registry(),
+                                    taxonomy_version=config_cache.get_taxonomy_version(),
+                                    mode=p["cluster_mode"], batch_size=int(p["cluster_batch_size"]),
+                                    examples=examples, examples_k=LABEL_EXAMPLES,
+                                    dedup=bool(p["cluster_dedup"]), notes=notes)
+    prog.update(0.7)
+    # each cluster's representative tickets as written (prompts and label cache want the
+    # ticket text, not the cleaned form), all clusters labeled in one pass
+    clusters = {cid: textprep.raw_text(out.loc[idx]).str.strip().tolist() for cid, idx in examples.items()}
+    clean = {cid: textprep.clean_text_of(out.loc[idx]).tolist() for cid, idx in examples.items()}
+    labels = best_labels_for_clusters(clusters, provider=p["llm_provider"], pack=int(p["llm_clusters_per_prompt"]),
+                                      clean=clean)
+    out["driver"] = out["driver"].replace({cid: title for cid, (title, _, _) in labels.items()})
+    prog.update(1.0)
+    return out
+
+def _export(kind: str, df, agg, path: str):
+    from analytics import report, xlsx_export
+    if kind == "xlsx":
+        xlsx_export.write_processed_workbook(df, path, constant_memory=True)
+        return
+    with open(path, "wb") as f:
+        f.write(report.summary_pdf(agg.kpis(), agg.estimate_aht_minutes()))
+
+@dataclass
+class Job:
+    id: str
+    dir: str
+    options: Dict
+    created: float = field(default_factory=time.time)
+    future: Optional[Future] = None
+
+class JobManager:
+    """Background analyses in a process pool, tracked through per-job spool directories.
+
+    ``submit`` copies the upload to ``<root>/<id>/`` and queues
+    :func:`run_job`; ``status`` merges the worker's ``status.json`` with the
+    future's state; ``cancel`` drops a queued job or flags a running one,
+    which stops at its next progress update.
+    """
+
+    def __init__(self, root: str = JOB_DIR, workers: int = WORKERS, ttl_hours: float = TTL_HOURS):
+        self.root = root
+        self.workers = max(1, int(workers))
+        self.ttl = ttl_hours * 3600
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a threaded server process is not safe
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context("spawn"))
+        return self._pool
+
+    def submit(self, fileobj, options: Optional[Dict] = None) -> str:
+        self.prune()
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.root, job_id)
+        os.makedirs(job_dir)
+        with open(os.path.join(job_dir, UPLOAD), "wb") as f:
+            shutil.copyfileobj(fileobj, f, 1 << 20)
+        job = Job(job_id, job_dir, dict(options or {}))
+        with self._lock:
+            self._jobs[job_id] = job
+            job.future = self._executor().submit(run_job, job_dir, job.options)
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def status(self, job_id: str) -> Optional[Dict]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        st = _read_json(os.path.join(job.dir, "status.json")) or {
+            "status": "queued", "stage": None, "progress": 0.0,
+            "stages": {s: {"status": "pending", "progress": 0.0, "seconds": None} for s in STAGES}}
+        fut = job.future
+        if fut is not None and fut.done():
+            if fut.cancelled():
+                st["status"] = "cancelled"
+            elif fut.exception() is not None and st["status"] not in ("failed", "cancelled"):
+                st.update(status="failed", error=str(fut.exception()) or type(fut.exception()).__name__)
+        elif os.path.exists(os.path.join(job.dir, "cancel")) and st["status"] in ("queued", "running"):
+            st["status"] = "cancelling"
+        st.update(id=job.id, created=job.created, options=job.options)
+        if st["status"] == "done":
+            st["result"] = _read_json(os.path.join(job.dir, "result.json"))
+        return st
+
+    def file(self, job_id: str, kind: str) -> Optional[str]:
+        job = self.get(job_id)
+        if job is None or kind not in EXPORTS:
+            return None
+        path = os.path.join(job.dir, EXPORTS[kind][0])
+        return path if os.path.exists(path) else None
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        if job.future is not None and job.future.cancel():
+            return True
+        if job.future is None or not job.future.done():
+            open(os.path.join(job.dir, "cancel"), "w").close()
+        return True
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict:
+        job = self.get(job_id)
+        try:
+            job.future.result(timeout)
+        except (CancelledError, Exception):
+            pass  # reported by status()
+        return self.status(job_id)
+
+    def prune(self):
+        """Forget finished jobs older than the TTL and remove their files."""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            old = [j for j in self._jobs.values() if j.created < cutoff and (j.future is None or j.future.done())]
+            for j in old:
+                self._jobs.pop(j.id, None)
+        for j in old:
+            shutil.rmtree(j.dir, ignore_errors=True)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+def get_manager() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
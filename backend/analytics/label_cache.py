@@ -0,0 +1,115 @@
+import hashlib, json, os, sqlite3, threading, time
+from collections import Counter
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+from analytics.py_label import STOPWORDS
+from analytics.textprep import clean_text
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB = os.getenv("DWPNXT_LABEL_CACHE", os.path.join(BACKEND_DIR, "data", "label_cache.sqlite"))
+TTL_DAYS = float(os.getenv("DWPNXT_LABEL_CACHE_TTL_DAYS", "90"))
+MAX_ENTRIES = int(os.getenv("DWPNXT_LABEL_CACHE_MAX", "50000"))
+TOP_TERMS = 12
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS labels (
+    key TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    rationale TEXT NOT NULL,
+    source TEXT NOT NULL,
+    created REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS labels_used ON labels (used);
+"""
+
+# the python labeler's stop list plus negations, so filler words do not move the key
+_SKIP = STOPWORDS | {"not", "cannot", "can"}
+
+def top_terms(texts: Iterable[str], n: int = TOP_TERMS) -> Tuple[str, ...]:
+    """The cluster's *n* most frequent content tokens (ties broken alphabetically), sorted."""
+    cnt = Counter(tok for t in texts if isinstance(t, str) for tok in clean_text(t).split()
+                  if len(tok) > 2 and tok not in _SKIP and not any(ch.isdigit() for ch in tok))
+    return tuple(sorted(t for t, _ in sorted(cnt.items(), key=lambda kv: (-kv[1], kv[0]))[:n]))
+
+def cluster_key(texts: Sequence[str], model: str, prompt_version: str) -> str:
+    """Stable fingerprint of a cluster (its top terms) for one model + prompt version.
+
+    Ticket order, numbering and casing do not change it, so the same kind
+    of cluster in next month's upload maps to the same key.
+    """
+    blob = json.dumps([top_terms(texts), str(model), str(prompt_version)], separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+class LabelCache:
+    """On-disk (SQLite) cache of LLM cluster labels.
+
+    Entries expire after *ttl_days*; beyond *max_entries* the least
+    recently used are evicted. ``hits`` / ``misses`` count lookups in this
+    process.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB, ttl_days: float = TTL_DAYS, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def get(self, key: str) -> Optional[Tuple[str, str, str]]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT title, rationale, source, created FROM labels WHERE key = ?",
+                                     (key,)).fetchone()
+            if row and now - row[3] > self.ttl:
+                self._conn.execute("DELETE FROM labels WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE labels SET used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0], row[1], row[2]
+
+    def put(self, key: str, title: str, rationale: str, source: str):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO labels VALUES (?,?,?,?,?,?)",
+                               (key, title, rationale or "", source, now, now))
+            n = self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+            if n > self.max_entries:
+                self._conn.execute("DELETE FROM labels WHERE key IN "
+                                   "(SELECT key FROM labels ORDER BY used LIMIT ?)", (n - self.max_entries,))
+
+    def purge_expired(self) -> int:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM labels WHERE created < ?", (time.time() - self.ttl,)).rowcount
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM labels")
+        self.hits = self.misses = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            n = self._conn.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+        total = self.hits + self.misses
+        return {"entries": n, "max_entries": self.max_entries, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0}
+
+_cache: Optional[LabelCache] = None
+_cache_lock = threading.Lock()
+
+def get_label_cache() -> LabelCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LabelCache()
+        return _cache
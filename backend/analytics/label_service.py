@@ -0,0 +1,263 @@
+import asyncio, json, os, random, re, time
+from abc import ABC, abstractmethod
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import httpx
+from analytics.py_label import python_labels_for_clusters
+
+CONCURRENCY = int(os.getenv("DWPNXT_LLM_CONCURRENCY", "8"))
+RATE_PER_SEC = float(os.getenv("DWPNXT_LLM_RPS", "5"))
+TIMEOUT = float(os.getenv("DWPNXT_LLM_TIMEOUT", "60"))
+
+# bump when SYSTEM or the prompts change: cached labels are keyed by it
+# (llm_bridge sends the same single-cluster prompt and shares the entries)
+PROMPT_VERSION = "v1"
+
+SYSTEM = ("You label IT support tickets into concise, executive-friendly 'call drivers'. "
+          "Return a short title (3-5 words, Title Case) and a one-line rationale.")
+
+Label = Tuple[str, str, str]  # (title, rationale, source)
+
+def _examples(texts: Sequence[str], k: int = 12) -> str:
+    return "\n---\n".join([t[:280] for t in texts[:k]])
+
+def single_prompt(texts: Sequence[str]) -> str:
+    return ("Examples (trimmed):\n---\n" + _examples(texts) +
+            "\n---\nReturn JSON: {\"title\":\"...\",\"rationale\":\"...\"}")
+
+def packed_prompt(clusters: Sequence[Tuple[str, Sequence[str]]]) -> str:
+    parts = [f"Cluster {cid}:\n---\n{_examples(texts, 8)}\n---" for cid, texts in clusters]
+    return ("Name EACH of the following clusters of IT tickets independently.\n\n" + "\n\n".join(parts) +
+            "\n\nReturn JSON: {\"labels\":[{\"id\":\"<cluster id>\",\"title\":\"...\",\"rationale\":\"...\"}]}")
+
+def _strip_fence(content: str) -> str:
+    return re.sub(r"^```(?:json)?\s*|\s*```$", "", (content or "").strip())
+
+def parse_single(content: str) -> Optional[Tuple[str, str]]:
+    data = json.loads(_strip_fence(content))
+    title = str(data.get("title", "")).strip()
+    return (title, str(data.get("rationale", ""))) if title else None
+
+def parse_packed(content: str) -> Dict[str, Tuple[str, str]]:
+    data = json.loads(_strip_fence(content))
+    out = {}
+    for item in data.get("labels", []) if isinstance(data, dict) else data:
+        title = str(item.get("title", "")).strip()
+        if title:
+            out[str(item.get("id"))] = (title, str(item.get("rationale", "")))
+    return out
+
+class TokenBucket:
+    """Async token bucket: *rate* requests per second, bursts up to *capacity*."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class Provider(ABC):
+    """One LLM endpoint with its own connection pool, concurrency cap and rate limit.
+
+    Subclasses set ``name`` and implement :meth:`complete`.
+    """
+    name = "provider"
+
+    def __init__(self, model: str, concurrency: int = CONCURRENCY, rate: float = RATE_PER_SEC,
+                 timeout: float = TIMEOUT):
+        self.model = model
+        self.timeout = timeout
+        self.semaphore = asyncio.BoundedSemaphore(concurrency)
+        self.bucket = TokenBucket(rate, capacity=concurrency)
+        self.http = httpx.AsyncClient(timeout=timeout,
+                                      limits=httpx.Limits(max_connections=concurrency,
+                                                          max_keepalive_connections=concurrency))
+        self.calls = 0
+
+    @abstractmethod
+    async def complete(self, prompt: str) -> str:
+        """The model's raw answer to *prompt* (under :data:`SYSTEM`)."""
+
+    async def aclose(self):
+        await self.http.aclose()
+
+class OpenAIProvider(Provider):
+    name = "openai"
+
+    def __init__(self, model: str = "gpt-4o-mini", api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, **kw):
+        super().__init__(model, **kw)
+        import openai
+        self.client = openai.AsyncOpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"),
+                                         base_url=base_url or os.getenv("OPENAI_BASE_URL"),
+                                         http_client=self.http, max_retries=0)
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        resp = await self.client.chat.completions.create(
+            model=self.model, temperature=0.2,
+            messages=[{"role": "system", "content": SYSTEM}, {"role": "user", "content": prompt}])
+        return resp.choices[0].message.content
+
+class GeminiProvider(Provider):
+    """Gemini through its REST API, so requests share one pooled async client."""
+    name = "gemini"
+
+    def __init__(self, model: str = "gemini-2.5-flash", api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, **kw):
+        super().__init__(model, **kw)
+        self.api_key = api_key or os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
+        self.base_url = (base_url or os.getenv("GEMINI_BASE_URL") or
+                         "https://generativelanguage.googleapis.com").rstrip("/")
+
+    async def complete(self, prompt: str) -> str:
+        self.calls += 1
+        r = await self.http.post(
+            f"{self.base_url}/v1beta/models/{self.model}:generateContent",
+            headers={"x-goog-api-key": self.api_key or ""},
+            json={"contents": [{"role": "user", "parts": [{"text": SYSTEM}]},
+                               {"role": "user", "parts": [{"text": prompt}]}],
+                  "generationConfig": {"temperature": 0.2, "responseMimeType": "application/json",
+                                       "maxOutputTokens": 1024}})
+        r.raise_for_status()
+        return r.json()["candidates"][0]["content"]["parts"][0]["text"]
+
+def default_providers(provider: str = "auto", gemini_model="gemini-2.5-flash",
+                      openai_model="gpt-4o-mini", **kw) -> List[Provider]:
+    """Providers to try in order for the ``llm_provider`` pref (those without a key are skipped)."""
+    out: List[Provider] = []
+    if provider in ("auto", "gemini") and (os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")):
+        out.append(GeminiProvider(gemini_model, **kw))
+    if provider in ("auto", "openai") and os.getenv("OPENAI_API_KEY"):
+        out.append(OpenAIProvider(openai_model, **kw))
+    return out
+
+class LabelService:
+    """Labels many clusters concurrently, falling back per cluster.
+
+    Each cluster goes to the providers in order; a provider call waits for
+    its semaphore and rate-limit token, is retried with exponential
+    backoff (plus jitter) on errors and timeouts, and when every provider
+    gave up the cluster gets a Python label (:func:`python_labels_for_clusters`). With
+    ``pack > 1`` several clusters share one prompt; ids missing from a
+    packed answer are retried on their own. With a
+    :class:`~analytics.label_cache.LabelCache` clusters already labeled by
+    a provider's model are answered from it and new labels are stored.
+
+        async with LabelService(default_providers()) as svc:
+            labels = await svc.label_many({0: texts0, 1: texts1})
+    """
+
+    def __init__(self, providers: Sequence[Provider], pack: int = 1, retries: int = 3,
+                 backoff: float = 0.5, max_backoff: float = 8.0, cache=None):
+        self.providers = list(providers)
+        self.cache = cache
+        self.pack = max(1, int(pack))
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {"calls": 0, "retries": 0, "failures": 0, "python": 0}
+
+    async def __aenter__(self) -> "LabelService":
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def aclose(self):
+        await asyncio.gather(*(p.aclose() for p in self.providers))
+
+    async def _call(self, p: Provider, prompt: str) -> str:
+        for attempt in range(self.retries + 1):
+            try:
+                async with p.semaphore:
+                    await p.bucket.acquire()
+                    self.stats["calls"] += 1
+                    return await asyncio.wait_for(p.complete(prompt), p.timeout)
+            except Exception:
+                if attempt == self.retries:
+                    raise
+                self.stats["retries"] += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+    async def _one(self, p: Provider, texts: Sequence[str]) -> Optional[Tuple[str, str]]:
+        try:
+            return parse_single(await self._call(p, single_prompt(texts)))
+        except Exception:
+            self.stats["failures"] += 1
+            return None
+
+    async def _packed(self, p: Provider, group: List[Tuple[str, Sequence[str]]]) -> Dict[str, Tuple[str, str]]:
+        try:
+            return parse_packed(await self._call(p, packed_prompt(group)))
+        except Exception:
+            self.stats["failures"] += 1
+            return {}
+
+    async def _label_with(self, p: Provider, todo: Dict[str, Sequence[str]]) -> Dict[str, Tuple[str, str]]:
+        keys = list(todo)
+        if self.pack == 1:
+            res = await asyncio.gather(*(self._one(p, todo[k]) for k in keys))
+            return {k: r for k, r in zip(keys, res) if r}
+        groups = [keys[i:i + self.pack] for i in range(0, len(keys), self.pack)]
+        res = await asyncio.gather(*(self._packed(p, [(k, todo[k]) for k in g]) for g in groups))
+        got = {k: v for r in res for k, v in r.items() if k in todo}
+        missing = [k for k in keys if k not in got]
+        if missing:
+            again = await asyncio.gather(*(self._one(p, todo[k]) for k in missing))
+            got.update({k: r for k, r in zip(missing, again) if r})
+        return got
+
+    async def label_many(self, clusters: Dict[Hashable, Sequence[str]],
+                         clean: Optional[Dict[Hashable, Sequence[str]]] = None) -> Dict[Hashable, Label]:
+        """``{cluster_id: texts}`` -> ``{cluster_id: (title, rationale, source)}``; *clean*
+        (``{cluster_id: cleaned texts}``) spares the Python fallback cleaning them again."""
+        ids = {str(k): k for k in clusters}
+        todo = {s: list(clusters[k]) for s, k in ids.items()}
+        out: Dict[Hashable, Label] = {}
+        for p in self.providers:
+            if not todo:
+                break
+            keys = {}
+            if self.cache is not None:
+                from analytics.label_cache import cluster_key
+                for s in list(todo):
+                    keys[s] = cluster_key(todo[s], p.model, PROMPT_VERSION)
+                    hit = self.cache.get(keys[s])
+                    if hit:
+                        out[ids[s]] = hit
+                        todo.pop(s)
+            for s, (title, rationale) in (await self._label_with(p, todo)).items():
+                out[ids[s]] = (title, rationale, p.name)
+                todo.pop(s)
+                if s in keys:
+                    self.cache.put(keys[s], title, rationale, p.name)
+        rest = None if clean is None else {s: clean[ids[s]] for s in todo}
+        for s, (t, ra) in python_labels_for_clusters(todo, rest).items():
+            out[ids[s]] = (t, ra, "python")
+            self.stats["python"] += 1
+        return out
+
+def label_clusters(clusters: Dict[Hashable, Sequence[str]], provider: str = "auto", pack: int = 1,
+                   providers: Optional[Sequence[Provider]] = None, clean=None, **kw) -> Dict[Hashable, Label]:
+    """Synchronous entry point: label all *clusters* in one event loop
+    (*kw* go to :class:`LabelService`). Not for use inside a running loop."""
+    async def run():
+        async with LabelService(providers if providers is not None else default_providers(provider),
+                                pack=pack, **kw) as svc:
+            return await svc.label_many(clusters, clean)
+    return asyncio.run(run())
@@ -1,16 +1,21 @@
-import os, re, random, json
+import os, re, json
+from functools import lru_cache
 from typing import List, Tuple
-from openai import OpenAI
-import httpx
+from analytics.sampling import spread_examples
 
-# Single, reusable client. httpx will honor environment proxies automatically.
-_http_client = httpx.Client(timeout=60.0)
-_client_singleton = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=_http_client)
+@lru_cache(maxsize=1)
+def _client():
+    """Single, reusable client, built on first use. httpx will honor environment proxies automatically."""
+    from openai import OpenAI
+    import httpx
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"), http_client=httpx.Client(timeout=60.0))
 
 def _pick_examples(texts: List[str], k: int = 12) -> List[str]:
-    texts = [t for t in texts if isinstance(t, str) and t.strip()]
-    random.seed(42); random.shuffle(texts)
-    return [t[:280] for t in texts[:k]]
+    # callers pass all cluster members in file order: spread over them, deterministically
+    return spread_examples(texts, k)
+
+# bump when SYSTEM / USER_TEMPLATE change: cached labels are keyed by it
+PROMPT_VERSION = "llm-v1"
 
 SYSTEM = (
     "You label IT support tickets into concise, executive-friendly 'call drivers'. "
@@ -33,12 +38,18 @@ Return JSON with:
 Return ONLY JSON, no prose.
 """
 
-def llm_label_for_cluster(texts: List[str], model: str = "gpt-4o-mini") -> Tuple[str,str]:
+def llm_label_for_cluster(texts: List[str], model: str = "gpt-4o-mini", cache=None) -> Tuple[str,str]:
+    from analytics.label_cache import cluster_key, get_label_cache
+    cache = get_label_cache() if cache is None else cache
+    key = cluster_key(texts, model, PROMPT_VERSION) if cache else None
+    hit = cache.get(key) if cache else None
+    if hit:
+        return hit[0], hit[1]
     msgs = [
         {"role":"system","content":SYSTEM},
         {"role":"user","content":USER_TEMPLATE.format(examples="\n---\n".join(_pick_examples(texts)))}
     ]
-    resp = _client_singleton.chat.completions.create(model=model, messages=msgs, temperature=0.2)
+    resp = _client().chat.completions.create(model=model, messages=msgs, temperature=0.2)
     content = resp.choices[0].message.content.strip()
     try:
         data = json.loads(content)
@@ -51,4 +62,6 @@ def llm_label_for_cluster(texts: List[str], model: str = "gpt-4o-mini") -> Tuple
     title = re.sub(r'\b(the|a|an|for|to|and|of|in|on)\b', '', title, flags=re.I)
     title = re.sub(r'\s+', ' ', title).strip(" -/")
     if not title: title = "Unlabeled"
+    if cache and title != "Unlabeled":
+        cache.put(key, title, rationale, "openai")
     return title, rationale
@@ -1,62 +1,81 @@
 import os
-from typing import List, Tuple, Optional
-from analytics.py_label import python_label_for_cluster
+from functools import lru_cache
+from typing import Dict, Hashable, List, Tuple, Optional, Sequence
+from analytics.label_service import PROMPT_VERSION, SYSTEM, label_clusters, parse_single, single_prompt
+from analytics.py_label import python_label_for_cluster, python_labels_for_clusters
+
+@lru_cache(maxsize=4)
+def _gemini_client(key: str):
+    from google import genai
+    return genai.Client(api_key=key)
+
+@lru_cache(maxsize=4)
+def _openai_client(key: str):
+    import openai, httpx
+    return openai.OpenAI(api_key=key, http_client=httpx.Client(timeout=60.0))
 
 # Gemini
 def _try_gemini(texts: List[str], model: str) -> Optional[Tuple[str,str]]:
     try:
-        from google import genai
         from google.genai import types
         key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
         if not key: return None
-        client = genai.Client(api_key=key)
-        SYSTEM = ("You label IT support tickets into concise, executive-friendly 'call drivers'. "
-                  "Return a short title (3-5 words, Title Case) and a one-line rationale.")
-        prompt = "Examples (trimmed):\n---\n" + "\n---\n".join([t[:280] for t in texts[:12]]) + "\n---\nReturn JSON: {\"title\":\"...\",\"rationale\":\"...\"}"
+        client = _gemini_client(key)
         resp = client.models.generate_content(
             model=model,
             contents=[{"role":"user","parts":[{"text": SYSTEM}]},
-                      {"role":"user","parts":[{"text": prompt}]}],
+                      {"role":"user","parts":[{"text": single_prompt(texts)}]}],
             config=types.GenerateContentConfig(temperature=0.2, response_mime_type="application/json", max_output_tokens=256),
         )
-        import json, re
-        data = json.loads((resp.text or "").strip())
-        title = data.get("title","").strip() or None
-        rationale = data.get("rationale","")
-        if title: return (title, rationale)
+        return parse_single(resp.text or "")
     except Exception:
         return None
-    return None
 
 # OpenAI (optional)
 def _try_openai(texts: List[str], model: str) -> Optional[Tuple[str,str]]:
     try:
-        import openai, httpx
-        if not os.getenv("OPENAI_API_KEY"): return None
-        client = openai.OpenAI(http_client=httpx.Client(timeout=60.0))
-        SYSTEM = ("You label IT support tickets into concise, executive-friendly 'call drivers'. "
-                  "Return a short title (3-5 words, Title Case) and a one-line rationale.")
-        prompt = "Examples (trimmed):\n---\n" + "\n---\n".join([t[:280] for t in texts[:12]]) + "\n---\nReturn JSON: {\"title\":\"...\",\"rationale\":\"...\"}"
-        resp = client.chat.completions.create(model=model, temperature=0.2, messages=[{"role":"system","content":SYSTEM},{"role":"user","content":prompt}])
-        import json, re
-        data = json.loads(resp.choices[0].message.content.strip())
-        title = data.get("title","").strip() or None
-        rationale = data.get("rationale","")
-        if title: return (title, rationale)
+        key = os.getenv("OPENAI_API_KEY")
+        if not key: return None
+        client = _openai_client(key)
+        resp = client.chat.completions.create(model=model, temperature=0.2, messages=[
+            {"role":"system","content":SYSTEM}, {"role":"user","content":single_prompt(texts)}])
+        return parse_single(resp.choices[0].message.content)
     except Exception:
         return None
-    return None
 
-def best_label_for_cluster(texts: List[str], provider: str = "auto", gemini_model="gemini-2.5-flash", openai_model="gpt-4o-mini") -> Tuple[str,str,str]:
+def best_label_for_cluster(texts: List[str], provider: str = "auto", gemini_model="gemini-2.5-flash", openai_model="gpt-4o-mini",
+                           cache=None) -> Tuple[str,str,str]:
     """
     Returns: (title, rationale, source) where source ∈ {"gemini","openai","python"}
+    Provider labels are looked up in / stored to the label cache (pass cache=False to skip it).
     """
-    if provider in ("auto","gemini"):
-        r = _try_gemini(texts, gemini_model)
-        if r: return (r[0], r[1], "gemini")
-    if provider in ("auto","openai"):
-        r = _try_openai(texts, openai_model)
-        if r: return (r[0], r[1], "openai")
+    from analytics.label_cache import cluster_key, get_label_cache
+    if cache is None:
+        cache = get_label_cache()
+    tries = []
+    if provider in ("auto","gemini"): tries.append(("gemini", gemini_model, _try_gemini))
+    if provider in ("auto","openai"): tries.append(("openai", openai_model, _try_openai))
+    for source, model, fn in tries:
+        key = cluster_key(texts, model, PROMPT_VERSION) if cache else None
+        hit = cache.get(key) if cache else None
+        if hit: return hit
+        r = fn(texts, model)
+        if r:
+            if cache: cache.put(key, r[0], r[1], source)
+            return (r[0], r[1], source)
     # fallback
     t, ra = python_label_for_cluster(texts)
     return (t, ra, "python")
+
+def best_labels_for_clusters(clusters: Dict[Hashable, Sequence[str]], provider: str = "auto",
+                             pack: int = 1, clean: Optional[Dict[Hashable, Sequence[str]]] = None
+                             ) -> Dict[Hashable, Tuple[str,str,str]]:
+    """
+    Label many clusters at once: concurrent, rate-limited provider calls with
+    retries (see analytics.label_service). Returns {cluster_id: (title, rationale, source)}.
+    *clean* ({cluster_id: texts already cleaned}) goes to the Python labeler.
+    """
+    from analytics.label_cache import get_label_cache
+    if provider == "off":
+        return {k: (*v, "python") for k, v in python_labels_for_clusters({k: list(v) for k, v in clusters.items()}, clean).items()}
+    return label_clusters(clusters, provider=provider, pack=pack, clean=clean, cache=get_label_cache())
@@ -1,16 +1,20 @@
-import os, re, random, json
+import os, re, json
+from functools import lru_cache
 from typing import List, Tuple
-from google import genai
-from google.genai import types
+from analytics.sampling import spread_examples
 
-# Pick up either GEMINI_API_KEY or GOOGLE_API_KEY
-_api_key = os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY")
-_client = genai.Client(api_key=_api_key)
+@lru_cache(maxsize=1)
+def _client():
+    """Built on first use. Picks up either GEMINI_API_KEY or GOOGLE_API_KEY."""
+    from google import genai
+    return genai.Client(api_key=os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY"))
 
 def _pick_examples(texts: List[str], k: int = 12) -> List[str]:
-    texts = [t for t in texts if isinstance(t, str) and t.strip()]
-    random.seed(42); random.shuffle(texts)
-    return [t[:280] for t in texts[:k]]
+    # callers pass all cluster members in file order: spread over them, deterministically
+    return spread_examples(texts, k)
+
+# bump when SYSTEM / USER_TEMPLATE change: cached labels are keyed by it
+PROMPT_VERSION = "gemini-v1"
 
 SYSTEM = (
     "You label IT support tickets into concise, executive-friendly 'call drivers'. "
@@ -35,11 +39,18 @@ Return JSON with exactly:
 Return ONLY JSON, no prose.
 """
 
-def gemini_label_for_cluster(texts: List[str], model: str = "gemini-2.5-flash") -> Tuple[str,str]:
+def gemini_label_for_cluster(texts: List[str], model: str = "gemini-2.5-flash", cache=None) -> Tuple[str,str]:
+    from analytics.label_cache import cluster_key, get_label_cache
+    cache = get_label_cache() if cache is None else cache
+    key = cluster_key(texts, model, PROMPT_VERSION) if cache else None
+    hit = cache.get(key) if cache else None
+    if hit:
+        return hit[0], hit[1]
     prompt = USER_TEMPLATE.format(examples="\n---\n".join(_pick_examples(texts)))
 
     # NOTE: google-genai uses 'config=', not 'generation_config='
-    resp = _client.models.generate_content(
+    from google.genai import types
+    resp = _client().models.generate_content(
         model=model,
         contents=[
             {"role":"user","parts":[{"text": SYSTEM}]},
@@ -65,4 +76,6 @@ def gemini_label_for_cluster(texts: List[str], model: str = "gemini-2.5-flash")
     title = re.sub(r'\b(the|a|an|for|to|and|of|in|on)\b', '', title, flags=re.I)
     title = re.sub(r'\s+', ' ', title).strip(" -/")
     if not title: title = "Unlabeled"
+    if cache and title != "Unlabeled":
+        cache.put(key, title, rationale, "gemini")
     return title, rationale
@@ -63,5 +63,5 @@ def propose_mapping(columns: List[str]) -> Dict[str, Optional[str]]:
 def apply_mapping(df: pd.DataFrame, mapping: Dict[str, Optional[str]]) -> pd.DataFrame:
     inv = {v: k for k, v in mapping.items() if v and v in df.columns}
     if inv:
-        df = df.rename(columns=inv)
+        df = df.rename(columns=inv, copy=False)
     return df
@@ -0,0 +1,187 @@
+import os, re, threading, time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+import numpy as np, pandas as pd
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_DIR = os.getenv("DWPNXT_MODEL_DIR", os.path.join(BACKEND_DIR, "models"))
+MAX_AGE_DAYS = float(os.getenv("DWPNXT_MODEL_MAX_AGE_DAYS", "7"))
+DRIFT_THRESHOLD = float(os.getenv("DWPNXT_MODEL_DRIFT", "0.25"))
+ASSIGN_BATCH = 50000
+# members within this quantile of their distance to the centroid count as fitting
+RADIUS_QUANTILE = 0.95
+
+def _slug(s) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", str(s).strip().lower()).strip("-") or "default"
+
+@dataclass
+class ClusterModel:
+    """A fitted "Other"-clustering pipeline: vectorizer -> SVD -> clusterer.
+
+    ``centroids`` (SVD space, one row per cluster id in ``cluster_ids``) and
+    ``radius`` (:data:`RADIUS_QUANTILE` member-to-centroid distance) let new tickets
+    be assigned and let us tell when they no longer fit; ``baseline`` is the
+    share of the training tickets that did not fit either.
+    """
+    tenant: str
+    taxonomy_version: str
+    algo: str
+    vec: object
+    svd: object
+    model: object
+    centroids: np.ndarray
+    cluster_ids: np.ndarray
+    radius: float
+    baseline: float
+    n_fit: int
+    fitted_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_fit(cls, tenant, taxonomy_version, labels: np.ndarray, algo: str, ctx: Dict,
+                 sample_weight=None) -> "ClusterModel":
+        Xs, labels = ctx["Xs"], np.asarray(labels)
+        w = np.ones(len(labels)) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+        ids = np.unique(labels[labels >= 0])
+        centroids = (np.vstack([np.average(Xs[labels == c], axis=0, weights=w[labels == c]) for c in ids])
+                     if len(ids) else np.empty((0, Xs.shape[1])))
+        radius, baseline = 0.0, float(np.average(labels < 0, weights=w)) if len(labels) else 0.0
+        if len(ids):
+            pos = np.searchsorted(ids, labels[labels >= 0])
+            d = np.linalg.norm(Xs[labels >= 0] - centroids[pos], axis=1)
+            radius = float(np.quantile(d, RADIUS_QUANTILE))
+            if algo != "hdbscan":
+                # no noise label: the training tickets that did not fit are the members beyond radius
+                baseline = float(np.average(d > radius, weights=w[labels >= 0]))
+        return cls(str(tenant), str(taxonomy_version), algo, ctx["vec"], ctx["svd"], ctx["model"],
+                   centroids, ids, radius, baseline, int(w.sum()))
+
+    def embed(self, texts: pd.Series) -> np.ndarray:
+        """SVD-space embeddings of *texts* (already cleaned)."""
+        docs = texts.tolist()
+        if not docs:
+            return np.empty((0, self.centroids.shape[1]))
+        return np.vstack([self.svd.transform(self.vec.transform(docs[i:i + ASSIGN_BATCH]))
+                          for i in range(0, len(docs), ASSIGN_BATCH)])
+
+    def assign(self, texts: pd.Series, Xs: Optional[np.ndarray] = None,
+               sample_weight=None) -> Tuple[np.ndarray, float]:
+        """Cluster ids for *texts* (already cleaned) and the share that does not fit (novelty).
+
+        *Xs*: their embeddings, when already computed with :meth:`embed`;
+        *sample_weight*: tickets per text, for the novelty share.
+        """
+        if len(texts) == 0:
+            return np.empty(0, dtype=int), 0.0
+        if Xs is None:
+            Xs = self.embed(texts)
+        if self.algo == "hdbscan":
+            import hdbscan
+            labels, _ = hdbscan.approximate_predict(self.model, Xs)
+            labels = np.asarray(labels, dtype=int)
+            # clusters of collapsed duplicate groups are not in the HDBSCAN tree
+            # (cluster._hdbscan_groups): place noise by their centroids
+            grouped = self.cluster_ids > np.max(self.model.labels_, initial=-1)
+            noise = np.flatnonzero(labels < 0)
+            if grouped.any() and len(noise):
+                from sklearn.metrics import pairwise_distances_argmin_min
+                nearest, dist = pairwise_distances_argmin_min(Xs[noise], self.centroids[grouped])
+                fit = dist <= self.radius
+                labels[noise[fit]] = self.cluster_ids[grouped][nearest[fit]]
+            novel = labels < 0
+        elif len(self.cluster_ids):
+            # nearest non-empty training cluster; KMeans.predict could pick an
+            # empty duplicate centroid the fit never labeled anything with
+            from sklearn.metrics import pairwise_distances_argmin_min
+            nearest, dist = pairwise_distances_argmin_min(Xs, self.centroids)
+            labels = self.cluster_ids[nearest].astype(int)
+            novel = dist > self.radius
+        else:
+            labels = np.full(len(texts), -1, dtype=int)
+            novel = np.ones(len(labels), bool)
+        return labels, float(np.average(novel, weights=sample_weight))
+
+class ModelRegistry:
+    """Fitted clustering models persisted with joblib, keyed by tenant and taxonomy version.
+
+    A stored model is reused (``transform`` + nearest centroid /
+    ``approximate_predict``) until it is older than *max_age_days* or the
+    share of new tickets it cannot place exceeds its training baseline by
+    more than *drift_threshold*; only then is it refit on the current
+    tickets and replaced.
+    """
+
+    def __init__(self, root: str = MODEL_DIR, max_age_days: float = MAX_AGE_DAYS,
+                 drift_threshold: float = DRIFT_THRESHOLD):
+        self.root = root
+        self.max_age = max_age_days * 86400
+        self.drift_threshold = drift_threshold
+        self._mem: Dict[str, ClusterModel] = {}
+        self._lock = threading.Lock()
+
+    def path(self, tenant, taxonomy_version) -> str:
+        return os.path.join(self.root, f"{_slug(tenant)}__tax-{_slug(taxonomy_version)}.joblib")
+
+    def load(self, tenant, taxonomy_version) -> Optional[ClusterModel]:
+        p = self.path(tenant, taxonomy_version)
+        with self._lock:
+            if p in self._mem:
+                return self._mem[p]
+            if not os.path.exists(p):
+                return None
+            import joblib
+            m = joblib.load(p)
+            self._mem[p] = m
+            return m
+
+    def save(self, m: ClusterModel) -> str:
+        import joblib
+        p = self.path(m.tenant, m.taxonomy_version)
+        os.makedirs(self.root, exist_ok=True)
+        tmp = p + ".tmp"
+        joblib.dump(m, tmp)
+        os.replace(tmp, p)
+        with self._lock:
+            self._mem[p] = m
+        return p
+
+    def invalidate(self, tenant, taxonomy_version):
+        p = self.path(tenant, taxonomy_version)
+        with self._lock:
+            self._mem.pop(p, None)
+        if os.path.exists(p):
+            os.remove(p)
+
+    def stale(self, m: ClusterModel) -> bool:
+        return time.time() - m.fitted_at > self.max_age
+
+    def cluster(self, texts: pd.Series, tenant="default", taxonomy_version="0",
+                min_cluster_size=25, mode="auto", batch_size=10000, sample_weight=None) -> Tuple[np.ndarray, Dict]:
+        """Assign cleaned *texts* with the stored model, refitting on schedule or drift.
+
+        *sample_weight*: tickets each text stands for (collapsed duplicates).
+
+        Returns the labels and ``{"refit": bool, "reason": str, "novelty": float, "Xs": embeddings}``.
+        """
+        from analytics.cluster import run_clustering
+        m = self.load(tenant, taxonomy_version)
+        reason = "missing" if m is None else ("schedule" if self.stale(m) else "")
+        if not reason:
+            Xs = m.embed(texts)
+            labels, novelty = m.assign(texts, Xs, sample_weight)
+            if novelty - m.baseline <= self.drift_threshold:
+                return labels, {"refit": False, "reason": "", "novelty": novelty, "Xs": Xs}
+            reason = "drift"
+        labels, algo, ctx = run_clustering(texts, min_cluster_size=min_cluster_size, cleaned=True,
+                                           mode=mode, batch_size=batch_size, sample_weight=sample_weight)
+        self.save(ClusterModel.from_fit(tenant, taxonomy_version, labels, algo, ctx, sample_weight))
+        return labels, {"refit": True, "reason": reason, "novelty": 0.0, "Xs": ctx["Xs"]}
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+def get_registry() -> ModelRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
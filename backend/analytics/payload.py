@@ -0,0 +1,22 @@
+def compose_payload(agg) -> dict:
+    """The /api/analyze JSON in the shape the frontend expects.
+
+    *agg* is an ``ingest.RunningKPIs`` or an ``aggregate_store.StoredKPIs``.
+    """
+    kpi = agg.kpis().rename(columns={"driver": "Driver"})
+    by_driver = agg.by_driver()
+    keyThemes = by_driver.head(5)["driver"].astype(str).tolist()
+    priorityActions = [f"Create self-serve for {d}" for d in keyThemes[:3]]
+    categories = kpi[["Driver","Tickets","Median_AHT","P90_AHT","P95_AHT","SLA_Breach_%"]].to_dict(orient="records")
+    return {
+        "summary": {
+            "overallSentiment": "Not computed (backend heuristic placeholder)",
+            "totalTickets": int(agg.rows),
+            "avgResolutionTime": float(kpi["Median_AHT"].median()) if not kpi.empty else 0.0,
+            "slaBreaches": int(agg.sla_breaches),
+            "keyThemes": keyThemes,
+            "priorityActions": priorityActions
+        },
+        "trends": agg.trends(),
+        "categories": categories
+    }
@@ -1,7 +1,11 @@
 import os, yaml
 DEFAULT_PREFS = {
   "llm_provider": "auto",   # auto, gemini, openai, off
+  "llm_clusters_per_prompt": 1,   # >1 packs several clusters into one LLM request
   "min_cluster_size": 25,
+  "cluster_mode": "auto",   # auto, batch, streaming (out-of-core, for very large Other sets)
+  "cluster_batch_size": 10000,
+  "cluster_dedup": True,    # collapse near-duplicate tickets (MinHash/LSH) before clustering
   "target_other_pct": 12,
   "include_other": False,
   "cost_per_min": 1.20,
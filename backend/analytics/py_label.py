@@ -1,7 +1,7 @@
-import re, pandas as pd
-from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-import yake
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+import numpy as np, pandas as pd
+from analytics.sampling import joined_prefix
+from analytics.textprep import clean_series, clean_text
 
 # Canonical IT buckets → synonyms
 CANON = {
@@ -29,52 +29,197 @@ please need issue help error problem user request ticket desk service still usin
 http https x000d attach attachment screenshot etc link click
 """.split())
 
+def _keep(toks):
+    return [t for t in toks if len(t)>2 and t not in STOPWORDS]
+
 def _tokens(s: str):
-    s = s.lower()
-    s = re.sub(r"_x\d{4}_"," ",s)
-    s = re.sub(r"[^a-z0-9\s]"," ",s)
-    toks = [t for t in s.split() if len(t)>2 and t not in STOPWORDS]
-    return toks
+    return _keep(clean_text(s).split())
+
+_LABELS = list(CANON)
+CANON_RATIONALE = "Matched IT lexicon by keyword frequency."
+SALIENCE_RATIONALE = "Auto-labeled by keyword salience."
+
+def _canon_index():
+    """Character trie of the CANON keys (a node ending a key holds its label indexes) and,
+    per key, how many times each label lists it."""
+    trie: Dict = {}
+    exact: Dict[str, Dict[int, int]] = {}
+    for i, keys in enumerate(CANON.values()):
+        for k in keys:
+            node = trie
+            for ch in k:
+                node = node.setdefault(ch, {})
+            node.setdefault(None, set()).add(i)
+            exact.setdefault(k, {})
+            exact[k][i] = exact[k].get(i, 0) + 1
+    return trie, exact
+
+_TRIE, _EXACT = _canon_index()
+
+def _canon_weights(vocab: Sequence[str]):
+    """Sparse vocab x label weights: how often the token is one of the label's keys,
+    plus one when some key of the label is a prefix of it."""
+    from scipy import sparse
+    rows, cols, vals = [], [], []
+    for t, tok in enumerate(vocab):
+        w = dict(_EXACT.get(tok, ()))
+        prefixed = set()
+        node = _TRIE
+        for ch in tok:
+            node = node.get(ch)
+            if node is None:
+                break
+            prefixed.update(node.get(None, ()))
+        for i in prefixed:
+            w[i] = w.get(i, 0) + 1
+        for i, v in w.items():
+            rows.append(t); cols.append(i); vals.append(v)
+    return sparse.csr_matrix((vals, (rows, cols)), shape=(len(vocab), len(_LABELS)), dtype=np.int64)
+
+def _canon_scores(token_lists: Sequence[List[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Best CANON label index and its score for each token list, in one sparse product."""
+    from scipy import sparse
+    n = len(token_lists)
+    toks = pd.Series(list(token_lists), dtype=object).explode().dropna()
+    if toks.empty:
+        return np.zeros(n, dtype=int), np.zeros(n, dtype=np.int64)
+    codes, vocab = pd.factorize(toks, sort=False)
+    counts = sparse.csr_matrix((np.ones(len(codes), dtype=np.int64), (toks.index.to_numpy(), codes)),
+                               shape=(n, len(vocab)))
+    scores = (counts @ _canon_weights(vocab)).toarray()
+    best = scores.argmax(axis=1)  # first label among equal maxima
+    return best, scores[np.arange(n), best]
 
 def _score_against_canon(tokens):
-    cnt = Counter(tokens)
-    best_label, best_score = None, 0
-    for label, keys in CANON.items():
-        score = sum(cnt[k] for k in keys if k in cnt)
-        # also partials
-        score += sum(v for k,v in cnt.items() if any(k.startswith(p) for p in keys))
-        if score > best_score:
-            best_label, best_score = label, score
-    return best_label, best_score
+    best, score = _canon_scores([list(tokens)])
+    return (_LABELS[best[0]], int(score[0])) if score[0] > 0 else (None, 0)
 
 def _yake_keywords(texts, topk=5):
+    import yake
     kw = yake.KeywordExtractor(lan="en", n=1, top=topk)
-    joined = " ".join(texts)[:50000]
+    joined = joined_prefix(texts, 50000)
     try:
         cand = [w for w,_ in kw.extract_keywords(joined)]
         return [c for c in cand if c not in STOPWORDS][:topk]
     except Exception:
         return []
 
-def python_label_for_cluster(texts):
-    texts = [t for t in texts if isinstance(t,str)]
-    toks = []
-    for t in texts:
-        toks.extend(_tokens(t))
-    label, score = _score_against_canon(toks)
-    if label and score>=2:
-        rationale = "Matched IT lexicon by keyword frequency."
-        return label, rationale
+def _tfidf_top(texts: Sequence[str], groups: np.ndarray, n_groups: int, k: int = 4,
+               max_features: int = 1000) -> List[List[str]]:
+    """Top *k* TF-IDF terms per group of *texts*, as if ``TfidfVectorizer(stop_words="english",
+    ngram_range=(1, 2), max_features=max_features)`` had been fit on each group alone.
+
+    The texts are analyzed once into one shared term list; per-group
+    document frequencies, feature limits, row norms and term sums are then
+    segmented array operations over it. Row norms are summed in the order
+    the per-group vectorizer would store the terms (first appearance in the
+    group), so ties in the sums break exactly as they did.
+    """
+    from collections import Counter
+    from sklearn.feature_extraction.text import CountVectorizer
+    analyze = CountVectorizer(stop_words="english", ngram_range=(1, 2)).build_analyzer()
+    feats, counts, rows = [], [], []
+    for d, doc in enumerate(texts):
+        c = Counter(analyze(doc))  # first-occurrence order
+        feats.extend(c)
+        counts.extend(c.values())
+        rows.extend([d] * len(c))
+    if not feats:  # empty vocabulary
+        return [[] for _ in range(n_groups)]
+    t, terms = pd.factorize(pd.Series(feats, dtype=object), sort=True)  # term index order is alphabetical
+    V = len(terms)
+    r, x = np.asarray(rows), np.asarray(counts, dtype=float)
+    # one cell per (group, term) present; `first` is where the group first saw the term
+    cell, first, slot = np.unique(groups[r].astype(np.int64) * V + t, return_index=True, return_inverse=True)
+    cg, ct = cell // V, cell % V
+    tf = np.bincount(slot, weights=x).astype(np.int64)
+    df = np.bincount(slot)
+    n_docs = np.bincount(groups, minlength=n_groups)
+    idf = np.log((n_docs[cg] + 1) / (df + 1.0)) + 1
+    # max_features: the group's most frequent terms, picked by the same (unstable)
+    # argsort over its alphabetical terms that the vectorizer uses
+    keep = np.ones(len(cell), bool)
+    bounds = np.searchsorted(cg, np.arange(n_groups + 1))
+    for g in np.flatnonzero(np.diff(bounds) > max_features):
+        a, b = bounds[g], bounds[g + 1]
+        keep[a:b] = False
+        keep[a + (-tf[a:b]).argsort()[:max_features]] = True
+    w = x * idf[slot] * keep[slot]
+    stored = np.lexsort((first[slot], r))
+    norm = np.sqrt(np.bincount(r[stored], weights=(w * w)[stored], minlength=len(texts)))
+    w = np.divide(w, norm[r], out=np.zeros_like(w), where=norm[r] > 0)
+    sums = np.bincount(slot, weights=w, minlength=len(cell))
+    # sorted(zip(sums, terms), reverse=True): highest sum first, ties by the later term
+    idx = np.flatnonzero(keep)
+    idx = idx[np.lexsort((-ct[idx], -sums[idx], cg[idx]))]
+    out: List[List[str]] = [[] for _ in range(n_groups)]
+    for i in idx:
+        if len(out[cg[i]]) < k:
+            out[cg[i]].append(terms[ct[i]])
+    return out
+
+def _label_groups(texts: List, groups: np.ndarray, token_lists: List[List[str]]) -> List[Tuple[str, str]]:
+    """(title, rationale) per group; *groups* maps each text to its group, *token_lists*
+    holds each group's kept tokens."""
+    n = len(token_lists)
+    best, score = _canon_scores(token_lists)
+    out: List[Tuple[str, str]] = [(_LABELS[best[g]], CANON_RATIONALE) if score[g] >= 2 else None for g in range(n)]
+    rest = [g for g in range(n) if out[g] is None]
+    if not rest:
+        return out
     # fall back to TF-IDF top terms
+    pos = np.full(n, -1)
+    pos[rest] = np.arange(len(rest))
+    rows = np.flatnonzero(pos[groups] >= 0) if len(groups) else np.empty(0, dtype=int)
     try:
-        vec = TfidfVectorizer(stop_words="english", ngram_range=(1,2), max_features=1000)
-        X = vec.fit_transform(texts)
-        sums = X.sum(axis=0).A1
-        terms = vec.get_feature_names_out()
-        top = [t for _,t in sorted(zip(sums,terms), reverse=True)[:4] if t not in STOPWORDS]
+        tops = _tfidf_top([texts[i] for i in rows], pos[groups[rows]], len(rest))
     except Exception:
-        top = []
-    if not top:
-        top = _yake_keywords(texts, topk=4)
-    title = " / ".join(top[:4]) if top else "Other"
-    return title.title(), "Auto-labeled by keyword salience."
+        tops = [[] for _ in rest]
+    for j, g in enumerate(rest):
+        top = [t for t in tops[j] if t not in STOPWORDS]
+        if not top:
+            top = _yake_keywords([texts[i] for i in np.flatnonzero(groups == g)], topk=4)
+        title = " / ".join(top[:4]) if top else "Other"
+        out[g] = (title.title(), SALIENCE_RATIONALE)
+    return out
+
+def python_labels(texts: Sequence, cluster_ids: Sequence[Hashable],
+                  clean: Optional[Sequence[str]] = None) -> Dict[Hashable, Tuple[str, str]]:
+    """``{cluster_id: (title, rationale)}`` for all clusters at once; *cluster_ids* (and
+    *clean*, the texts already cleaned as in ``textprep.CLEAN_COL``) are aligned with *texts*.
+
+    One token x label product scores every cluster against CANON, and the
+    clusters it does not settle share one term matrix for their TF-IDF
+    titles. Same labels as :func:`python_label_for_cluster` on each cluster.
+    """
+    texts = list(texts)
+    codes, ids = pd.factorize(pd.Series(list(cluster_ids), dtype=object), sort=False)
+    is_str = np.fromiter((isinstance(t, str) for t in texts), dtype=bool, count=len(texts))
+    if clean is None:
+        clean = clean_series(pd.Series([t if s else "" for t, s in zip(texts, is_str)], dtype=object))
+    token_lists: List[List[str]] = [[] for _ in ids]
+    for g, c, s in zip(codes, clean, is_str):
+        if s and isinstance(c, str):
+            token_lists[g].extend(_keep(c.split()))
+    # non-string texts (NaN) are left out, as the one-cluster labeler does
+    labels = _label_groups([t for t, s in zip(texts, is_str) if s], codes[is_str], token_lists)
+    return dict(zip(ids, labels))
+
+def python_labels_for_clusters(clusters: Dict[Hashable, Sequence[str]],
+                               clean: Optional[Dict[Hashable, Sequence[str]]] = None) -> Dict[Hashable, Tuple[str, str]]:
+    """:func:`python_labels` for ``{cluster_id: texts}`` (and ``{cluster_id: cleaned texts}``)."""
+    out = python_labels([t for texts in clusters.values() for t in texts],
+                        [cid for cid, texts in clusters.items() for _ in texts],
+                        None if clean is None else [c for cid in clusters for c in clean[cid]])
+    return {cid: out[cid] if cid in out else python_label_for_cluster([]) for cid in clusters}
+
+def python_label_for_cluster(texts, clean=None):
+    """*clean*: the texts already cleaned (``textprep.CLEAN_COL``), so they are not cleaned again."""
+    keep = [isinstance(t, str) for t in texts]
+    texts = [t for t, k in zip(texts, keep) if k]
+    if clean is None:
+        clean = clean_series(pd.Series(texts, dtype=object))
+    else:
+        clean = [c for c, k in zip(clean, keep) if k]
+    toks = [t for c in clean for t in _keep(c.split())]
+    return _label_groups(texts, np.zeros(len(texts), dtype=int), [toks])[0]
@@ -1,28 +1,34 @@
-import io, pandas as pd, plotly.express as px
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
+import io, os, numpy as np, pandas as pd
+from analytics.ingest import as_flag
+
+def _col(df: pd.DataFrame, name: str, default) -> pd.Series:
+    return df[name] if name in df.columns else pd.Series(default, index=df.index)
 
 def driver_kpis(df: pd.DataFrame) -> pd.DataFrame:
-    d = df.copy()
-    if "driver" not in d.columns and "final_driver" in d.columns:
-        d = d.rename(columns={"final_driver": "driver"})
-    d["driver"] = d["driver"].astype(str).fillna("Other")
-
-    # populate optional metrics with default Series when missing
-    d["aht_min"] = d.get("aht_min", pd.Series(index=d.index, dtype=float))
-    d["sla_breached_bool"] = d.get("sla_breached_bool", pd.Series(0, index=d.index))
-    d["reopen_count_num"] = d.get("reopen_count_num", pd.Series(0, index=d.index))
-
-    gp = d.groupby("driver", dropna=False)
-    reopen_flag = d["reopen_count_num"].fillna(0).gt(0)
-    out = pd.DataFrame({
-        "Tickets": gp.size(),
-        "With_AHT": gp["aht_min"].apply(lambda s: s.notna().sum()),
-        "Median_AHT": gp["aht_min"].median(),
-        "SLA_Breach_%": gp["sla_breached_bool"].mean()*100,
-        "Reopen_Rate_%": gp.apply(lambda s: reopen_flag.loc[s.index].mean()*100)
-    }).fillna(0).reset_index()
+    # Only the five inputs are gathered into a narrow frame (no copy of *df*)
+    # and every metric is a built-in aggregation of one groupby pass.
+    drv = df["driver"] if "driver" in df.columns or "final_driver" not in df.columns else df["final_driver"]
+    if isinstance(drv.dtype, pd.CategoricalDtype):
+        if drv.isna().any():
+            drv = (drv if "nan" in drv.cat.categories else drv.cat.add_categories(["nan"])).fillna("nan")
+    else:
+        drv = drv.astype(str)
+    narrow = pd.DataFrame({
+        "driver": drv.to_numpy(),
+        "aht": pd.to_numeric(_col(df, "aht_min", np.nan), errors="coerce").to_numpy(dtype=float),
+        "sla": as_flag(_col(df, "sla_breached_bool", 0)).to_numpy(),
+        "reopen": pd.to_numeric(_col(df, "reopen_count_num", 0), errors="coerce").fillna(0).gt(0).to_numpy(),
+    })
+    out = narrow.groupby("driver", sort=False, observed=True).agg(
+        Tickets=("aht", "size"),
+        With_AHT=("aht", "count"),
+        Median_AHT=("aht", "median"),
+        **{"SLA_Breach_%": ("sla", "mean"), "Reopen_Rate_%": ("reopen", "mean")},
+    )
+    out.index = out.index.astype(str)
+    out = out.sort_index()
+    out[["SLA_Breach_%", "Reopen_Rate_%"]] *= 100
+    out = out.fillna(0).reset_index()
     return out.sort_values("Tickets", ascending=False)
 
 def roi_table(kpis: pd.DataFrame, cost_per_min: float, deflection: float) -> pd.DataFrame:
@@ -39,20 +45,104 @@ def crosstab(df: pd.DataFrame, by: str) -> pd.DataFrame:
     tab = pd.crosstab(df["driver"], df[by]).sort_values(by=list(df[by].value_counts().index), ascending=False)
     return tab
 
+# plotly and reportlab are imported on first use: most requests never draw a chart
+
+# "vector" draws the PDF charts with reportlab graphics; "plotly" rasterizes
+# plotly figures through kaleido (a headless browser per export)
+PDF_CHARTS = os.getenv("DWPNXT_PDF_CHARTS", "vector")
+CHART_W, CHART_H = 547, 200  # A4 width less the 24pt margins
+
+def _bar_drawing(labels, values, title: str, width: float = CHART_W, height: float = CHART_H):
+    """A reportlab bar chart *Drawing* (vector, no browser) of *values* per label."""
+    from reportlab.graphics.charts.barcharts import VerticalBarChart
+    from reportlab.graphics.shapes import Drawing, String
+    from reportlab.lib import colors
+    labels = [str(l) if len(str(l)) <= 18 else str(l)[:17] + "…" for l in labels]
+    values = [float(v) for v in values] or [0.0]
+    d = Drawing(width, height)
+    d.add(String(0, height - 14, title, fontName="Helvetica-Bold", fontSize=11))
+    ch = VerticalBarChart()
+    ch.x, ch.y = 40, 60
+    ch.width, ch.height = width - 50, height - 84
+    ch.data = [values]
+    ch.categoryAxis.categoryNames = labels or [""]
+    ch.categoryAxis.labels.angle = 35
+    ch.categoryAxis.labels.boxAnchor = "ne"
+    ch.categoryAxis.labels.fontSize = 6.5
+    ch.valueAxis.valueMin = 0
+    ch.valueAxis.labels.fontSize = 7
+    ch.valueAxis.labelTextFormat = lambda v: f"{v:,.0f}"
+    ch.bars[0].fillColor = colors.HexColor("#636EFA")  # plotly's first trace colour
+    ch.bars[0].strokeColor = None
+    ch.barSpacing = 1
+    d.add(ch)
+    return d
+
+def _draw_top_bar(df: pd.DataFrame):
+    top = df.head(15)
+    return _bar_drawing(top["driver"], top["Tickets"], "Top Call Drivers")
+
+def _draw_cost_value(roi: pd.DataFrame):
+    top = roi.head(15)
+    return _bar_drawing(top["Driver"], top["Annualized_Savings_$"], "Cost -> Value (Annualized Savings)")  # no arrow glyph in Helvetica
+
 def _plot_top_bar(df: pd.DataFrame):
+    import plotly.express as px
     fig = px.bar(df.head(15), x="driver", y="Tickets", title="Top Call Drivers")
     fig.update_layout(margin=dict(l=10,r=10,t=40,b=10), height=400)
     return fig
 
 def _plot_cost_value(roi: pd.DataFrame):
+    import plotly.express as px
     fig = px.bar(roi.head(15), x="Driver", y="Annualized_Savings_$", title="Cost → Value (Annualized Savings)")
     fig.update_layout(margin=dict(l=10,r=10,t=40,b=10), height=400)
     return fig
 
+def build_pdf(kpi: pd.DataFrame, top: pd.DataFrame, scqa: pd.DataFrame, roi_df: pd.DataFrame,
+              charts: str = None) -> bytes:
+    """One-pager used by /api/export/pdf: headline numbers, the two charts and the ROI table.
+
+    *charts* is ``"vector"`` or ``"plotly"`` (default ``PDF_CHARTS``).
+    """
+    summary = {
+        "Tickets": int(kpi["Tickets"].sum()) if not kpi.empty else 0,
+        "Drivers": int(len(kpi)),
+        "Median AHT (min)": round(float(kpi["Median_AHT"].median()), 1) if not kpi.empty else 0.0,
+    }
+    charts = charts or PDF_CHARTS
+    if charts not in ("vector", "plotly"):
+        raise ValueError(f"Unknown chart engine {charts!r} (expected vector or plotly)")
+    bar, value = (_draw_top_bar, _draw_cost_value) if charts == "vector" else (_plot_top_bar, _plot_cost_value)
+    return export_pdf(summary, bar(top.rename(columns={"Driver": "driver"})), value(roi_df), roi_df)
+
+def summary_pdf(kpis: pd.DataFrame, aht: float, charts: str = None) -> bytes:
+    """The /api/export/pdf one-pager from a ``driver_kpis``-shaped table and an AHT estimate."""
+    kpi = kpis.rename(columns={"driver": "Driver"})
+    top = kpi.sort_values("Tickets", ascending=False).head(10)
+    # Generate dummy ROI to satisfy function inputs if needed
+    roi_df = pd.DataFrame({
+        "Driver": top["Driver"],
+        "Tickets": top["Tickets"],
+        "AHT_min": aht,
+        "Annualized_Savings_$": (top["Tickets"] * aht * 60 * 1.0)  # placeholder
+    })
+    return build_pdf(kpi, top, pd.DataFrame(), roi_df, charts=charts)
+
+def _draw_chart(c, fig, x, y, width, height):
+    """Put a chart on the canvas: a reportlab Drawing as vectors, a plotly figure as PNG."""
+    from reportlab.graphics.shapes import Drawing
+    if isinstance(fig, Drawing):
+        from reportlab.graphics import renderPDF
+        renderPDF.draw(fig, c, x, y)
+        return
+    from reportlab.lib.utils import ImageReader
+    png = fig.to_image(format="png", scale=2)
+    c.drawImage(ImageReader(io.BytesIO(png)), x, y, width=width, height=height, preserveAspectRatio=True, mask='auto')
+
 def export_pdf(summary: dict, top_bar_fig, value_fig, roi_df: pd.DataFrame) -> bytes:
-    # export plots to PNG in-memory
-    top_png = top_bar_fig.to_image(format="png", scale=2)
-    val_png = value_fig.to_image(format="png", scale=2)
+    """The charts may be reportlab Drawings (``_bar_drawing``) or plotly figures."""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.pdfgen import canvas
 
     buf = io.BytesIO()
     c = canvas.Canvas(buf, pagesize=A4)
@@ -67,9 +157,9 @@ def export_pdf(summary: dict, top_bar_fig, value_fig, roi_df: pd.DataFrame) -> b
 
     # charts
     y -= 6
-    c.drawImage(ImageReader(io.BytesIO(top_png)), 24, y-200, width=W-48, height=200, preserveAspectRatio=True, mask='auto')
+    _draw_chart(c, top_bar_fig, 24, y-200, W-48, 200)
     y -= 210
-    c.drawImage(ImageReader(io.BytesIO(val_png)), 24, y-200, width=W-48, height=200, preserveAspectRatio=True, mask='auto')
+    _draw_chart(c, value_fig, 24, y-200, W-48, 200)
     c.showPage()
 
     # top ROI table (first 25 rows)
@@ -0,0 +1,110 @@
+from collections import deque
+import numpy as np, pandas as pd
+from typing import Dict, List
+
+OTHER = "Other"
+
+def _ahocorasick():
+    try:
+        import ahocorasick
+        return ahocorasick
+    except Exception:
+        return None
+
+class RuleMatcher:
+    """All keywords of a rule set compiled into one multi-pattern matcher.
+
+    Each keyword maps to the index of the first rule that lists it, so the
+    lowest index found anywhere in a text is exactly the rule the old
+    ``for rule in rules: if any(k in t ...)`` loop would have picked.
+    Uses pyahocorasick when installed, otherwise a pure-Python Aho-Corasick
+    automaton in which every state already knows the best (lowest) rule
+    index reachable through its output links.
+    """
+
+    def __init__(self, rules: List[Dict], backend: str = "auto"):
+        self.names = [str(r["name"]) for r in rules]
+        self.priority: Dict[str, int] = {}
+        for i, rule in enumerate(rules):
+            for k in rule.get("keywords") or []:
+                self.priority.setdefault(str(k), i)
+        self._empty_kw = "" in self.priority
+        kws = [k for k in self.priority if k]
+        ac = _ahocorasick() if backend in ("auto", "ahocorasick") else None
+        if backend == "ahocorasick" and ac is None:
+            raise ImportError("pyahocorasick is not installed")
+        self.backend = "ahocorasick" if ac is not None else "python"
+        self._automaton = None
+        self._goto = None
+        if not kws:
+            return
+        if ac is not None:
+            A = ac.Automaton()
+            for k in kws:
+                A.add_word(k, self.priority[k])
+            A.make_automaton()
+            self._automaton = A
+        else:
+            self._build_python(kws)
+
+    def _build_python(self, kws):
+        miss = len(self.names)
+        goto, fail, best = [{}], [0], [miss]
+        for k in kws:
+            s = 0
+            for ch in k:
+                nxt = goto[s].get(ch)
+                if nxt is None:
+                    nxt = len(goto); goto[s][ch] = nxt
+                    goto.append({}); fail.append(0); best.append(miss)
+                s = nxt
+            best[s] = min(best[s], self.priority[k])
+        q = deque(goto[0].values())  # depth-1 states fail to the root
+        while q:
+            s = q.popleft()
+            for ch, nxt in goto[s].items():
+                f = fail[s]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f][ch] if ch in goto[f] else 0
+                best[nxt] = min(best[nxt], best[fail[nxt]])
+                q.append(nxt)
+        self._goto, self._fail, self._best = goto, fail, best
+
+    def first_rule(self, text: str) -> int:
+        """Index of the winning rule for one normalized text, or -1."""
+        # an empty keyword matches every text ("" in t is always True)
+        best = self.priority[""] if self._empty_kw else len(self.names)
+        if self._automaton is not None:
+            for _, p in self._automaton.iter(text):
+                if p < best:
+                    best = p
+                    if best == 0: break
+        elif self._goto is not None:
+            goto, fail, out = self._goto, self._fail, self._best
+            s = 0
+            for ch in text:
+                while s and ch not in goto[s]:
+                    s = fail[s]
+                s = goto[s].get(ch, 0)
+                if out[s] < best:
+                    best = out[s]
+                    if best == 0: break
+        return best if best < len(self.names) else -1
+
+    def label(self, texts: pd.Series, default: str = OTHER) -> pd.Series:
+        """Label a whole column of normalized texts in one pass.
+
+        Duplicate texts (very common in ticket exports) are matched once.
+        """
+        codes, uniques = pd.factorize(texts.fillna("").astype(str), sort=False)
+        hits = np.fromiter((self.first_rule(t) for t in uniques), dtype=np.int64, count=len(uniques))
+        names = np.array(self.names + [default], dtype=object)
+        idx = np.where(hits < 0, len(self.names), hits)
+        out = names[idx][codes] if len(codes) else np.array([], dtype=object)
+        return pd.Series(out, index=texts.index, dtype=object)
+
+def compile_rules(rules, backend: str = "auto") -> RuleMatcher:
+    if isinstance(rules, RuleMatcher):
+        return rules
+    return RuleMatcher(rules, backend=backend)
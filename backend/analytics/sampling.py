@@ -0,0 +1,95 @@
+from itertools import islice
+from typing import Dict, List, Sequence
+import numpy as np
+
+SAMPLE_K = 12     # examples per cluster in an LLM prompt
+POOL = 4          # MMR candidates per pick: the POOL * k tickets nearest the centroid
+DIVERSITY = 0.3   # MMR weight of "unlike the examples already picked"
+DUPLICATE = 0.999 # cosine at which a ticket repeats one already picked
+
+def _distinct_nearest(V: np.ndarray, sim: np.ndarray, m: int) -> np.ndarray:
+    """Positions of the *m* rows of *V* most similar to the centroid (*sim*), identical
+    rows once, most similar first. Partial sorts only: the window doubles while
+    duplicates leave it short of *m* distinct rows."""
+    n, size = len(sim), m
+    while True:
+        top = np.argpartition(-sim, size - 1)[:size] if size < n else np.arange(n)
+        top = top[np.lexsort((top, -sim[top]))]
+        keys = np.ascontiguousarray(V[top].round(6) + 0.0)  # + 0.0: -0.0 and 0.0 hash alike
+        first: Dict[bytes, int] = {}
+        for i, row in zip(top.tolist(), keys):
+            first.setdefault(row.tobytes(), i)
+        if len(first) >= m or size >= n:
+            return np.fromiter(first.values(), dtype=np.intp, count=len(first))[:m]
+        size *= 2
+
+def representatives(Xs, labels, k: int = SAMPLE_K, pool: int = POOL,
+                    diversity: float = DIVERSITY) -> Dict[int, np.ndarray]:
+    """Row positions of up to *k* representative members of every cluster (label >= 0).
+
+    *Xs* are the clustering embeddings (``ctx["Xs"]`` of ``run_clustering``).
+    Per cluster, the ``pool * k`` members most similar (cosine) to the
+    centroid are found with partial sorts; max-marginal-relevance then
+    picks from them, trading closeness to the centroid against similarity
+    to the examples already picked. Identical embeddings count once and
+    near-duplicates of a picked ticket come only after every other
+    candidate. Positions come most representative first; the result is
+    deterministic.
+    """
+    Xs = np.asarray(Xs)
+    labels = np.asarray(labels)
+    order = np.argsort(labels, kind="stable")
+    cuts = np.flatnonzero(np.diff(labels[order])) + 1
+    out: Dict[int, np.ndarray] = {}
+    for members in np.split(order, cuts) if len(order) else []:
+        c = int(labels[members[0]])
+        if c < 0:
+            continue
+        V = Xs[members].astype(float)
+        norms = np.linalg.norm(V, axis=1, keepdims=True)
+        V /= np.where(norms > 0, norms, 1.0)
+        centroid = V.mean(axis=0)
+        sim = V @ (centroid / (np.linalg.norm(centroid) or 1.0))
+        cand = _distinct_nearest(V, sim, pool * k)
+        rel, C = sim[cand], V[cand]
+        picked = [0]
+        redundancy = C @ C[0]
+        for _ in range(min(k, len(cand)) - 1):
+            score = (1 - diversity) * rel - diversity * redundancy
+            score[redundancy >= DUPLICATE] -= 10.0  # repeats only once everything else is picked
+            score[picked] = -np.inf
+            j = int(np.argmax(score))
+            picked.append(j)
+            np.maximum(redundancy, C @ C[j], out=redundancy)
+        out[c] = members[cand[picked]]
+    return out
+
+def cluster_examples(texts: Sequence, Xs, labels, k: int = SAMPLE_K, **kw) -> Dict[int, List]:
+    """``{cluster label: representative texts}`` (see :func:`representatives`)."""
+    texts = list(texts) if not hasattr(texts, "iloc") else texts.iloc
+    return {c: [texts[i] for i in pos] for c, pos in representatives(Xs, labels, k, **kw).items()}
+
+def pick_examples(texts: Sequence, k: int = SAMPLE_K, width: int = 280) -> List[str]:
+    """The first *k* non-blank texts, trimmed to *width* (callers pass representatives first)."""
+    return [t[:width] for t in islice((t for t in texts if isinstance(t, str) and t.strip()), k)]
+
+def spread_examples(texts: Sequence, k: int = SAMPLE_K, width: int = 280) -> List[str]:
+    """*k* non-blank texts evenly spaced over *texts* (deterministic), trimmed to *width*.
+
+    For raw cluster members in file order; representative examples
+    (:func:`cluster_examples`) go through :func:`pick_examples` instead.
+    """
+    texts = [t for t in texts if isinstance(t, str) and t.strip()]
+    if len(texts) > k:
+        texts = [texts[i] for i in np.linspace(0, len(texts) - 1, k).round().astype(int)]
+    return [t[:width] for t in texts]
+
+def joined_prefix(texts: Sequence, limit: int = 50000, sep: str = " ") -> str:
+    """``sep.join(texts)[:limit]`` without joining more texts than the limit needs."""
+    parts, size = [], 0
+    for t in texts:
+        parts.append(t)
+        size += len(t) + len(sep)
+        if size >= limit:
+            break
+    return sep.join(parts)[:limit]
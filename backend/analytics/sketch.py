@@ -0,0 +1,116 @@
+import json, math, os, random
+from typing import Iterable, List, Optional, Sequence
+import numpy as np
+
+# Target normalized rank error of the AHT quantiles (0.01 = P50 within the
+# 49th-51st percentile); sets the sketch size k.
+DEFAULT_ERROR = float(os.getenv("DWPNXT_QUANTILE_ERROR", "0.01"))
+
+def k_for_error(eps: float) -> int:
+    """Smallest k whose (single-quantile, ~99% confidence) rank error is <= *eps*.
+
+    Empirical KLL fit eps ~ 1.854 / k**0.9657 (as published for Apache
+    DataSketches); k=200 gives ~1.3%.
+    """
+    if not 0 < eps < 1:
+        raise ValueError("eps must be in (0, 1)")
+    return max(8, int(math.ceil((1.854 / eps) ** (1 / 0.9657))))
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang & Liberty, 2016).
+
+    Values are kept in a stack of compactors; compacting level ``h`` sorts
+    it and promotes every other item (random offset) to level ``h+1``,
+    where each item stands for ``2**(h+1)`` inputs. Memory stays
+    ``O(k)``; two sketches merge by concatenating their levels, so partial
+    sketches from chunks or worker processes combine into one.
+    Until the first compaction the sketch is exact.
+    """
+
+    def __init__(self, k: Optional[int] = None, seed: Optional[int] = None, eps: Optional[float] = None):
+        self.k = int(k) if k else k_for_error(eps or DEFAULT_ERROR)
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.levels) - h - 1
+        return max(2, int(np.ceil(self.k * (2.0 / 3.0) ** depth)))
+
+    def _size(self) -> int:
+        return sum(len(lv) for lv in self.levels)
+
+    def _max_size(self) -> int:
+        return sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def _compress(self):
+        while self._size() >= self._max_size():
+            for h, lv in enumerate(self.levels):
+                if len(lv) >= self._capacity(h):
+                    if h + 1 >= len(self.levels):
+                        self.levels.append(np.empty(0))
+                    lv = np.sort(lv)
+                    keep = lv[-1:] if len(lv) % 2 else lv[:0]
+                    pair = lv[:-1] if len(lv) % 2 else lv
+                    up = pair[self._rng.randint(0, 1)::2]
+                    self.levels[h] = keep
+                    self.levels[h + 1] = np.concatenate([self.levels[h + 1], up])
+                    break
+
+    def update(self, values: Iterable[float]) -> "KLLSketch":
+        """Add one value or an array of values (NaNs are ignored)."""
+        arr = np.atleast_1d(np.asarray(values, dtype=float))
+        arr = arr[~np.isnan(arr)]
+        if arr.size:
+            self.levels[0] = np.concatenate([self.levels[0], arr])
+            self.n += int(arr.size)
+            self._compress()
+        return self
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, lv in enumerate(other.levels):
+            if len(lv):
+                self.levels[h] = np.concatenate([self.levels[h], lv])
+        self.n += other.n
+        self._compress()
+        return self
+
+    @property
+    def exact(self) -> bool:
+        return len(self.levels) == 1 or not any(len(lv) for lv in self.levels[1:])
+
+    @property
+    def error(self) -> float:
+        """Approximate normalized rank error bound for this k."""
+        return 1.854 / self.k ** 0.9657
+
+    def quantiles(self, qs: Sequence[float]) -> List[float]:
+        if self.n == 0:
+            return [float("nan")] * len(qs)
+        if self.exact:
+            return [float(v) for v in np.quantile(self.levels[0], qs)]
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lv), 2.0 ** h) for h, lv in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cum = items[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, np.asarray(qs, dtype=float) * cum[-1], side="left")
+        return [float(items[min(int(i), len(items) - 1)]) for i in idx]
+
+    def quantile(self, q: float) -> float:
+        return self.quantiles([q])[0]
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def to_json(self) -> str:
+        return json.dumps({"k": self.k, "n": self.n, "levels": [lv.tolist() for lv in self.levels]})
+
+    @classmethod
+    def from_json(cls, s: str) -> "KLLSketch":
+        d = json.loads(s)
+        sk = cls(k=d["k"])
+        sk.n = int(d["n"])
+        sk.levels = [np.asarray(lv, dtype=float) for lv in d["levels"]] or [np.empty(0)]
+        return sk
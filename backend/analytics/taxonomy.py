@@ -1,6 +1,7 @@
 import yaml, re
 from dataclasses import dataclass
-from typing import List, Tuple
+from typing import Dict, List, Sequence, Tuple, Union
+import numpy as np, pandas as pd
 
 @dataclass
 class TaxEntry:
@@ -20,38 +21,134 @@ NETWORK_AP_PATTERNS = [r"access point", r"\bap\b", r"wlc", r"wireless controller
 ACCESS_PROV_PATTERNS = [r"add to group", r"request access", r"enablement", r"entitlement", r"grant access", r"provision"]
 GENERIC_WEAK = {"access"}  # downweight generic token
 
-def match_taxonomy(text: str, entries: List[TaxEntry]) -> Tuple[str, float]:
-    t = (text or "").lower()
-    phrase_hits = {e.name:0 for e in entries}
-    token_hits  = {e.name:0 for e in entries}
-    for e in entries:
-        for syn in e.synonyms:
-            if " " in syn:
-                if syn in t:
-                    phrase_hits[e.name] += 3
+_WORD = re.compile(r"\w+")
+
+class TaxonomyIndex:
+    """The taxonomy compiled once for scoring many tickets.
+
+    Scores are exactly those of the per-synonym ``re.search`` / substring
+    scan it replaces (phrase +3, word +1, generic word +0.25, then the bias
+    rules), but a ticket costs one pass over its own tokens plus one regex
+    scan, whatever the size of the taxonomy:
+
+    * single-word synonyms (``\\b``-bounded) live in a token -> entries
+      index; a synonym like ``sign-in`` is found through its first token
+      and checked in place, and the rare one that starts or ends with a
+      non-word character keeps its own compiled regex;
+    * multi-word synonyms (plain substrings) form one lookahead alternation,
+      longest first, so every start position reports its longest phrase and
+      the phrases that are prefixes of it stand for the shorter matches;
+    * each bias pattern list is one precompiled alternation.
+    """
+
+    def __init__(self, entries: Sequence[TaxEntry]):
+        self.names: List[str] = list(dict.fromkeys(e.name for e in entries))
+        slot = {n: i for i, n in enumerate(self.names)}
+        self.tokens: Dict[str, List[Tuple[int, float]]] = {}
+        self.lead: Dict[str, List[Tuple[str, List[Tuple[int, float]]]]] = {}
+        self.other: List[Tuple["re.Pattern", List[Tuple[int, float]]]] = []
+        phrases: Dict[str, List[int]] = {}
+        words: Dict[str, List[Tuple[int, float]]] = {}
+        for e in entries:
+            for syn in e.synonyms:
+                if " " in syn:
+                    phrases.setdefault(syn, []).append(slot[e.name])
+                else:
+                    words.setdefault(syn, []).append((slot[e.name], 1 if syn not in GENERIC_WEAK else 0.25))
+        for syn, hits in words.items():
+            runs = _WORD.findall(syn)
+            if runs and runs[0] == syn:
+                self.tokens[syn] = hits
+            elif runs and _WORD.match(syn) and _WORD.match(syn[-1]):
+                self.lead.setdefault(runs[0], []).append((syn, hits))
             else:
-                if re.search(r"\b"+re.escape(syn)+r"\b", t):
-                    token_hits[e.name] += 1 if syn not in GENERIC_WEAK else 0.25
-
-    def has_any(pats): 
-        return any(re.search(p, t) for p in pats)
-
-    scores = {name: phrase_hits[name] + token_hits[name] for name in phrase_hits}
-
-    # Bias rules
-    if has_any(NETWORK_AP_PATTERNS):
-        for name in list(scores.keys()):
-            if "Network Hardware" in name or "Interface" in name:
-                scores[name] += 5
-            if "Access Provisioning" in name:
-                scores[name] -= 2
-    if has_any(ACCESS_PROV_PATTERNS):
-        for name in list(scores.keys()):
-            if "Access Provisioning" in name:
-                scores[name] += 4
-
-    best = max(scores.items(), key=lambda kv: kv[1]) if scores else ("Other",0.0)
-    return (best[0], float(best[1]))
+                self.other.append((re.compile(r"\b" + re.escape(syn) + r"\b"), hits))
+        order = sorted(phrases, key=len, reverse=True)
+        self.phrase_hits = phrases
+        # phrase -> itself and every phrase that is a prefix of it
+        self.prefixes = {p: [q for q in order if p.startswith(q)] for p in order}
+        self._phrase_re = re.compile("(?=(" + "|".join(map(re.escape, order)) + "))") if order else None
+        self._network_re = re.compile("|".join(f"(?:{p})" for p in NETWORK_AP_PATTERNS))
+        self._access_re = re.compile("|".join(f"(?:{p})" for p in ACCESS_PROV_PATTERNS))
+        self._net_up = [i for i, n in enumerate(self.names) if "Network Hardware" in n or "Interface" in n]
+        self._prov = [i for i, n in enumerate(self.names) if "Access Provisioning" in n]
+
+    def scores(self, text: str) -> List[float]:
+        """Per-name scores of one ticket (in ``names`` order)."""
+        t = (text or "").lower()
+        scores = [0] * len(self.names)
+        seen = set()
+        lead = self.lead
+        for m in _WORD.finditer(t):
+            tok = m.group()
+            hits = self.tokens.get(tok)
+            if hits is not None and tok not in seen:
+                seen.add(tok)
+                for i, w in hits:
+                    scores[i] += w
+            for syn, hits in lead.get(tok, ()):
+                end = m.start() + len(syn)
+                if syn not in seen and t.startswith(syn, m.start()) and not _WORD.match(t, end, end + 1):
+                    seen.add(syn)
+                    for i, w in hits:
+                        scores[i] += w
+        for rx, hits in self.other:
+            if rx.search(t):
+                for i, w in hits:
+                    scores[i] += w
+        if self._phrase_re is not None:
+            found = set()
+            for m in self._phrase_re.finditer(t):
+                longest = m.group(1)
+                if longest not in found:
+                    found.update(self.prefixes[longest])
+            for p in found:
+                for i in self.phrase_hits[p]:
+                    scores[i] += 3
+        if self._network_re.search(t):
+            for i in self._net_up:
+                scores[i] += 5
+            for i in self._prov:
+                scores[i] -= 2
+        if self._access_re.search(t):
+            for i in self._prov:
+                scores[i] += 4
+        return scores
+
+    def match(self, text: str) -> Tuple[str, float]:
+        if not self.names:
+            return ("Other", 0.0)
+        scores = self.scores(text)
+        best = max(range(len(scores)), key=scores.__getitem__)  # first of equal maxima
+        return (self.names[best], float(scores[best]))
+
+    def match_series(self, texts: pd.Series) -> pd.DataFrame:
+        """``label`` and ``score`` columns for a whole column of texts (duplicates scored once)."""
+        codes, uniques = pd.factorize(texts.fillna("").astype(str), sort=False)
+        res = [self.match(t) for t in uniques]
+        labels = np.array([r[0] for r in res], dtype=object)
+        scores = np.fromiter((r[1] for r in res), dtype=float, count=len(res))
+        return pd.DataFrame({"label": labels[codes] if len(codes) else np.array([], dtype=object),
+                             "score": scores[codes] if len(codes) else np.array([], dtype=float)},
+                            index=texts.index)
+
+_compiled: Tuple[object, TaxonomyIndex] = (None, None)
+
+def compile_taxonomy(entries: Union[TaxonomyIndex, Sequence[TaxEntry]]) -> TaxonomyIndex:
+    """A :class:`TaxonomyIndex` for *entries*; the last list compiled is reused while the
+    same list object is passed (pass a new list, or an index, after editing entries)."""
+    global _compiled
+    if isinstance(entries, TaxonomyIndex):
+        return entries
+    src, index = _compiled
+    if src is not entries:
+        index = TaxonomyIndex(entries)
+        _compiled = (entries, index)
+    return index
+
+def match_taxonomy(text: str, entries: Union[TaxonomyIndex, List[TaxEntry]]) -> Tuple[str, float]:
+    """Best taxonomy entry for *text* and its score (see :class:`TaxonomyIndex`)."""
+    return compile_taxonomy(entries).match(text)
 
 # ---------- Backwards compatibility shim ----------
 def map_text_to_taxonomy(text, entries):
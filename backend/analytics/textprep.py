@@ -0,0 +1,69 @@
+import re
+import pandas as pd
+
+# Column added by prepare_text(); downstream steps reuse it instead of
+# re-cleaning the raw text.
+CLEAN_COL = "text_clean"
+DERIVED_COLS = (CLEAN_COL,)
+
+_ARTIFACT = r"_x[0-9a-f]{4}_"      # excel escapes like _x000D_ (after lowercasing)
+_NON_ALNUM = r"[^a-z0-9\s]"
+_SPACES = r"\s+"
+
+def string_dtype():
+    """``string[pyarrow]`` for text columns, or ``None`` (plain object) without pyarrow."""
+    try:
+        import pyarrow  # noqa: F401
+        return pd.StringDtype("pyarrow")
+    except ImportError:
+        return None
+
+def clean_text(s) -> str:
+    """Scalar form of :func:`clean_series` for one-off strings."""
+    s = "" if s is None else str(s)
+    s = re.sub(_ARTIFACT, " ", s.lower())
+    s = re.sub(_NON_ALNUM, " ", s)
+    return re.sub(_SPACES, " ", s).strip()
+
+def clean_series(texts: pd.Series) -> pd.Series:
+    """Lowercase, drop excel artifacts and punctuation, collapse whitespace.
+
+    Runs the vectorized string kernels once per distinct value (pyarrow's
+    when available) and broadcasts the result back to every row.
+    """
+    codes, uniques = pd.factorize(texts.fillna("").astype(str), sort=False)
+    u = pd.Series(uniques, dtype=string_dtype())
+    u = (u.str.lower()
+          .str.replace(_ARTIFACT, " ", regex=True)
+          .str.replace(_NON_ALNUM, " ", regex=True)
+          .str.replace(_SPACES, " ", regex=True)
+          .str.strip())
+    return pd.Series(u.to_numpy(dtype=object)[codes], index=texts.index, dtype=object)
+
+def _first_col(df: pd.DataFrame, *names):
+    cols = {str(c).lower().strip(): c for c in df.columns}
+    for n in names:
+        if n in cols: return cols[n]
+    return None
+
+def raw_text(df: pd.DataFrame) -> pd.Series:
+    """The ticket text: ``text`` if present, else short_description + description."""
+    if "text" in df.columns:
+        return df["text"].fillna("").astype(str)
+    parts = []
+    for names in (("short_description", "short description"), ("description",)):
+        c = _first_col(df, *names)
+        parts.append(df[c].fillna("").astype(str) if c is not None else pd.Series("", index=df.index))
+    return parts[0] + " " + parts[1]
+
+def prepare_text(df: pd.DataFrame) -> pd.DataFrame:
+    """Add the cleaned text column to *df* in place, once per upload."""
+    if CLEAN_COL not in df.columns:
+        df[CLEAN_COL] = clean_series(raw_text(df))
+    return df
+
+def clean_text_of(df: pd.DataFrame) -> pd.Series:
+    """Cleaned text for *df*, reusing :data:`CLEAN_COL` when already prepared."""
+    if CLEAN_COL in df.columns:
+        return df[CLEAN_COL]
+    return clean_series(raw_text(df))
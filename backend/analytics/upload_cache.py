@@ -0,0 +1,89 @@
+import hashlib, os, threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import BinaryIO, Dict, Optional
+import pandas as pd
+
+DEFAULT_BUDGET_MB = float(os.getenv("DWPNXT_CACHE_MB", "512"))
+_BLOCK = 1 << 20
+
+def fingerprint(fileobj: BinaryIO, salt: str = "") -> str:
+    """sha256 of *salt* and the whole upload, read in 1 MB blocks; the position is restored.
+
+    *salt* names whatever else the analysis depends on (the rules digest),
+    so a config change gives the same file a new key.
+    """
+    pos = fileobj.tell()
+    h = hashlib.sha256(salt.encode())
+    for block in iter(lambda: fileobj.read(_BLOCK), b""):
+        h.update(block)
+    fileobj.seek(pos)
+    return h.hexdigest()
+
+def frame_nbytes(df: Optional[pd.DataFrame]) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum()) if df is not None else 0
+
+@dataclass
+class Analysis:
+    """One parsed + labeled upload and everything derived from it.
+
+    ``df`` is the labeled ticket table; it is ``None`` when the upload was
+    too large to keep within the cache budget (the aggregates still are).
+    """
+    id: str
+    payload: Dict
+    kpis: pd.DataFrame
+    df: Optional[pd.DataFrame] = None
+    aht_estimate: float = 8.0
+    nbytes: int = field(default=0)
+
+    def __post_init__(self):
+        if not self.nbytes:
+            self.nbytes = frame_nbytes(self.df) + frame_nbytes(self.kpis)
+
+class AnalysisCache:
+    """Thread-safe LRU of :class:`Analysis` objects bounded by memory."""
+
+    def __init__(self, max_mb: float = DEFAULT_BUDGET_MB):
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._items: "OrderedDict[str, Analysis]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Analysis]:
+        with self._lock:
+            a = self._items.get(key)
+            if a is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return a
+
+    def put(self, a: Analysis) -> Analysis:
+        if a.nbytes > self.max_bytes and a.df is not None:
+            # too big to keep the rows: remember only the aggregates
+            a = replace(a, df=None, nbytes=0)
+        with self._lock:
+            old = self._items.pop(a.id, None)
+            if old is not None:
+                self.nbytes -= old.nbytes
+            self._items[a.id] = a
+            self.nbytes += a.nbytes
+            while self.nbytes > self.max_bytes and len(self._items) > 1:
+                _, ev = self._items.popitem(last=False)
+                self.nbytes -= ev.nbytes
+        return a
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self) -> Dict:
+        return {"entries": len(self._items), "bytes": self.nbytes, "max_bytes": self.max_bytes,
+                "hits": self.hits, "misses": self.misses}
+
+cache = AnalysisCache()
@@ -1,92 +1,124 @@
 import pandas as pd
+import numpy as np
 from typing import Tuple, Dict, Optional
 import re
+from contextlib import contextmanager
+from analytics.dates import coalesce, parse
+from analytics.ingest import TRUTHY
+from analytics.textprep import string_dtype
 
 REQUIRED_ANY = [["short_description"], ["description"]]
 OPTIONAL_NUMERIC = ["u_aht_minutes","AHT","avg_handle_time","reopen_count"]
 OPTIONAL_BOOL = ["sla_breached","SLA breach","SLA Breach"]
+AHT_COLUMNS = ["u_aht_minutes","AHT","avg_handle_time"]
 DATE_HINTS = re.compile(r"(open|create|log|start|request|fulfill|resolve|close)", re.I)
 
-def _first_existing(cands, df):
-    for c in cands:
-        if c in df.columns: return c
-    return None
+def _prep(df: Optional[pd.DataFrame], mapping: Optional[Dict]) -> pd.DataFrame:
+    # a shallow copy: renames and new columns never touch (or copy) the caller's data
+    df = df.copy(deep=False) if df is not None else pd.DataFrame()
+    if mapping:
+        from analytics.mapping import apply_mapping
+        df = apply_mapping(df, mapping)
+    return _parse_dates(df)
 
-def _norm_text_cols(df):
-    sd = _first_existing(REQUIRED_ANY[0], df) or "short_description"
-    de = _first_existing(REQUIRED_ANY[1], df) or "description"
-    if sd not in df.columns: df[sd] = ""
-    if de not in df.columns: df[de] = ""
-    df.rename(columns={sd:"short_description", de:"description"}, inplace=True)
-    df["short_description"] = df["short_description"].astype(str).fillna("")
-    df["description"] = df["description"].astype(str).fillna("")
-    return df
+def _text_col(df, name, dtype):
+    # NaN -> "" before the cast (astype(str) would turn it into "nan")
+    if name not in df.columns:
+        return pd.Series("", index=df.index, dtype=dtype)
+    col = df[name]
+    return col.fillna("").astype(str) if dtype is None else col.astype(dtype).fillna("")
+
+def _as_bool(col: pd.Series) -> pd.Series:
+    """yes/no, true/false, 1/0 (any case) as the nullable ``boolean`` dtype, one lookup per distinct value."""
+    if col.dtype == bool or col.dtype == "boolean":
+        return col.astype("boolean")
+    codes, uniques = pd.factorize(col, sort=False)
+    looked = pd.Series(uniques).astype(str).str.strip().str.lower().map(TRUTHY).astype("boolean")
+    # code -1 (missing) -> <NA>
+    return pd.Series(looked.array.take(codes, allow_fill=True), index=col.index)
+
+@contextmanager
+def _peak_mb(notes: Dict, key: str = "peak_mb"):
+    """Record in ``notes[key]`` the peak memory allocated inside the block (tracemalloc:
+    Python objects and NumPy buffers; Arrow buffers come from their own pool)."""
+    import tracemalloc
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        peak = tracemalloc.get_traced_memory()[1]
+        if started:
+            tracemalloc.stop()
+        notes[key] = round(max(0, peak - base) / (1 << 20), 1)
 
 def _parse_dates(df):
-    # opened_dt
+    # one explicit format per column, inferred from a sample (analytics.dates)
     if "opened_dt" in df.columns:
-        df["opened_dt"] = pd.to_datetime(df["opened_dt"], errors="coerce")
+        df["opened_dt"] = parse(df["opened_dt"])
     else:
-        date_cols = [c for c in df.columns if DATE_HINTS.search(c)]
-        best = None
-        for c in date_cols:
-            s = pd.to_datetime(df[c], errors="coerce")
-            if s.notna().sum() > 0:
-                best = s if best is None else s.combine_first(best)
+        best = coalesce(df, [c for c in df.columns if DATE_HINTS.search(c)])
         df["opened_dt"] = best if best is not None else pd.NaT
-    # resolved_dt
     if "resolved_dt" in df.columns:
-        df["resolved_dt"] = pd.to_datetime(df["resolved_dt"], errors="coerce")
+        df["resolved_dt"] = parse(df["resolved_dt"])
     else:
-        cands = [c for c in df.columns if re.search(r"(resolve|close|complete)", c, re.I)]
-        best = None
-        for c in cands:
-            s = pd.to_datetime(df[c], errors="coerce")
-            if s.notna().sum() > 0:
-                best = s if best is None else s.combine_first(best)
+        best = coalesce(df, [c for c in df.columns if re.search(r"(resolve|close|complete)", c, re.I)])
         df["resolved_dt"] = best if best is not None else pd.NaT
     return df
 
 def validate_and_normalize(inc: pd.DataFrame, req: pd.DataFrame, mapping: Optional[Dict]=None) -> Tuple[pd.DataFrame, Dict]:
-    notes = {}
-    inc = inc.copy() if inc is not None else pd.DataFrame()
-    req = req.copy() if req is not None else pd.DataFrame()
+    """Incidents and requests as one normalized ticket table, plus notes.
 
-    if mapping:
-        from analytics.mapping import apply_mapping
-        inc = apply_mapping(inc, mapping)
-        req = apply_mapping(req, mapping)
+    The inputs are never copied or modified: *mapping* renames columns of
+    shallow copies, dates are parsed per input (their formats may differ),
+    the two are concatenated once and every other coercion replaces a
+    column of the combined frame. ``source`` is categorical, the flags are
+    nullable ``boolean``, the text columns ``string[pyarrow]`` (when
+    available). ``notes["peak_mb"]``: peak memory allocated during this call.
+    """
+    notes = {}
+    with _peak_mb(notes):
+        df = _normalize(inc, req, mapping, notes)
+    return df, notes
 
-    def prep(df, source):
-        df = df.copy()
-        df["source"] = source
-        df = _norm_text_cols(df)
-        for c in OPTIONAL_NUMERIC:
-            if c in df.columns: df[c] = pd.to_numeric(df[c], errors="coerce")
-        for c in OPTIONAL_BOOL:
-            if c in df.columns:
-                df[c] = (df[c].astype(str).str.strip().str.lower()
-                         .map({"true":True,"yes":True,"y":True,"1":True,"false":False,"no":False,"n":False,"0":False}))
-        df = _parse_dates(df)
-        return df
+def _normalize(inc, req, mapping, notes: Dict) -> pd.DataFrame:
+    frames = [_prep(inc, mapping), _prep(req, mapping)]
+    sizes = [len(f) for f in frames]
+    used = [f for f in frames if len(f.columns)]
+    if len(used) == 2:
+        df = pd.concat(used, ignore_index=True, sort=False, copy=False)
+    else:
+        df = (used[0] if used else frames[0]).copy(deep=False)
+        df.index = pd.RangeIndex(len(df))
+    df["source"] = pd.Categorical.from_codes(np.repeat([0, 1], sizes), categories=["INC", "REQ"])
 
-    incp = prep(inc, "INC"); reqp = prep(req, "REQ")
-    df = pd.concat([incp, reqp], ignore_index=True, sort=False)
+    for c in OPTIONAL_NUMERIC:
+        if c in df.columns: df[c] = pd.to_numeric(df[c], errors="coerce")
+    for c in OPTIONAL_BOOL:
+        if c in df.columns: df[c] = _as_bool(df[c])
+    for c in ("opened_dt", "resolved_dt"):
+        if not pd.api.types.is_datetime64_any_dtype(df[c]):
+            df[c] = pd.to_datetime(df[c], errors="coerce")
 
-    df["text"] = (df["short_description"].fillna("") + " " + df["description"].fillna("")).astype(str)
+    sdt = string_dtype()
+    for c in ("short_description", "description"):
+        df[c] = _text_col(df, c, sdt)
+    # element-wise arrow kernel on string[pyarrow] (str.cat goes through Python objects)
+    df["text"] = df["short_description"] + " " + df["description"]
 
     # prefer provided AHT; else derive from dates
-    provided = None
-    if any(c in df.columns for c in ["u_aht_minutes","AHT","avg_handle_time"]):
-        provided = pd.to_numeric(df[["u_aht_minutes","AHT","avg_handle_time"]].bfill(axis=1).iloc[:,0], errors="coerce")
-    derived = (df["resolved_dt"] - df["opened_dt"]).dt.total_seconds()/60.0
-    df["aht_min"] = provided.fillna(derived) if provided is not None else derived
-    df["aht_min"] = df["aht_min"].clip(lower=1, upper=480)
+    aht = (df["resolved_dt"] - df["opened_dt"]).dt.total_seconds()/60.0
+    for c in reversed([c for c in AHT_COLUMNS if c in df.columns]):
+        aht = df[c].fillna(aht)
+    df["aht_min"] = aht.clip(lower=1, upper=480)
 
     df["reopen_count_num"] = pd.to_numeric(df.get("reopen_count", None), errors="coerce")
     df["sla_breached_bool"] = df.get("sla_breached", None)
 
     notes["rows"] = len(df)
-    notes["empty_text_pct"] = round(float(df["text"].str.strip().eq("").mean())*100,2)
-
-    return df, notes
+    notes["empty_text_pct"] = round(float(df["text"].str.strip().eq("").mean())*100,2) if len(df) else 0.0
+    return df
@@ -1,6 +1,8 @@
+import os, tempfile
 from io import BytesIO
+from typing import Iterator, Optional
 import pandas as pd
-import xlsxwriter
+from analytics.textprep import DERIVED_COLS
 
 def _make_unique_columns(cols):
     seen = {}
@@ -15,64 +17,91 @@ def _make_unique_columns(cols):
             out.append(s)
     return out
 
-def _write_df(ws, df, start_row=0, start_col=0):
-    # header
-    for j, col in enumerate(df.columns, start=start_col):
-        ws.write(start_row, j, str(col))
-    # rows
-    for i, row in enumerate(df.itertuples(index=False), start=start_row+1):
-        for j, v in enumerate(row, start=start_col):
-            ws.write(i, j, "" if pd.isna(v) else v)
+EXCEL_MAX_ROWS = 1_048_576   # per worksheet, header included
+WRITE_CHUNK = 20_000         # rows converted to Python values at a time
 
-def build_processed_workbook(refined: pd.DataFrame) -> bytes:
-    # Copy & normalize
-    df = refined.copy()
-    # Final Driver column
-    if "final_driver" in df.columns and "Final Driver" not in df.columns:
-        df["Final Driver"] = df["final_driver"].astype(str)
-    if "Final Driver" not in df.columns and "driver" in df.columns:
-        df["Final Driver"] = df["driver"].astype(str)
-    if "Final Driver" not in df.columns:
-        df["Final Driver"] = "Other"
+def _cell_rows(df: pd.DataFrame):
+    """Rows of *df* as lists of xlsxwriter-ready values (NA -> None, tz dropped),
+    plus the indexes of the datetime columns."""
+    cols, date_idx = [], []
+    for j, (_, s) in enumerate(df.items()):
+        if pd.api.types.is_datetime64_any_dtype(s):
+            if getattr(s.dt, "tz", None) is not None:
+                s = s.dt.tz_localize(None)
+            date_idx.append(j)
+        cols.append(s.astype(object).where(s.notna(), None).tolist())
+    return zip(*cols), date_idx
 
+def _write_df(ws, df, start_row=0, start_col=0, date_fmt=None, header=True):
+    if header:
+        ws.write_row(start_row, start_col, [str(c) for c in df.columns])
+        start_row += 1
+    for a in range(0, len(df), WRITE_CHUNK):
+        rows, date_idx = _cell_rows(df.iloc[a:a + WRITE_CHUNK])
+        for i, row in enumerate(rows, start=start_row + a):
+            if date_idx:
+                row = list(row)
+                for j in date_idx:
+                    v, row[j] = row[j], None
+                    if v is not None:
+                        ws.write_datetime(i, start_col + j, v.to_pydatetime(), date_fmt)
+            ws.write_row(i, start_col, row)
+
+def data_table(refined: pd.DataFrame):
+    """The exported ticket table as (frame without copying the source columns, Final Driver, month)."""
+    # Normalize (internal text helper columns are not exported)
+    df = refined.drop(columns=[c for c in DERIVED_COLS if c in refined.columns])
+    # Final Driver column
+    if "Final Driver" in df.columns:
+        drv = df["Final Driver"]
+    elif "final_driver" in df.columns:
+        drv = df["final_driver"].astype(str)
+    elif "driver" in df.columns:
+        drv = df["driver"].astype(str)
+    else:
+        drv = pd.Series("Other", index=df.index)
     # Month column
     if "opened_dt" in df.columns:
         dt = pd.to_datetime(df["opened_dt"], errors="coerce")
-        df["_month"] = dt.dt.to_period("M").astype(str)
-        df["_month"] = df["_month"].fillna("Unknown")
+        month = dt.dt.to_period("M").astype(str)
+        month = month.where(dt.notna(), "Unknown")
     else:
-        df["_month"] = "Unknown"
-
+        month = pd.Series("Unknown", index=df.index)
+    df = df.assign(**{"Final Driver": drv, "_month": month})
     # De-dup columns to avoid Excel confusion
     df.columns = _make_unique_columns(df.columns)
+    return df, drv, month
+
+def write_processed_workbook(refined: pd.DataFrame, target, constant_memory: bool = False,
+                             max_rows: int = EXCEL_MAX_ROWS, include_data: bool = True,
+                             data_note: Optional[str] = None) -> None:
+    """Write the processed workbook to *target* (a path, or a file object).
+
+    ``constant_memory`` (path targets only) has xlsxwriter flush each row
+    to disk as soon as the next one starts, so memory stays flat however
+    many tickets are exported. Data beyond *max_rows* per sheet continues
+    on ``Data_2``, ``Data_3``, ... With ``include_data=False`` only the
+    summary sheets are written and *data_note* (where to get the ticket
+    table instead) goes on the Summary sheet.
+    """
+    import xlsxwriter
+    df, drv, month = data_table(refined)
 
     # Summaries (instead of Excel pivots)
-    drv = df["Final Driver"]
     by_driver = drv.value_counts(dropna=False).rename_axis("Final Driver").reset_index(name="Tickets")
-
     # Crosstab Driver x Month
-    # Find the actual columns after de-dup (case-insensitive)
-    def _find(name):
-        for c in df.columns:
-            if str(c).lower() == name.lower():
-                return c
-        for c in df.columns:
-            if name.lower() in str(c).lower():
-                return c
-        return None
-    fd_col = _find("Final Driver")
-    mo_col = _find("_month")
-
-    ct = pd.crosstab(df[fd_col], df[mo_col]).reset_index()
-    ct = ct.rename(columns={fd_col: "Final Driver"})
+    ct = pd.crosstab(drv.rename("Final Driver"), month.rename("_month")).reset_index()
 
     # Build workbook
-    out = BytesIO()
-    wb = xlsxwriter.Workbook(out, {'in_memory': True})
+    opts = {"constant_memory": True} if constant_memory and isinstance(target, str) else {"in_memory": True}
+    wb = xlsxwriter.Workbook(target, opts)
 
-    # Data sheet
-    ws_data = wb.add_worksheet("Data")
-    _write_df(ws_data, df)
+    # Data sheet(s)
+    date_fmt = wb.add_format({"num_format": "yyyy-mm-dd hh:mm"})
+    per_sheet = max_rows - 1
+    for k, a in enumerate(range(0, max(len(df), 1), per_sheet) if include_data else []):
+        ws_data = wb.add_worksheet("Data" if k == 0 else f"Data_{k + 1}")
+        _write_df(ws_data, df.iloc[a:a + per_sheet], date_fmt=date_fmt)
 
     # Summary sheets (driver counts and driver x month)
     ws_sum_drv = wb.add_worksheet("Summary_Drivers")
@@ -94,7 +123,35 @@ def build_processed_workbook(refined: pd.DataFrame) -> bytes:
 
     ws_dash = wb.add_worksheet("Summary")
     ws_dash.write(0, 0, "DWPNxt — Top Call Drivers")
+    if data_note:
+        ws_dash.write(1, 0, data_note)
     ws_dash.insert_chart('A3', chart, {'x_scale': 1.4, 'y_scale': 1.3})
 
     wb.close()
+
+def build_processed_workbook(refined: pd.DataFrame) -> bytes:
+    out = BytesIO()
+    write_processed_workbook(refined, out)
     return out.getvalue()
+
+def build_processed_workbook_file(refined: pd.DataFrame, dir: Optional[str] = None, **kw) -> str:
+    """Write the workbook in constant-memory mode to a temp file and return its path
+    (the caller streams and deletes it)."""
+    fd, path = tempfile.mkstemp(suffix=".xlsx", dir=dir)
+    os.close(fd)
+    try:
+        write_processed_workbook(refined, path, constant_memory=True, **kw)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+def iter_file(path: str, chunk_size: int = 1 << 20, delete: bool = True) -> Iterator[bytes]:
+    """Yield *path* in chunks (for a StreamingResponse), removing it afterwards."""
+    try:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(chunk_size), b""):
+                yield block
+    finally:
+        if delete:
+            os.remove(path)
@@ -0,0 +1,64 @@
+"""pytest-benchmark suite for report.driver_kpis (not collected by the default run;
+needs ``pip install -r requirements-dev.txt``).
+
+    pytest benchmarks/bench_kpis.py --benchmark-group-by=param:rows
+"""
+import sys
+from pathlib import Path
+import numpy as np, pandas as pd
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics.report import driver_kpis
+
+DRIVERS = 3000
+
+def legacy_driver_kpis(df: pd.DataFrame) -> pd.DataFrame:
+    # the groupby.apply implementation driver_kpis replaced, for comparison
+    d = df.copy()
+    d["driver"] = d["driver"].astype(str).fillna("Other")
+    gp = d.groupby("driver", dropna=False)
+    reopen_flag = d["reopen_count_num"].fillna(0).gt(0)
+    out = pd.DataFrame({
+        "Tickets": gp.size(),
+        "With_AHT": gp["aht_min"].apply(lambda s: s.notna().sum()),
+        "Median_AHT": gp["aht_min"].median(),
+        "SLA_Breach_%": gp["sla_breached_bool"].mean()*100,
+        "Reopen_Rate_%": gp["reopen_count_num"].apply(lambda s: reopen_flag.loc[s.index].mean()*100),
+    }).fillna(0).reset_index()
+    return out.sort_values("Tickets", ascending=False)
+
+def synth(rows, drivers=DRIVERS, seed=0):
+    rnd = np.random.default_rng(seed)
+    # Zipf-ish long tail: a few big drivers, thousands of small ones
+    weights = 1.0 / np.arange(1, drivers + 1)
+    names = np.array([f"Driver {i}" for i in range(drivers)], dtype=object)
+    aht = rnd.gamma(2.0, 6.0, rows)
+    aht[rnd.random(rows) < 0.15] = np.nan
+    return pd.DataFrame({
+        "driver": names[rnd.choice(drivers, rows, p=weights / weights.sum())],
+        "aht_min": aht,
+        "sla_breached_bool": rnd.random(rows) < 0.2,
+        "reopen_count_num": rnd.integers(0, 3, rows).astype(float),
+    })
+
+_frames = {}
+
+def frame(rows):
+    if rows not in _frames:
+        _frames[rows] = synth(rows)
+    return _frames[rows]
+
+@pytest.mark.parametrize("rows", [1_000, 100_000, 1_000_000])
+def test_driver_kpis(benchmark, rows):
+    df = frame(rows)
+    out = benchmark(driver_kpis, df)
+    assert int(out["Tickets"].sum()) == rows
+
+@pytest.mark.parametrize("rows", [1_000, 100_000])
+def test_legacy_driver_kpis(benchmark, rows):
+    df = frame(rows)
+    out = benchmark.pedantic(legacy_driver_kpis, args=(df,), rounds=1, iterations=1)
+    fast = driver_kpis(df).set_index("driver").sort_index()
+    pd.testing.assert_frame_equal(out.set_index("driver").sort_index(), fast, check_dtype=False)
@@ -0,0 +1,47 @@
+"""Cluster-labeling throughput against the local fake provider (offline).
+
+Compares one sequential call per cluster (the old best_label_for_cluster
+pattern) with LabelService at a given concurrency, with and without packing.
+
+    python benchmarks/bench_labeling.py --clusters 40 --latency 0.3 --concurrency 8 --pack 5
+"""
+import argparse, asyncio, sys, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "tests"))
+from analytics.label_service import LabelService, OpenAIProvider, parse_single, single_prompt
+from fake_provider import FakeProvider
+
+WORDS = ["vpn", "outlook", "printer", "teams", "laptop", "sap", "veeva", "mfa", "onedrive", "status"]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--clusters", type=int, default=40)
+    ap.add_argument("--latency", type=float, default=0.3, help="fake provider seconds per request")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--rps", type=float, default=50)
+    ap.add_argument("--pack", type=int, default=5)
+    a = ap.parse_args()
+    clusters = {i: [f"{WORDS[i % len(WORDS)]} ticket {j}" for j in range(12)] for i in range(a.clusters)}
+
+    with FakeProvider(delay=a.latency) as fp:
+        async def sequential():
+            p = OpenAIProvider(api_key="bench", base_url=fp.url + "/v1", concurrency=1, rate=0)
+            for texts in clusters.values():
+                parse_single(await p.complete(single_prompt(texts)))
+            await p.aclose()
+
+        async def service(pack):
+            p = OpenAIProvider(api_key="bench", base_url=fp.url + "/v1", concurrency=a.concurrency, rate=a.rps)
+            async with LabelService([p], pack=pack) as svc:
+                await svc.label_many(clusters)
+
+        for name, run in [("sequential", sequential), ("service", lambda: service(1)),
+                          (f"service pack={a.pack}", lambda: service(a.pack))]:
+            before = fp.requests
+            t0 = time.perf_counter(); asyncio.run(run()); dt = time.perf_counter() - t0
+            print(f"{name:18s} {dt:6.2f}s  {a.clusters / dt:7.1f} clusters/s  requests={fp.requests - before}")
+
+if __name__ == "__main__":
+    main()
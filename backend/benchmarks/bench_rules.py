@@ -0,0 +1,55 @@
+"""Compare the compiled RuleMatcher against the original per-row rule loop.
+
+    python benchmarks/bench_rules.py --rows 200000 --rules 300
+"""
+import argparse, random, sys, time
+from pathlib import Path
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics.rule_engine import RuleMatcher
+
+def loop_label(texts, rules):
+    out = []
+    for t in texts:
+        hit = None
+        for rule in rules:
+            if any(k in t for k in rule["keywords"]):
+                hit = rule["name"]; break
+        out.append(hit or "Other")
+    return out
+
+def synth(rows, n_rules, kw_per_rule=6, seed=42):
+    rnd = random.Random(seed)
+    vocab = [f"term{i}" for i in range(5000)] + ["password", "reset", "vpn", "outlook", "printer", "access", "status"]
+    rules = [{"name": f"Rule {i}", "keywords": [" ".join(rnd.sample(vocab, rnd.choice((1, 1, 2)))) for _ in range(kw_per_rule)]}
+             for i in range(n_rules)]
+    # a bounded pool of templates keeps the duplicate rate close to real exports
+    pool = [" ".join(rnd.choices(vocab, k=rnd.randint(6, 30))) for _ in range(max(1000, rows // 5))]
+    texts = pd.Series(rnd.choices(pool, k=rows))
+    return texts, rules
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=100000)
+    ap.add_argument("--rules", type=int, default=300)
+    ap.add_argument("--skip-loop", action="store_true")
+    a = ap.parse_args()
+    texts, rules = synth(a.rows, a.rules)
+    print(f"rows={a.rows} rules={a.rules} keywords={sum(len(r['keywords']) for r in rules)}")
+
+    for backend in ("python", "ahocorasick"):
+        try:
+            t0 = time.perf_counter(); m = RuleMatcher(rules, backend=backend); t1 = time.perf_counter()
+        except ImportError:
+            print(f"{backend:12s} not installed"); continue
+        fast = m.label(texts); t2 = time.perf_counter()
+        print(f"{backend:12s} compile={t1-t0:.3f}s label={t2-t1:.3f}s")
+
+    if not a.skip_loop:
+        t0 = time.perf_counter(); slow = loop_label(texts, rules); t1 = time.perf_counter()
+        print(f"{'loop':12s} label={t1-t0:.3f}s")
+        assert fast.tolist() == slow, "compiled matcher disagrees with loop"
+
+if __name__ == "__main__":
+    main()
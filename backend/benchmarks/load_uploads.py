@@ -0,0 +1,112 @@
+"""Latency under concurrent uploads, with the executor off (work inline on the
+event loop, the old behaviour) and on.
+
+Starts uvicorn twice (DWPNXT_OFFLOAD=0, then 1) and drives both from this process:
+
+    python benchmarks/load_uploads.py --rows 50000 --clients 8 --requests 3
+
+Against an already running server:
+
+    python benchmarks/load_uploads.py --url http://localhost:8000
+"""
+import argparse, asyncio, os, socket, subprocess, sys, time
+from pathlib import Path
+import numpy as np, pandas as pd
+import httpx
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+WORDS = ["password reset", "vpn tunnel down", "outlook mailbox full", "printer jam", "teams audio", "laptop battery"]
+
+def upload(rows: int, seed: int) -> bytes:
+    rnd = np.random.default_rng(seed)  # distinct content per request: no upload-cache hits
+    return pd.DataFrame({
+        "short_description": rnd.choice(WORDS, rows),
+        "description": [f"case {i}" for i in rnd.integers(0, 10**9, rows)],
+        "created": pd.Timestamp("2024-01-01") + pd.to_timedelta(rnd.integers(0, 365, rows), unit="D"),
+        "aht_min": rnd.gamma(2.0, 6.0, rows).round(1),
+        "sla_breached_bool": rnd.random(rows) < 0.2,
+    }).to_csv(index=False).encode()
+
+def pct(xs, q):
+    return float(np.percentile(xs, q)) * 1000 if xs else float("nan")
+
+async def run(client: httpx.AsyncClient, a) -> dict:
+    bodies = [upload(a.rows, i) for i in range(a.clients * a.requests)]
+    up, light, rejected = [], [], 0
+    done = asyncio.Event()
+
+    async def uploader(c):
+        nonlocal rejected
+        for r in range(a.requests):
+            t0 = time.perf_counter()
+            resp = await client.post("/api/analyze", files={"file": ("t.csv", bodies[c * a.requests + r], "text/csv")})
+            if resp.status_code == 503:
+                rejected += 1
+                await asyncio.sleep(float(resp.headers.get("Retry-After", 1)))
+                continue
+            up.append(time.perf_counter() - t0)
+
+    async def prober():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            await client.get("/api/admin/executor")
+            light.append(time.perf_counter() - t0)
+            await asyncio.sleep(0.05)
+
+    probe = asyncio.create_task(prober())
+    t0 = time.perf_counter()
+    await asyncio.gather(*(uploader(c) for c in range(a.clients)))
+    wall = time.perf_counter() - t0
+    done.set()
+    await probe
+    return {"wall_s": wall, "upload_p50_ms": pct(up, 50), "upload_p99_ms": pct(up, 99),
+            "light_p50_ms": pct(light, 50), "light_p99_ms": pct(light, 99), "rejected": rejected}
+
+def show(name, r):
+    print(f"{name:12s} wall={r['wall_s']:6.2f}s  analyze p50={r['upload_p50_ms']:7.0f}ms p99={r['upload_p99_ms']:7.0f}ms  "
+          f"light p50={r['light_p50_ms']:6.1f}ms p99={r['light_p99_ms']:7.1f}ms  503s={r['rejected']}")
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def serve(offload: bool) -> tuple:
+    port = _free_port()
+    env = {**os.environ, "DWPNXT_OFFLOAD": "1" if offload else "0"}
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+                            cwd=BACKEND, env=env)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(300):
+        try:
+            httpx.get(url + "/api/admin/executor", timeout=1)
+            return proc, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not start")
+
+async def bench(url, a):
+    async with httpx.AsyncClient(base_url=url, timeout=600) as client:
+        return await run(client, a)
+
+def main(a):
+    if a.url:
+        show("server", asyncio.run(bench(a.url, a)))
+        return
+    for offload in (False, True):
+        proc, url = serve(offload)
+        try:
+            show("offload" if offload else "inline", asyncio.run(bench(url, a)))
+        finally:
+            proc.terminate()
+            proc.wait()
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50000)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--requests", type=int, default=3)
+    ap.add_argument("--url", default=None)
+    main(ap.parse_args())
@@ -1,13 +1,24 @@
 
 import io, os, json
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, UploadFile, File, Form, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
 import pandas as pd
-from analytics import xlsx_export, taxonomy, views_store, mapping, prefs, report
-from analytics.tcd import load_rules, apply_rules, estimate_aht_minutes
+from analytics import xlsx_export, taxonomy, views_store, mapping, prefs, report, textprep, config_cache, ingest, upload_cache, aggregate_store, payload, jobs, executor, data_export
+from analytics.tcd import apply_rules
 
-app = FastAPI(title="DWPNxt Backend", version="0.1.0")
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    if jobs._manager is not None:  # stop the job worker processes
+        jobs._manager.shutdown()
+    if executor._executor is not None:
+        executor._executor.shutdown()
+
+app = FastAPI(title="DWPNxt Backend", version="0.1.0", lifespan=lifespan)
 
 # CORS (allow local dev)
 app.add_middleware(
@@ -18,103 +29,183 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-def _load_df_from_csv(file_bytes: bytes) -> pd.DataFrame:
-    text = file_bytes.decode("utf-8", errors="ignore")
+def _run_analysis(fileobj, key: str, keep_rows: bool = False) -> upload_cache.Analysis:
+    """Parse, label and aggregate an upload chunk by chunk and cache the result.
+
+    The labeled chunks are kept for the cached frame only while they fit the
+    cache budget (``keep_rows`` forces it, for exports that need the rows).
+    """
+    rules = config_cache.get_rules()
+    agg = ingest.RunningKPIs()
+    kept, kept_bytes, date_formats = [], 0, {}
+    try:
+        for chunk in ingest.iter_upload_chunks(fileobj):
+            textprep.prepare_text(chunk)
+            labeled, _ = apply_rules(chunk, rules)
+            ingest.to_internal(labeled, categorize=False, date_formats=date_formats)
+            agg.update(labeled)
+            if kept is not None:
+                kept.append(labeled)
+                kept_bytes += 0 if keep_rows else upload_cache.frame_nbytes(labeled)
+                if kept_bytes > upload_cache.cache.max_bytes:
+                    kept = None
+    except ingest.IngestError:
+        raise HTTPException(status_code=400, detail="Invalid upload (expected CSV, Parquet or Arrow IPC)")
     df = None
-    for sep in [None, ";"]:
-        try:
-            if sep is None:
-                df = pd.read_csv(io.StringIO(text))
-            else:
-                df = pd.read_csv(io.StringIO(text), sep=sep)
-            break
-        except Exception:
-            df = None
-    if df is None:
-        raise HTTPException(status_code=400, detail="Invalid CSV")
-    # Normalize column names
-    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
-    return df
-
-def _infer_date_column(df: pd.DataFrame):
-    for c in ["created", "opened", "created_at", "submitted", "date", "opened_at"]:
-        if c in df.columns:
-            return c
-    return None
+    if kept is not None:
+        df = ingest.to_internal(pd.concat(kept, ignore_index=True)) if kept else pd.DataFrame(columns=["driver"])
+    body = payload.compose_payload(agg)
+    body["analysisId"] = key
+    a = upload_cache.Analysis(key, body, agg.kpis(), df, aht_estimate=agg.estimate_aht_minutes())
+    upload_cache.cache.put(a)
+    return a
+
+def _resolve_analysis(file: Optional[UploadFile], analysis_id: Optional[str], need_rows: bool) -> upload_cache.Analysis:
+    """The cached analysis for an upload (by content hash) or an analysis ID."""
+    if file is not None:
+        key = upload_cache.fingerprint(file.file, salt=config_cache.get_rules_digest())
+        a = upload_cache.cache.get(key)
+        if a is not None and (a.df is not None or not need_rows):
+            return a
+        return _run_analysis(file.file, key, keep_rows=need_rows)
+    if analysis_id:
+        a = upload_cache.cache.get(analysis_id)
+        if a is None:
+            raise HTTPException(status_code=404, detail="Unknown or expired analysis_id; upload the file again")
+        if need_rows and a.df is None:
+            raise HTTPException(status_code=409, detail="Upload too large to keep cached; upload the file again")
+        return a
+    raise HTTPException(status_code=400, detail="Provide a file or an analysis_id")
+
+@app.exception_handler(executor.Saturated)
+async def _saturated(request, exc: executor.Saturated):
+    return JSONResponse({"detail": str(exc)}, status_code=503, headers={"Retry-After": str(exc.retry_after)})
+
+def _offload(lane: str, fn, *args, **kwargs):
+    """Run blocking work in the executor under *lane*'s concurrency limit (503 when saturated)."""
+    return executor.get_executor().run(lane, fn, *args, **kwargs)
 
 @app.post("/api/analyze")
-async def analyze(file: UploadFile = File(...)):
-    raw = await file.read()
+async def analyze(file: Optional[UploadFile] = File(None), analysis_id: Optional[str] = Form(None)):
+    if file is None and not analysis_id:
+        # no upload: analyze the accumulated ticket history (see /api/ingest)
+        return JSONResponse(await _offload("analyze", lambda: payload.compose_payload(aggregate_store.get_store().snapshot())))
+    a = await _offload("analyze", _resolve_analysis, file, analysis_id, need_rows=False)
+    return JSONResponse(a.payload)
+
+@app.post("/api/ingest")
+async def ingest_tickets(file: UploadFile = File(...)):
+    """Fold new tickets (deduplicated by ticket number) into the aggregate store."""
+    return JSONResponse(await _offload("ingest", _fold_upload, file.file))
+
+def _fold_upload(fileobj) -> dict:
+    rules = config_cache.get_rules()
+    store = aggregate_store.get_store()
+    totals = {"rows": 0, "new": 0, "duplicates": 0, "missing_number": 0}
     try:
-        df = _load_df_from_csv(raw)
-    except HTTPException:
-        raise
-
-    # Apply driver rules
-    rules_path = os.path.join(os.path.dirname(__file__), "analytics", "rules.yaml")
-    rules = load_rules(rules_path)
-    df2, by_driver = apply_rules(df, rules)
-
-    # KPIs per driver
-    kpi = report.driver_kpis(df2).reset_index().rename(columns={"index":"Driver"})
-    # Basic trends by month if available
-    date_col = _infer_date_column(df2)
-    trends = []
-    if date_col:
-        s = pd.to_datetime(df2[date_col], errors="coerce").dt.to_period("M").astype(str)
-        trend_df = s.value_counts().sort_index().reset_index()
-        trend_df.columns = ["month","tickets"]
-        trends = trend_df.to_dict(orient="records")
-
-    # Compose summary in the shape the frontend expects
-    total_tickets = int(len(df2))
-    keyThemes = by_driver.head(5)["driver"].astype(str).tolist()
-    priorityActions = [f"Create self-serve for {d}" for d in keyThemes[:3]]
-    categories = kpi[["Driver","Tickets","Median_AHT","SLA_Breach_%"]].to_dict(orient="records")
-
-    out = {
-        "summary": {
-            "overallSentiment": "Not computed (backend heuristic placeholder)",
-            "totalTickets": total_tickets,
-            "avgResolutionTime": float(kpi["Median_AHT"].median()) if not kpi.empty else 0.0,
-            "slaBreaches": int((df2.get("sla_breached_bool", pd.Series(dtype=bool)).fillna(False)).sum()),
-            "keyThemes": keyThemes,
-            "priorityActions": priorityActions
-        },
-        "trends": trends,
-        "categories": categories
-    }
-    return JSONResponse(out)
+        for chunk in ingest.iter_upload_chunks(fileobj):
+            textprep.prepare_text(chunk)
+            labeled, _ = apply_rules(chunk, rules)
+            for k, v in store.fold(labeled).items():
+                totals[k] += v
+    except ingest.IngestError:
+        raise HTTPException(status_code=400, detail="Invalid upload (expected CSV, Parquet or Arrow IPC)")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return totals
 
-@app.post("/api/export/xlsx")
-async def export_xlsx(file: UploadFile = File(...)):
-    raw = await file.read()
+@app.post("/api/admin/reload")
+async def reload_config():
+    """Force re-reading rules.yaml and taxonomy.yaml (normally picked up on change)."""
     try:
-        df = _load_df_from_csv(raw)
-    except HTTPException:
-        raise
-    xlsx_bytes = xlsx_export.build_processed_workbook(df)
-    return StreamingResponse(io.BytesIO(xlsx_bytes), media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        return JSONResponse(config_cache.reload())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Config reload failed: {e}")
+
+@app.get("/api/admin/label-cache")
+async def label_cache_stats():
+    """Entries and hit/miss counters of the on-disk cluster label cache."""
+    from analytics.label_cache import get_label_cache
+    return JSONResponse(get_label_cache().stats())
+
+@app.get("/api/admin/executor")
+async def executor_stats():
+    """Per-endpoint running / waiting / rejected counts of the request executor."""
+    return JSONResponse(executor.get_executor().stats())
+
+@app.post("/api/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), cluster: bool = Form(False), exports: str = Form("")):
+    """Queue a full analysis (parse, label, optional clustering, KPIs, exports) in the worker pool."""
+    kinds = [e.strip() for e in exports.split(",") if e.strip()]
+    bad = [e for e in kinds if e not in jobs.EXPORTS]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Unknown export(s): {', '.join(bad)}")
+    # spooling a large upload to the job dir is blocking I/O
+    job_id = await _offload("jobs", jobs.get_manager().submit, file.file, {"cluster": cluster, "exports": kinds})
+    return JSONResponse({"id": job_id, "status_url": f"/api/jobs/{job_id}"}, status_code=202)
+
+@app.get("/api/jobs/{job_id}")
+async def job_status(job_id: str):
+    st = jobs.get_manager().status(job_id)
+    if st is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if st["status"] == "done":
+        st["files"] = {k: f"/api/jobs/{job_id}/files/{k}" for k in (st.get("result") or {}).get("exports", [])}
+    return JSONResponse(st)
+
+@app.get("/api/jobs/{job_id}/files/{kind}")
+async def job_file(job_id: str, kind: str):
+    path = jobs.get_manager().file(job_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail="No such export for this job")
+    return FileResponse(path, media_type=jobs.EXPORTS[kind][1], filename=f"dwpnxt_analysis.{kind}")
+
+@app.delete("/api/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    if not jobs.get_manager().cancel(job_id):
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return JSONResponse(jobs.get_manager().status(job_id))
+
+@app.post("/api/export/xlsx")
+async def export_xlsx(file: Optional[UploadFile] = File(None), analysis_id: Optional[str] = Form(None),
+                      summary_only: bool = Form(False)):
+    def work():
+        a = _resolve_analysis(file, analysis_id, need_rows=True)
+        if summary_only:
+            # the ticket table comes from /api/export/data instead
+            note = f"Ticket data: POST /api/export/data with analysis_id={a.id} and format=csv, parquet or ndjson"
+            return xlsx_export.build_processed_workbook_file(a.df, include_data=False, data_note=note)
+        # constant-memory workbook on disk, streamed back in chunks and removed after
+        return xlsx_export.build_processed_workbook_file(a.df)
+    path = await _offload("xlsx", work)
+    return StreamingResponse(xlsx_export.iter_file(path), media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                              headers={"Content-Disposition": "attachment; filename=dwpnxt_analysis.xlsx"})
 
+@app.post("/api/export/data")
+async def export_data(file: Optional[UploadFile] = File(None), analysis_id: Optional[str] = Form(None),
+                      format: str = Form("csv"), compression: str = Form("none")):
+    """The labeled ticket table as CSV, Parquet or NDJSON (optionally gzip/zstd), streamed in chunks."""
+    if format not in data_export.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}")
+    if compression not in data_export.COMPRESSIONS:
+        raise HTTPException(status_code=400, detail=f"Unknown compression: {compression}")
+    a = await _offload("data", _resolve_analysis, file, analysis_id, need_rows=True)
+    name = data_export.filename(format, compression)
+    # serialization and compression happen while streaming: they hold a "data" slot too
+    body = await executor.get_executor().stream("data", data_export.iter_data, a.df, format, compression)
+    return StreamingResponse(body, media_type=data_export.media_type(format, compression),
+                             headers={"Content-Disposition": f"attachment; filename={name}", "X-Analysis-Id": a.id},
+                             background=BackgroundTask(body.aclose))
+
 @app.post("/api/export/pdf")
-async def export_pdf(file: UploadFile = File(...)):
-    raw = await file.read()
-    try:
-        df = _load_df_from_csv(raw)
-    except HTTPException:
-        raise
-    # Reuse KPI and aht estimation
-    kpi = report.driver_kpis(df).reset_index().rename(columns={"index":"Driver"})
-    aht = estimate_aht_minutes(df)
-    # Generate dummy ROI to satisfy function inputs if needed
-    top = kpi.sort_values("Tickets", ascending=False).head(10)
-    roi_df = pd.DataFrame({
-        "Driver": top["Driver"],
-        "Tickets": top["Tickets"],
-        "AHT_min": aht,
-        "Annualized_Savings_$": (top["Tickets"] * aht * 60 * 1.0)  # placeholder
-    })
-    pdf_bytes = report.build_pdf(kpi, top, pd.DataFrame(), roi_df)
+async def export_pdf(file: Optional[UploadFile] = File(None), analysis_id: Optional[str] = Form(None),
+                     charts: Optional[str] = Form(None)):
+    if charts not in (None, "vector", "plotly"):
+        raise HTTPException(status_code=400, detail=f"Unknown charts: {charts} (expected vector or plotly)")
+    def work():
+        a = _resolve_analysis(file, analysis_id, need_rows=False)
+        # Reuse KPI and aht estimation (sketched while streaming, no rows needed)
+        return report.summary_pdf(a.kpis, a.aht_estimate, charts=charts)
+    pdf_bytes = await _offload("pdf", work)
     return StreamingResponse(io.BytesIO(pdf_bytes), media_type="application/pdf",
                              headers={"Content-Disposition": "attachment; filename=dwpnxt_summary.pdf"})
@@ -0,0 +1,77 @@
+"""Local stand-in for the OpenAI and Gemini HTTP APIs (tests and benchmarks).
+
+    with FakeProvider(delay=0.05) as fp:
+        OpenAIProvider(api_key="test", base_url=fp.url + "/v1")
+        GeminiProvider(api_key="test", base_url=fp.url)
+"""
+import json, re, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def _answer(prompt: str) -> str:
+    groups = re.findall(r"Cluster (\S+):\n---\n(.*?)\n---", prompt, flags=re.S)
+    if groups:
+        return json.dumps({"labels": [{"id": cid, "title": f"{body.split()[0].title()} Issues", "rationale": "fake"}
+                                      for cid, body in groups]})
+    first = prompt.split("---\n", 1)[1].split()[0]
+    return json.dumps({"title": f"{first.title()} Issues", "rationale": "fake"})
+
+class FakeProvider:
+    """Threaded HTTP server; *delay* per request, the first *fail_first* requests get *fail_status*."""
+
+    def __init__(self, delay=0.0, fail_first=0, fail_status=500, hang=False):
+        self.delay, self.fail_first, self.fail_status, self.hang = delay, fail_first, fail_status, hang
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *a):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                with fake._lock:
+                    fake.requests += 1
+                    n = fake.requests
+                    fake.in_flight += 1
+                    fake.max_in_flight = max(fake.max_in_flight, fake.in_flight)
+                try:
+                    time.sleep(30 if fake.hang else fake.delay)
+                    if n <= fake.fail_first:
+                        return self._send(fake.fail_status, {"error": {"message": "fake failure"}})
+                    if "generateContent" in self.path:
+                        prompt = body["contents"][-1]["parts"][0]["text"]
+                        return self._send(200, {"candidates": [{"content": {"parts": [{"text": _answer(prompt)}]}}]})
+                    prompt = body["messages"][-1]["content"]
+                    return self._send(200, {
+                        "id": f"fake-{n}", "object": "chat.completion", "created": 0, "model": body.get("model"),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": _answer(prompt)}}]})
+                finally:
+                    with fake._lock:
+                        fake.in_flight -= 1
+
+            def _send(self, status, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.server.block_on_close = False
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,79 @@
+import io, sys
+from pathlib import Path
+import numpy as np, pandas as pd
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import aggregate_store
+from analytics.aggregate_store import AggregateStore
+from analytics.report import driver_kpis
+from analytics.sketch import KLLSketch
+import main
+
+def _tickets(start, n, seed=0):
+    rnd = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "number": [f"INC{i:06d}" for i in range(start, start + n)],
+        "driver": rnd.choice(["VPN", "Password", "Printer"], n),
+        "created": pd.date_range("2024-01-01", periods=n, freq="13h").strftime("%Y-%m-%d"),
+        "aht_min": rnd.integers(1, 40, n).astype(float),
+        "sla_breached_bool": rnd.random(n) < 0.25,
+        "reopen_count_num": rnd.integers(0, 2, n),
+    })
+
+def test_fold_dedupes_and_matches_full_recompute(tmp_path):
+    store = AggregateStore(str(tmp_path / "agg.sqlite"))
+    a, b = _tickets(0, 150, seed=1), _tickets(100, 150, seed=2)
+    assert store.fold(a) == {"rows": 150, "new": 150, "duplicates": 0, "missing_number": 0}
+    # 50 overlapping numbers from the previous export, one repeated within the batch
+    res = store.fold(pd.concat([b, b.head(1)], ignore_index=True))
+    assert res == {"rows": 151, "new": 100, "duplicates": 51, "missing_number": 0}
+    full = pd.concat([a, b[b["number"] >= "INC000150"]], ignore_index=True)
+    snap = store.snapshot()
+    got = snap.kpis().set_index("driver").sort_index().drop(columns=["P90_AHT", "P95_AHT"])
+    exp = driver_kpis(full).set_index("driver").sort_index()
+    pd.testing.assert_frame_equal(got, exp, check_dtype=False)
+    assert snap.rows == 250
+    months = pd.to_datetime(full["created"]).dt.to_period("M").astype(str).value_counts().sort_index()
+    assert snap.trends() == [{"month": k, "tickets": int(v)} for k, v in months.items()]
+
+def test_blank_numbers_fold_without_dedup(tmp_path):
+    store = AggregateStore(str(tmp_path / "agg.sqlite"))
+    df = _tickets(0, 5)
+    df["number"] = ["INC1", None, "  ", np.nan, "INC1"]
+    assert store.fold(df) == {"rows": 5, "new": 1, "duplicates": 1, "missing_number": 3}
+    assert store.fold(df.iloc[1:4]) == {"rows": 3, "new": 0, "duplicates": 0, "missing_number": 3}
+    assert store.snapshot().rows == 7
+
+def test_numeric_numbers_keyed_alike_with_and_without_gaps(tmp_path):
+    from analytics import ingest
+    store = AggregateStore(str(tmp_path / "agg.sqlite"))
+    gaps = next(ingest.iter_csv_chunks(io.BytesIO(b"number,driver\n1001,VPN\n,VPN\n")))
+    whole = next(ingest.iter_csv_chunks(io.BytesIO(b"number,driver\n1001,VPN\n1002,VPN\n")))
+    assert gaps["number"].dtype == float
+    assert store.fold(gaps) == {"rows": 2, "new": 1, "duplicates": 0, "missing_number": 1}
+    assert store.fold(whole) == {"rows": 2, "new": 1, "duplicates": 1, "missing_number": 0}
+    assert store.snapshot().rows == 3
+
+def test_kll_sketch_merge_and_roundtrip():
+    x = np.random.default_rng(0).gamma(2.0, 6.0, 200_000)
+    parts = [KLLSketch().update(c) for c in np.array_split(x, 8)]
+    sk = parts[0]
+    for p in parts[1:]:
+        sk.merge(p)
+    sk = KLLSketch.from_json(sk.to_json())
+    assert sk.n == len(x)
+    assert abs((x <= sk.median()).mean() - 0.5) < 0.02
+    assert KLLSketch().update([3.0, 1.0, 2.0, 4.0]).median() == 2.5
+
+def test_ingest_then_analyze_from_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(aggregate_store, "_store", AggregateStore(str(tmp_path / "agg.sqlite")))
+    client = TestClient(main.app)
+    csv = "number,short_description,created\nINC1,Password reset,2024-01-05\nINC2,VPN down,2024-02-06\n"
+    assert client.post("/api/ingest", files={"file": ("a.csv", csv, "text/csv")}).json()["new"] == 2
+    assert client.post("/api/ingest", files={"file": ("a.csv", csv, "text/csv")}).json()["duplicates"] == 2
+    data = client.post("/api/analyze").json()
+    assert data["summary"]["totalTickets"] == 2
+    assert [t["month"] for t in data["trends"]] == ["2024-01", "2024-02"]
+    bad = client.post("/api/ingest", files={"file": ("b.csv", "short_description\nx\n", "text/csv")})
+    assert bad.status_code == 400
@@ -0,0 +1,64 @@
+import sys
+from pathlib import Path
+import numpy as np, pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import cluster
+from analytics.model_registry import ModelRegistry
+
+TOPICS = ["vpn tunnel not connecting from home office", "outlook mailbox full cannot send mail",
+          "printer toner empty third floor", "teams meeting audio echo headset", "laptop battery not charging dock"]
+
+def _texts(n, seed=0):
+    rnd = np.random.default_rng(seed)
+    return pd.Series([f"{TOPICS[i % 5]} case {rnd.integers(0, 40)}" for i in range(n)])
+
+def test_batches_fold_short_tail():
+    assert [(b.start, b.stop) for b in cluster._batches(25, 10)] == [(0, 10), (10, 25)]
+    assert [(b.start, b.stop) for b in cluster._batches(5, 10)] == [(0, 5)]
+
+def test_streaming_tfidf_matches_full_vocabulary_weights():
+    texts = _texts(300).tolist()
+    vec = cluster.StreamingTfidf()
+    for b in cluster._batches(len(texts), 64):
+        vec.partial_fit(texts[b])
+    X = vec.transform(texts[:3])
+    assert np.allclose(np.sqrt(X.multiply(X).sum(axis=1)), 1.0)
+    # the same hashed matrix in one go gives the same weights
+    one = cluster.StreamingTfidf().partial_fit(texts)
+    assert abs(one.transform(texts[:3]) - X).max() < 1e-12
+
+def test_streaming_mode_recovers_topics():
+    texts = _texts(600)
+    labels, algo, ctx = cluster.run_clustering(texts, min_cluster_size=20, kmeans_k=5, mode="streaming", batch_size=128)
+    assert algo == "minibatch-kmeans" and len(labels) == 600
+    assert ctx["Xs"].shape[0] == 600 and ctx["Xs"].dtype == np.float32
+    topic = np.arange(600) % 5
+    purity = pd.crosstab(labels, topic).max(axis=1).sum() / 600
+    assert purity > 0.9
+
+def test_auto_mode_switches_on_size(monkeypatch):
+    monkeypatch.setattr(cluster, "STREAMING_MIN_ROWS", 100)
+    assert cluster.run_clustering(_texts(150), min_cluster_size=20, mode="auto")[1] == "minibatch-kmeans"
+    assert cluster.run_clustering(_texts(50), min_cluster_size=20, mode="auto")[1] != "minibatch-kmeans"
+    with pytest.raises(ValueError):
+        cluster.run_clustering(_texts(50), mode="gpu")
+
+def test_streaming_model_reused_by_registry(tmp_path):
+    reg = ModelRegistry(root=str(tmp_path))
+    texts = cluster.clean_series(_texts(400))
+    first, info = reg.cluster(texts, min_cluster_size=20, mode="streaming", batch_size=100)
+    assert info["refit"]
+    again, info = ModelRegistry(root=str(tmp_path)).cluster(texts, mode="streaming")
+    assert not info["refit"]
+    assert (pd.Series(again).groupby(first).nunique() == 1).all()
+
+def test_streaming_mode_with_batches_smaller_than_k():
+    texts = pd.Series([f"{TOPICS[i % len(TOPICS)]} {i}" for i in range(400)])
+    labels, algo, ctx = cluster.run_clustering(texts, kmeans_k=12, mode="streaming", batch_size=8)
+    assert algo == "minibatch-kmeans" and len(labels) == 400 and labels.max() < 12
+
+def test_streaming_mode_on_no_texts():
+    labels, algo, ctx = cluster.run_clustering(pd.Series([], dtype=object), mode="streaming")
+    assert algo == "minibatch-kmeans" and labels.shape == (0,) and ctx["Xs"].shape[0] == 0
@@ -0,0 +1,53 @@
+import io, sys
+from pathlib import Path
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+pa = pytest.importorskip("pyarrow")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import ingest
+from main import app
+
+DF = pd.DataFrame({
+    "Short Description": ["Password reset", "VPN down", "check status", "reset again"],
+    "created": pd.to_datetime(["2024-01-05", "2024-01-06", "2024-02-01", "2024-02-03"]),
+    "aht_min": [5.0, None, 7.0, 9.0],
+})
+
+def _post(payload, name):
+    return TestClient(app).post("/api/analyze", files={"file": (name, payload, "application/octet-stream")})
+
+def _parquet():
+    buf = io.BytesIO(); DF.to_parquet(buf, index=False); return buf.getvalue()
+
+def _arrow(stream=False):
+    import pyarrow.ipc as ipc
+    table = pa.Table.from_pandas(DF, preserve_index=False)
+    buf = io.BytesIO()
+    opener = ipc.new_stream if stream else ipc.new_file
+    with opener(buf, table.schema) as w:
+        w.write_table(table, max_chunksize=2)
+    return buf.getvalue()
+
+def test_detect_format():
+    assert ingest.detect_format(io.BytesIO(_parquet())) == "parquet"
+    assert ingest.detect_format(io.BytesIO(_arrow())) == "arrow"
+    assert ingest.detect_format(io.BytesIO(_arrow(stream=True))) == "arrow-stream"
+    assert ingest.detect_format(io.BytesIO(b"a,b\n1,2\n")) == "csv"
+
+def test_columnar_uploads_match_csv():
+    expected = _post(DF.to_csv(index=False), "t.csv").json()
+    for payload in (_parquet(), _arrow(), _arrow(stream=True)):
+        got = _post(payload, "t.bin").json()
+        got.pop("analysisId"); exp = dict(expected); exp.pop("analysisId")
+        assert got == exp
+
+def test_to_internal_dtypes():
+    df = pd.DataFrame({"short_description": ["a", None], "created": ["2024-01-01", "2024-01-02"],
+                       "driver": ["X", "Other"], "n": [1, 2]})
+    ingest.to_internal(df)
+    assert df["short_description"].dtype == pd.StringDtype("pyarrow")
+    assert pd.api.types.is_datetime64_any_dtype(df["created"])
+    assert isinstance(df["driver"].dtype, pd.CategoricalDtype)
+    assert df["n"].dtype == "int64"
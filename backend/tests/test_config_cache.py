@@ -0,0 +1,34 @@
+import os, sys, time
+from pathlib import Path
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import config_cache
+from main import app
+
+RULES_V1 = "rules:\n  - name: VPN\n    keywords: [vpn]\n"
+RULES_V2 = "rules:\n  - name: VPN\n    keywords: [vpn]\n  - name: Printer\n    keywords: [printer]\n"
+
+def test_rules_recompiled_only_on_change(tmp_path):
+    p = tmp_path / "rules.yaml"
+    p.write_text(RULES_V1)
+    a = config_cache.get_rules(str(p))
+    assert config_cache.get_rules(str(p)) is a
+    # same bytes, new mtime: keep the compiled matcher
+    os.utime(p, ns=(time.time_ns(), time.time_ns() + 10**9))
+    assert config_cache.get_rules(str(p)) is a
+    p.write_text(RULES_V2)
+    os.utime(p, ns=(time.time_ns(), time.time_ns() + 2 * 10**9))
+    b = config_cache.get_rules(str(p))
+    assert b is not a and b.names == ["VPN", "Printer"]
+
+def test_taxonomy_cached():
+    assert config_cache.get_taxonomy() is config_cache.get_taxonomy()
+
+def test_reload_endpoint():
+    before = config_cache.get_rules()
+    resp = TestClient(app).post("/api/admin/reload")
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["rules"] == len(before.names) and body["taxonomy"] > 0
+    assert config_cache.get_rules() is not before
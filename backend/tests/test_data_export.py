@@ -0,0 +1,61 @@
+import gzip
+import io
+import json
+import sys
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+from openpyxl import load_workbook
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import data_export
+from main import app
+
+def _frame(n):
+    return pd.DataFrame({
+        "number": [f"INC{i:05d}" for i in range(n)],
+        "driver": pd.Categorical(["VPN" if i % 3 else "Password Reset" for i in range(n)]),
+        "opened_dt": pd.to_datetime(["2024-01-05 10:30", None] * (n // 2)),
+        "aht_min": [1.5, None] * (n // 2),
+        "mixed": [1, "a"] * (n // 2),
+    })
+
+def _body(df, fmt, compression=None):
+    return b"".join(data_export.iter_data(df, fmt, compression, chunk_rows=7))
+
+def test_csv_chunks_have_one_header_and_compress():
+    df = _frame(20)
+    plain = _body(df, "csv")
+    out = pd.read_csv(io.BytesIO(plain))
+    assert len(out) == 20 and list(out.columns) == ["number", "driver", "opened_dt", "aht_min", "mixed",
+                                                   "Final Driver", "_month"]
+    assert out["_month"].tolist()[:2] == ["2024-01", "Unknown"]
+    assert gzip.decompress(_body(df, "csv", "gzip")) == plain
+    zst = _body(df, "csv", "zstd")
+    assert pa.CompressedInputStream(pa.BufferReader(zst), "zstd").read() == plain
+
+def test_ndjson_records():
+    rows = [json.loads(line) for line in _body(_frame(10), "ndjson").decode().splitlines()]
+    assert len(rows) == 10 and rows[0]["Final Driver"] == "Password Reset" and rows[1]["aht_min"] is None
+
+def test_parquet_row_groups_share_one_schema():
+    df = _frame(20)
+    t = pq.read_table(io.BytesIO(_body(df, "parquet", "zstd")))
+    assert t.num_rows == 20 and t.schema.field("mixed").type == pa.string()
+    assert t.column("number").to_pylist() == df["number"].tolist()
+    assert pq.ParquetFile(io.BytesIO(_body(df, "parquet"))).metadata.num_row_groups == 3
+
+def test_data_endpoint_and_summary_only_workbook():
+    client = TestClient(app)
+    csv = "number,short_description,created\nINC1,Password reset,2024-01-05\nINC2,VPN down,2024-01-06\n"
+    aid = client.post("/api/analyze", files={"file": ("t.csv", csv, "text/csv")}).json()["analysisId"]
+    r = client.post("/api/export/data", data={"analysis_id": aid, "format": "ndjson", "compression": "gzip"})
+    assert r.status_code == 200 and r.headers["x-analysis-id"] == aid
+    assert "dwpnxt_tickets.ndjson.gz" in r.headers["content-disposition"]
+    assert len(gzip.decompress(r.content).splitlines()) == 2
+    assert client.post("/api/export/data", data={"analysis_id": aid, "format": "xml"}).status_code == 400
+    x = client.post("/api/export/xlsx", data={"analysis_id": aid, "summary_only": "true"})
+    wb = load_workbook(io.BytesIO(x.content))
+    assert "Data" not in wb.sheetnames and aid in wb["Summary"]["A2"].value
@@ -0,0 +1,51 @@
+import sys
+from pathlib import Path
+import numpy as np, pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import dates, validator
+
+def _reference(df, cols):
+    # the per-element guessing _parse_dates replaced
+    best = None
+    for c in cols:
+        s = pd.to_datetime(df[c], errors="coerce")
+        if s.notna().sum() > 0:
+            best = s if best is None else s.combine_first(best)
+    return best
+
+def test_infer_format_per_column():
+    ts = pd.Series(pd.date_range("2024-01-13 08:00", periods=50, freq="7h"))
+    assert dates.infer_format(ts.dt.strftime("%Y-%m-%d %H:%M:%S")) == "ISO8601"
+    assert dates.infer_format(ts.dt.strftime("%d/%m/%Y %H:%M")) == "%d/%m/%Y %H:%M"
+    assert dates.infer_format(ts.dt.strftime("%m/%d/%Y %I:%M %p")) == "%m/%d/%Y %I:%M %p"
+    assert dates.infer_format(pd.Series(["01/02/2024"] * 5)) == "%m/%d/%Y"  # month first, like pandas
+    assert dates.infer_format(ts) == dates.DATETIME
+    assert dates.infer_format(pd.Series([3, 4, 5])) is None
+    assert dates.infer_format(pd.Series(["agent 1", None, ""])) is None
+    mixed = pd.Series(["2024-01-05", "Jan 7 2024 10:00", "07.01.2024 10:00", "March 3, 2024"] * 3)
+    assert dates.infer_format(mixed) == dates.MIXED
+
+def test_parse_caches_repeats_and_keeps_index():
+    s = pd.Series(["2024-03-01 10:00:00", None, "bad", "2024-03-01 10:00:00"], index=[5, 6, 7, 8])
+    out = dates.parse(s)
+    assert out.index.equals(s.index) and out.dtype == "datetime64[ns]"
+    assert out.isna().tolist() == [False, True, True, False] and out[5] == pd.Timestamp("2024-03-01 10:00")
+
+def test_parse_dates_matches_reference():
+    n = 3000
+    rng = np.random.default_rng(0)
+    base = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 3 * 10**7, n), unit="s")
+    df = pd.DataFrame({
+        "u_start": base.strftime("%d.%m.%Y"),
+        "sys_created_on": pd.Series(base.strftime("%Y-%m-%d %H:%M:%S")).where(rng.random(n) > 0.5),
+        "opened_at": pd.Series(base.strftime("%m/%d/%Y %H:%M:%S")).where(rng.random(n) > 0.1),
+        "requested_for": [f"user {i % 50}" for i in range(n)],
+        "closed_at": pd.Series(base.strftime("%Y-%m-%dT%H:%M")).where(rng.random(n) > 0.3),
+        "resolved": pd.Series(base).where(rng.random(n) > 0.6),
+    })
+    out = validator._parse_dates(df.copy())
+    opened = [c for c in df.columns if validator.DATE_HINTS.search(c)]
+    assert out["opened_dt"].equals(_reference(df, opened))
+    assert out["resolved_dt"].equals(_reference(df, ["closed_at", "resolved"]))
+    assert validator._parse_dates(pd.DataFrame({"x": [1]}))["opened_dt"].isna().all()
@@ -0,0 +1,85 @@
+import sys
+from pathlib import Path
+import numpy as np, pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import cluster, dedup
+from analytics.dedup import collapse, minhash
+
+def _alerts(n, seed=0):
+    rnd = np.random.default_rng(seed)
+    alerts = [f"disk usage {rnd.integers(80, 99)} percent on server srv{rnd.integers(1, 40):03d} volume data threshold exceeded"
+              for _ in range(n // 2)]
+    alerts += [f"cpu utilization high on host app{rnd.integers(1, 50)} for 15 minutes monitoring alert" for _ in range(n // 4)]
+    return alerts
+
+def test_minhash_estimates_jaccard():
+    sig = minhash(["a b c d e f g h", "a b c d e f g x", "q r s t u v w z", ""])
+    assert sig.dtype == np.uint32 and sig.shape == (4, dedup.NUM_PERM)
+    assert 0.4 < (sig[0] == sig[1]).mean() < 0.9 and (sig[0] == sig[2]).mean() < 0.2
+    assert (sig[3] == np.iinfo(np.uint32).max).all()
+    assert np.array_equal(minhash(["a b c d e f g h"]), sig[:1])
+
+def test_collapse_groups_templated_tickets():
+    free = [f"ticket {w} about {v}" for w in ("vpn", "printer", "outlook", "teams") for v in ("slow", "broken", "missing")]
+    texts = pd.Series(_alerts(400) + free + ["", ""], index=range(1000, 1314))
+    g = collapse(texts)
+    assert len(g.reps) <= 2 + len(free) + 1 and g.duplicate_ratio > 0.95
+    assert g.weights.sum() == len(texts) and np.array_equal(np.bincount(g.inverse), g.weights)
+    assert (np.diff(g.reps) > 0).all() and g.reps[0] == 0          # first members, in row order
+    assert np.array_equal(g.reps[g.inverse][:200], np.zeros(200))  # every disk alert -> the first one
+    assert len(set(g.inverse[200:300])) == 1
+    assert len(set(g.inverse[300:312])) == 12                      # distinct tickets stay apart
+
+def test_other_reduction_clusters_representatives(monkeypatch):
+    monkeypatch.setattr(dedup, "DEDUP_MIN_ROWS", 100)
+    topics = ["vpn tunnel not connecting from home", "outlook mailbox full cannot send",
+              "printer toner empty third floor", "teams meeting audio echo headset"]
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda omicron".split()
+    texts = [f"{topics[i % 4]} {words[i % 12]} {words[(i // 12) % 12]}" for i in range(144)] + _alerts(1200)
+    df = pd.DataFrame({"text": texts, "driver": "Other"})
+    seen = []
+    run = cluster.run_clustering
+    monkeypatch.setattr(cluster, "run_clustering",
+                        lambda t, **kw: seen.append((len(t), kw["sample_weight"])) or run(t, **kw))
+    notes, examples = {}, {}
+    out = cluster.iterative_other_reduction(df, min_cluster_size=20, max_rounds=1, notes=notes, examples=examples)
+    (n, w), = seen
+    assert n < len(df) / 5 and w.sum() == len(df)
+    assert notes["cluster_rows"] == len(df) and notes["cluster_representatives"] == n
+    assert notes["duplicate_ratio"] == round(1 - n / len(df), 4)
+    drivers = out["driver"]
+    assert drivers.iloc[144:744].nunique() == 1 and drivers.iloc[744:].nunique() == 1  # broadcast to members
+    assert all(len(set(idx)) == len(idx) for idx in examples.values())
+    plain = cluster.iterative_other_reduction(df, min_cluster_size=20, max_rounds=1, dedup=False, notes={})
+    assert len(seen) == 2 and seen[1][0] == len(df) and seen[1][1] is None
+
+def _sklearn_hdbscan(Xs, min_cluster_size=25, min_samples=None):
+    # stand-in for the hdbscan package (same fit_predict contract)
+    from sklearn.cluster import HDBSCAN
+    model = HDBSCAN(min_cluster_size=min_cluster_size, min_samples=min_samples)
+    return model.fit_predict(Xs), "hdbscan", model
+
+def test_hdbscan_sees_duplicate_groups_as_dense(monkeypatch):
+    monkeypatch.setattr(cluster, "try_hdbscan", _sklearn_hdbscan)
+    monkeypatch.setattr(dedup, "DEDUP_MIN_ROWS", 100)
+    rnd = np.random.default_rng(1)
+    topics = ["vpn tunnel not connecting from home", "outlook mailbox full cannot send",
+              "printer toner empty third floor", "teams meeting audio echo headset"]
+    words = "alpha beta gamma delta epsilon zeta eta theta iota kappa lambda omicron".split()
+    varied = [f"{topics[i % 4]} {rnd.choice(words)} {rnd.choice(words)} {rnd.choice(words)}" for i in range(1000)]
+    alerts = [f"{kind} alert on host srv{rnd.integers(1, 99)} at {rnd.integers(0, 24)}:00"
+              for kind in ("disk full", "cpu high", "backup failed") for _ in range(1000)]
+    df = pd.DataFrame({"text": varied + alerts, "driver": "Other"})
+    truth = np.r_[np.arange(1000) % 4, 4 + np.repeat(np.arange(3), 1000)]
+    other = {}
+    for on in (False, True):
+        out = cluster.iterative_other_reduction(df, min_cluster_size=25, max_rounds=1, dedup=on, notes={})
+        other[on] = (out["driver"] == "Other").mean()
+    assert (out["driver"].iloc[1000:] != "Other").all()                # each alert template is a cluster
+    assert other[True] <= other[False]
+    clustered = out["driver"] != "Other"
+    purity = pd.crosstab(out["driver"][clustered], truth[clustered]).max(axis=1).sum() / clustered.sum()
+    assert purity > 0.9
+    labels, algo, _ = cluster._hdbscan_groups(np.zeros((30, 2)), np.r_[[40], np.ones(29)], 25)
+    assert algo == "hdbscan" and labels[0] == max(labels[1:].max(), -1) + 1
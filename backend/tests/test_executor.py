@@ -0,0 +1,83 @@
+import asyncio, sys, threading, time
+from pathlib import Path
+import httpx
+import pytest
+from fastapi import HTTPException
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import executor
+from analytics.executor import Executor, Saturated, parse_limits
+import main
+
+def test_parse_limits():
+    assert parse_limits("analyze=4, xlsx=0,") == {"analyze": 4, "xlsx": 1}
+
+def test_lane_queues_then_rejects():
+    ex = Executor(threads=4, limits={"analyze": 1}, queue=1)
+    gate = threading.Event()
+
+    async def scenario():
+        first = asyncio.create_task(ex.run("analyze", gate.wait, 5))
+        second = asyncio.create_task(ex.run("analyze", lambda: "queued"))
+        await asyncio.sleep(0.05)
+        assert ex.lanes["analyze"].stats()["running"] == 1 and ex.lanes["analyze"].stats()["waiting"] == 1
+        with pytest.raises(Saturated) as err:
+            await ex.run("analyze", lambda: None)
+        assert err.value.retry_after >= 1
+        gate.set()
+        return await first, await second
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    assert ex.lanes["analyze"].stats()["rejected"] == 1
+    ex.shutdown()
+
+def test_endpoint_returns_503_and_keeps_loop_free(monkeypatch):
+    ex = Executor(threads=4, limits={"analyze": 1}, queue=0)
+    monkeypatch.setattr(executor, "_executor", ex)
+    gate = threading.Event()
+
+    def blocked(*a, **k):
+        gate.wait(5)
+        raise HTTPException(status_code=404)
+    monkeypatch.setattr(main, "_resolve_analysis", blocked)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://t") as client:
+            slow = asyncio.create_task(client.post("/api/analyze", data={"analysis_id": "x"}))
+            await asyncio.sleep(0.1)
+            t0 = time.perf_counter()
+            stats = await client.get("/api/admin/executor")
+            fast = time.perf_counter() - t0
+            busy = await client.post("/api/analyze", data={"analysis_id": "y"})
+            gate.set()
+            slow.cancel()
+            return stats, fast, busy
+
+    stats, fast, busy = asyncio.run(scenario())
+    assert stats.json()["lanes"]["analyze"]["running"] == 1 and fast < 1.0
+    assert busy.status_code == 503 and int(busy.headers["Retry-After"]) >= 1
+    ex.shutdown()
+
+def test_stream_holds_slot_until_consumed():
+    ex = Executor(threads=2, limits={"data": 1}, queue=0)
+    lane = ex.lanes["data"]
+
+    def items(n):
+        yield from (threading.current_thread().name for _ in range(n))
+
+    async def scenario():
+        body = await ex.stream("data", items, 3)
+        with pytest.raises(Saturated):
+            await ex.stream("data", items, 1)
+        held = lane.stats()["running"]
+        got = [x async for x in body]
+        left = await ex.stream("data", items, 1)
+        await left.aclose()
+        await left.aclose()
+        return held, got
+
+    held, got = asyncio.run(scenario())
+    assert held == 1 and len(got) == 3 and all(t.startswith("dwpnxt") for t in got)
+    assert lane.stats()["running"] == 0
+    ex.shutdown()
@@ -0,0 +1,33 @@
+import re, subprocess, sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+HEAVY = ("sklearn", "scipy", "plotly", "kaleido", "reportlab", "openai", "google.genai", "yake", "xlsxwriter", "joblib")
+# what `import main` may add on top of fastapi + pandas (measured ~60 ms locally)
+BUDGET_MS = 400
+
+def _importtime(code):
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND,
+                         capture_output=True, text=True, check=True).stderr
+    out = {}
+    for line in err.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+\d+ \|\s*(\S+)", line)
+        if m:
+            out[m.group(2)] = int(m.group(1))
+    return out
+
+def _heavy(mods):
+    return sorted(m for m in mods if any(m == h or m.startswith(h + ".") for h in HEAVY))
+
+def test_main_startup_skips_heavy_dependencies():
+    base = _importtime("import fastapi, fastapi.responses, fastapi.middleware.cors, pandas, numpy")
+    app = _importtime("import main")
+    assert _heavy(app) == []
+    extra_ms = sum(us for m, us in app.items() if m not in base) / 1000
+    assert extra_ms < BUDGET_MS, f"import main adds {extra_ms:.0f} ms over fastapi + pandas"
+
+def test_analytics_modules_import_lazily():
+    mods = ["cluster", "py_label", "llm", "llm_gemini", "llm_bridge", "label_cache", "model_registry",
+            "report", "xlsx_export", "tcd", "validator", "taxonomy"]
+    app = _importtime("; ".join(f"import analytics.{m}" for m in mods))
+    assert _heavy(app) == []
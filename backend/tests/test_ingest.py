@@ -0,0 +1,90 @@
+import io, sys
+from pathlib import Path
+import numpy as np, pandas as pd
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import ingest
+from analytics.report import driver_kpis
+from main import app
+
+def _frame(n=500, seed=0):
+    rnd = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "short_description": rnd.choice(["password reset", "vpn down", "check status", "printer jam"], n),
+        "created": pd.date_range("2024-01-01", periods=n, freq="7h").strftime("%Y-%m-%d"),
+        "aht_min": np.where(rnd.random(n) < 0.2, np.nan, rnd.integers(1, 60, n)),
+        "sla_breached_bool": rnd.random(n) < 0.3,
+        "reopen_count_num": rnd.integers(0, 3, n),
+    })
+
+def test_sniff_delimiter():
+    assert ingest.sniff_delimiter(b"a;b;c\n1;2;3\n4;5") == ";"
+    assert ingest.sniff_delimiter(b"a,b,c\n1,2,3\n") == ","
+    assert ingest.sniff_delimiter(b"a\tb\n1\t2\n") == "\t"
+
+def test_running_kpis_match_driver_kpis():
+    df = _frame()
+    df["driver"] = df["short_description"]
+    buf = io.BytesIO(df.to_csv(index=False, sep=";").encode())
+    agg = ingest.RunningKPIs()
+    for chunk in ingest.iter_csv_chunks(buf, chunksize=37):
+        agg.update(chunk)
+    expected = driver_kpis(df).reset_index(drop=True)
+    got = agg.kpis().reset_index(drop=True)
+    exp_p90 = df.groupby("driver")["aht_min"].quantile(0.9)
+    assert np.allclose(got.set_index("driver")["P90_AHT"].sort_index(), exp_p90.sort_index())
+    got = got.drop(columns=["P90_AHT", "P95_AHT"])
+    pd.testing.assert_frame_equal(got.sort_values("driver").reset_index(drop=True),
+                                  expected.sort_values("driver").reset_index(drop=True), check_dtype=False)
+    assert agg.rows == len(df)
+    assert agg.sla_breaches == int(df["sla_breached_bool"].sum())
+    months = pd.to_datetime(df["created"]).dt.to_period("M").astype(str).value_counts().sort_index()
+    assert agg.trends() == [{"month": k, "tickets": int(v)} for k, v in months.items()]
+
+def test_running_kpis_merge_partials():
+    df = _frame(2000, seed=3)
+    df["driver"] = df["short_description"]
+    whole, left, right = ingest.RunningKPIs(), ingest.RunningKPIs(), ingest.RunningKPIs()
+    whole.update(df)
+    left.update(df.iloc[:700]); right.update(df.iloc[700:])
+    merged = left.merge(right)
+    cols = ["driver", "Tickets", "With_AHT", "SLA_Breach_%", "Reopen_Rate_%"]
+    pd.testing.assert_frame_equal(merged.kpis()[cols].reset_index(drop=True), whole.kpis()[cols].reset_index(drop=True))
+    assert merged.trends() == whole.trends() and merged.rows == whole.rows
+
+def test_sketch_quantiles_within_error_bound():
+    from analytics.sketch import KLLSketch
+    x = np.random.default_rng(5).lognormal(2.0, 0.8, 300_000)
+    parts = [KLLSketch(eps=0.01).update(c) for c in np.array_split(x, 6)]
+    sk = parts[0]
+    for p in parts[1:]:
+        sk.merge(p)
+    for q, v in zip((0.5, 0.9, 0.95), sk.quantiles([0.5, 0.9, 0.95])):
+        assert abs((x <= v).mean() - q) <= sk.error
+    assert sum(len(lv) for lv in sk.levels) < 3 * sk.k
+
+def test_analyze_semicolon_csv_uses_driver_names():
+    csv = "short_description;created\nPassword reset;2024-01-05\nVPN down;2024-01-06\nreset again;2024-02-01\n"
+    resp = TestClient(app).post("/api/analyze", files={"file": ("t.csv", csv, "text/csv")})
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["categories"][0] == {"Driver": "Password Reset / Unlock", "Tickets": 2, "Median_AHT": 0.0,
+                                     "P90_AHT": 0.0, "P95_AHT": 0.0, "SLA_Breach_%": 0.0}
+    assert [t["tickets"] for t in data["trends"]] == [2, 1]
+
+def test_analyze_rejects_garbage():
+    resp = TestClient(app).post("/api/analyze", files={"file": ("t.csv", b"", "text/csv")})
+    assert resp.status_code == 400
+
+def test_to_internal_keeps_first_chunk_date_format():
+    formats = {}
+    first = ingest.to_internal(pd.DataFrame({"created": ["13/01/2024", "25/01/2024"], "resolved": ["x", "y"]}),
+                               categorize=False, date_formats=formats)
+    # alone this chunk reads month-first; the upload's day-first format wins
+    second = ingest.to_internal(pd.DataFrame({"created": ["02/03/2024", None], "resolved": ["2024-01-01", "z"]}),
+                                categorize=False, date_formats=formats)
+    assert formats == {"created": "%d/%m/%Y", "resolved": None}
+    assert first["created"].dt.month.tolist() == [1, 1]
+    assert second["created"].iloc[0] == pd.Timestamp("2024-03-02") and pd.isna(second["created"].iloc[1])
+    assert not pd.api.types.is_datetime64_any_dtype(second["resolved"])
@@ -0,0 +1,105 @@
+import json, os, sys, time
+from pathlib import Path
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import jobs
+import main
+
+SAMPLE_CSV = """short_description,description,created,aht_min,sla_breached_bool
+Password reset needed,,2024-01-05,5,False
+Check status on request,,2024-01-15,6,False
+Access provisioning required,,2024-02-20,7,True
+"""
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setenv("DWPNXT_MODEL_DIR", str(tmp_path / "models"))
+    m = jobs.JobManager(root=str(tmp_path / "jobs"), workers=1)
+    monkeypatch.setattr(jobs, "_manager", m)
+    yield m
+    m.shutdown()
+
+def _poll(client, job_id, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        st = client.get(f"/api/jobs/{job_id}").json()
+        if st["status"] in ("done", "failed", "cancelled"):
+            return st
+        time.sleep(0.2)
+    raise AssertionError("job did not finish")
+
+def test_job_runs_stages_and_serves_exports(manager):
+    client = TestClient(main.app)
+    r = client.post("/api/jobs", files={"file": ("t.csv", SAMPLE_CSV, "text/csv")}, data={"exports": "xlsx,pdf"})
+    assert r.status_code == 202
+    st = _poll(client, r.json()["id"])
+    assert st["status"] == "done" and st["progress"] == 1.0
+    assert {k: v["status"] for k, v in st["stages"].items()} == {
+        "parse": "done", "label": "done", "cluster": "skipped", "kpis": "done", "export": "done"}
+    direct = client.post("/api/analyze", files={"file": ("t.csv", SAMPLE_CSV, "text/csv")}).json()
+    assert st["result"]["summary"] == direct["summary"] and st["result"]["categories"] == direct["categories"]
+    pdf = client.get(st["files"]["pdf"])
+    assert pdf.status_code == 200 and pdf.content.startswith(b"%PDF")
+    assert client.get(st["files"]["xlsx"]).content[:2] == b"PK"
+    assert client.get(f"/api/jobs/{st['id']}/files/csv").status_code == 404
+    # result.json unreadable (e.g. being replaced): status still answers
+    (Path(manager.root) / st["id"] / "result.json").write_text("{")
+    again = client.get(f"/api/jobs/{st['id']}")
+    assert again.status_code == 200 and again.json()["files"] == {}
+    assert client.get("/api/jobs/nope").status_code == 404
+    assert client.post("/api/jobs", files={"file": ("t.csv", SAMPLE_CSV)}, data={"exports": "docx"}).status_code == 400
+
+def test_cluster_stage_names_other_tickets(manager):
+    topics = ["bitlocker recovery key prompt", "zebra label printer offline", "sap gui transaction dump"]
+    rows = "\n".join(f"{topics[i % 3]} case {i},,2024-03-01,4,False" for i in range(150))
+    client = TestClient(main.app)
+    job_id = client.post("/api/jobs", files={"file": ("t.csv", "short_description,description,created,aht_min,sla_breached_bool\n" + rows)},
+                         data={"cluster": "true"}).json()["id"]
+    st = _poll(client, job_id)
+    assert st["status"] == "done" and st["stages"]["cluster"]["status"] == "done"
+    drivers = {c["Driver"] for c in st["result"]["categories"]}
+    assert "Other" not in drivers and not any(d.startswith("cluster_") for d in drivers)
+    assert st["result"]["notes"]["rows"] == 150 and st["result"]["notes"]["duplicate_ratio"] == 0
+
+def test_cluster_labels_sent_raw_ticket_text(tmp_path, monkeypatch):
+    from analytics import llm_bridge, textprep
+    monkeypatch.setenv("DWPNXT_MODEL_DIR", str(tmp_path / "models"))
+    topics = ["BitLocker recovery-key prompt!", "Zebra label printer offline", "SAP GUI: transaction dump"]
+    df = pd.DataFrame({"short_description": [f"{topics[i % 3]} #{i}" for i in range(150)], "description": None,
+                       "driver": "Other"})
+    textprep.prepare_text(df)
+    seen = {}
+    monkeypatch.setattr(llm_bridge, "best_labels_for_clusters",
+                        lambda clusters, clean=None, **kw: seen.update(clusters, clean=clean) or
+                        {c: ("X", "", "python") for c in clusters})
+    prog = jobs.Progress(str(tmp_path), ["cluster"])
+    prog.stage("cluster")
+    jobs._cluster_other(df, prog, {})
+    clean = seen.pop("clean")
+    sent = [t for texts in seen.values() for t in texts]
+    assert sent and set(sent) <= set(df["short_description"])
+    # the prepared clean column rides along for the Python labeler
+    assert {c: [textprep.clean_text(t) for t in texts] for c, texts in seen.items()} == clean
+
+def test_cancel_flag_stops_running_job(tmp_path):
+    d = tmp_path / "job"
+    d.mkdir()
+    (d / jobs.UPLOAD).write_text(SAMPLE_CSV)
+    (d / "cancel").touch()
+    with pytest.raises(jobs.JobCancelled):
+        jobs.run_job(str(d), {})
+    assert json.loads((d / "status.json").read_text())["status"] == "cancelled"
+
+def test_cancel_queued_job_and_report_failures(manager):
+    client = TestClient(main.app)
+    first = client.post("/api/jobs", files={"file": ("bad.csv", b"\x00\x01not a table")}).json()["id"]
+    queued = client.post("/api/jobs", files={"file": ("t.csv", SAMPLE_CSV)}).json()["id"]
+    assert client.delete(f"/api/jobs/{queued}").json()["status"] in ("cancelled", "cancelling")
+    st = _poll(client, queued)
+    assert st["status"] == "cancelled"
+    st = _poll(client, first)
+    assert st["status"] in ("failed", "done")
+    assert client.delete("/api/jobs/nope").status_code == 404
@@ -0,0 +1,67 @@
+import sys, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parent))
+from analytics import llm_bridge
+from analytics.label_cache import LabelCache, cluster_key
+from analytics.label_service import OpenAIProvider, label_clusters
+from fake_provider import FakeProvider
+
+VPN = ["VPN tunnel drops INC0012", "vpn globalprotect tunnel down", "Please help: VPN tunnel keeps dropping"]
+
+def test_key_ignores_order_numbers_and_case():
+    again = ["vpn tunnel drops INC0099", "please help: vpn TUNNEL keeps dropping", "VPN globalprotect tunnel down"]
+    assert cluster_key(VPN, "m", "v1") == cluster_key(again, "m", "v1")
+    assert cluster_key(VPN, "m", "v1") != cluster_key(VPN, "m", "v2")
+    assert cluster_key(VPN, "m", "v1") != cluster_key(VPN, "other-model", "v1")
+    assert cluster_key(VPN, "m", "v1") != cluster_key(["outlook mailbox full"], "m", "v1")
+
+def test_ttl_eviction_and_counters(tmp_path):
+    c = LabelCache(str(tmp_path / "labels.sqlite"), ttl_days=1, max_entries=2)
+    c.put("a", "VPN Access", "r", "openai")
+    assert c.get("a") == ("VPN Access", "r", "openai") and c.get("zz") is None
+    c.put("b", "B", "", "gemini")
+    time.sleep(0.01)
+    c.get("a")                      # a is now more recently used than b
+    c.put("c", "C", "", "gemini")   # over max_entries: b goes
+    assert c.get("b") is None and c.get("a") and c.get("c")
+    c.ttl = 0
+    assert c.get("a") is None
+    s = c.stats()
+    assert (s["hits"], s["misses"], s["entries"]) == (4, 3, 1)
+    # persisted across instances
+    assert LabelCache(str(tmp_path / "labels.sqlite")).get("c") == ("C", "", "gemini")
+
+def test_repeat_run_labels_from_cache(tmp_path):
+    cache = LabelCache(str(tmp_path / "labels.sqlite"))
+    clusters = {i: [f"{w} problem {i}", f"{w} broken"] for i, w in enumerate(["vpn", "outlook", "printer"])}
+    with FakeProvider() as fp:
+        first = label_clusters(clusters, providers=[OpenAIProvider(api_key="t", base_url=fp.url + "/v1")], cache=cache)
+        second = label_clusters({k + 10: v for k, v in clusters.items()},
+                                providers=[OpenAIProvider(api_key="t", base_url=fp.url + "/v1")], cache=cache)
+    assert fp.requests == 3
+    assert [second[k + 10] for k in clusters] == [first[k] for k in clusters]
+
+def test_bridge_uses_cache(tmp_path, monkeypatch):
+    calls = []
+    monkeypatch.setattr(llm_bridge, "_try_gemini", lambda texts, model: calls.append(1) or ("VPN Access", "why"))
+    cache = LabelCache(str(tmp_path / "labels.sqlite"))
+    for _ in range(3):
+        assert llm_bridge.best_label_for_cluster(VPN, provider="gemini", cache=cache) == ("VPN Access", "why", "gemini")
+    assert len(calls) == 1 and cache.stats()["hits"] == 2
+
+def test_bridge_sends_the_service_prompt(monkeypatch):
+    from types import SimpleNamespace
+    from analytics.label_service import SYSTEM, single_prompt
+    sent = []
+
+    def create(**kw):
+        sent.append(kw["messages"])
+        msg = SimpleNamespace(content='```json\n{"title": "VPN Access", "rationale": "why"}\n```')
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setenv("OPENAI_API_KEY", "t")
+    monkeypatch.setattr(llm_bridge, "_openai_client", lambda key: client)
+    assert llm_bridge._try_openai(VPN, "m") == ("VPN Access", "why")
+    assert sent == [[{"role": "system", "content": SYSTEM}, {"role": "user", "content": single_prompt(VPN)}]]
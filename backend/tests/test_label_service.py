@@ -0,0 +1,50 @@
+import sys, time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+sys.path.append(str(Path(__file__).resolve().parent))
+from analytics.label_service import GeminiProvider, OpenAIProvider, label_clusters
+from fake_provider import FakeProvider
+
+CLUSTERS = {i: [f"{w} ticket {i}" for _ in range(5)] for i, w in
+            enumerate(["vpn", "outlook", "printer", "teams", "laptop", "sap", "veeva", "mfa"] * 5)}
+
+def test_concurrent_labels_reuse_pool_and_respect_limit():
+    with FakeProvider(delay=0.1) as fp:
+        p = OpenAIProvider(api_key="test", base_url=fp.url + "/v1", concurrency=4, rate=1000)
+        t0 = time.perf_counter()
+        out = label_clusters(CLUSTERS, providers=[p])
+        elapsed = time.perf_counter() - t0
+    assert out[0] == ("Vpn Issues", "fake", "openai") and out[9][0] == "Outlook Issues"
+    assert fp.requests == 40 and fp.max_in_flight <= 4
+    assert elapsed < 40 * 0.1 / 2  # well below sequential
+
+def test_packing_and_gemini_rest():
+    with FakeProvider() as fp:
+        p = GeminiProvider(api_key="test", base_url=fp.url)
+        out = label_clusters(CLUSTERS, providers=[p], pack=10)
+    assert fp.requests == 4
+    assert {v[2] for v in out.values()} == {"gemini"} and out[2][0] == "Printer Issues"
+
+def test_retries_then_fallback():
+    with FakeProvider(fail_first=2, fail_status=429) as fp:
+        out = label_clusters({"a": ["vpn down"]}, providers=[OpenAIProvider(api_key="t", base_url=fp.url + "/v1")], backoff=0.01)
+    assert out["a"][2] == "openai" and fp.requests == 3
+    with FakeProvider(fail_first=100) as fp:
+        out = label_clusters({"a": ["vpn tunnel connect fails", "vpn globalprotect down"]},
+                             providers=[GeminiProvider(api_key="t", base_url=fp.url)], backoff=0.01)
+    assert out["a"] == ("VPN / Network Access", "Matched IT lexicon by keyword frequency.", "python")
+
+def test_timeout_falls_back_to_python():
+    with FakeProvider(hang=True) as fp:
+        p = OpenAIProvider(api_key="t", base_url=fp.url + "/v1", timeout=0.2)
+        t0 = time.perf_counter()
+        out = label_clusters({"a": ["printer toner empty", "printer jam"]}, providers=[p], retries=0)
+    assert out["a"][2] == "python" and time.perf_counter() - t0 < 5
+
+def test_token_bucket_limits_rate():
+    with FakeProvider() as fp:
+        p = OpenAIProvider(api_key="t", base_url=fp.url + "/v1", concurrency=2, rate=20)
+        t0 = time.perf_counter()
+        label_clusters({i: ["vpn"] for i in range(12)}, providers=[p])
+    assert time.perf_counter() - t0 >= (12 - 2) / 20 * 0.9
@@ -0,0 +1,54 @@
+import sys
+from pathlib import Path
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import cluster, textprep
+from analytics.model_registry import ModelRegistry
+
+TOPICS = ["vpn tunnel not connecting from home", "outlook mailbox full cannot send", "printer toner empty floor",
+          "teams meeting audio echo", "laptop battery not charging"]
+
+def _texts(n, topics=TOPICS):
+    return textprep.clean_series(pd.Series([f"{topics[i % len(topics)]} ref {i % 7}" for i in range(n)]))
+
+def test_model_persisted_and_reused(tmp_path, monkeypatch):
+    reg = ModelRegistry(root=str(tmp_path), drift_threshold=0.5)
+    labels, info = reg.cluster(_texts(200), tenant="acme", taxonomy_version="2", min_cluster_size=10)
+    assert info["refit"] and info["reason"] == "missing"
+    assert (tmp_path / "acme__tax-2.joblib").exists()
+
+    calls = []
+    monkeypatch.setattr(cluster, "run_clustering", lambda *a, **k: calls.append(1))
+    fresh = ModelRegistry(root=str(tmp_path), drift_threshold=0.5)  # loads from disk
+    again, info = fresh.cluster(_texts(200), tenant="acme", taxonomy_version="2")
+    assert not info["refit"] and not calls
+    assert (pd.Series(again).groupby(labels).nunique() == 1).all()
+
+def test_drift_and_schedule_trigger_refit(tmp_path):
+    reg = ModelRegistry(root=str(tmp_path), drift_threshold=0.2)
+    reg.cluster(_texts(200), min_cluster_size=10)
+    novel = _texts(200, ["sap gui transaction dump", "veeva vault document locked", "bitlocker recovery key prompt"])
+    _, info = reg.cluster(novel, min_cluster_size=10)
+    assert info["refit"] and info["reason"] == "drift"
+    reg.max_age = -1
+    _, info = reg.cluster(novel, min_cluster_size=10)
+    assert info["reason"] == "schedule"
+
+def test_iterative_other_reduction_with_registry(tmp_path):
+    df = pd.DataFrame({"text": [f"{TOPICS[i % 5]} {i % 3}" for i in range(150)], "driver": "Other"})
+    reg = ModelRegistry(root=str(tmp_path))
+    a = cluster.iterative_other_reduction(df, min_cluster_size=10, registry=reg)
+    b = cluster.iterative_other_reduction(df, min_cluster_size=10, registry=reg)
+    assert a["driver"].str.startswith("cluster_").all()
+    assert a["driver"].tolist() == b["driver"].tolist()
+
+def test_kmeans_baseline_from_member_distances():
+    import numpy as np
+    from analytics.model_registry import RADIUS_QUANTILE, ClusterModel
+    rnd = np.random.default_rng(0)
+    Xs = np.vstack([rnd.normal(0, 1, (100, 2)), rnd.normal(10, 1, (100, 2))])
+    labels = np.repeat([0, 1], 100)
+    m = ClusterModel.from_fit("t", "1", labels, "kmeans", {"Xs": Xs, "vec": None, "svd": None, "model": None})
+    d = np.linalg.norm(Xs - m.centroids[labels], axis=1)
+    assert m.baseline == (d > m.radius).mean() and abs(m.baseline - (1 - RADIUS_QUANTILE)) < 0.01
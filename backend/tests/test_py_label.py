@@ -0,0 +1,65 @@
+import random
+import sys
+from collections import Counter
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import py_label
+from analytics.py_label import CANON, STOPWORDS, python_label_for_cluster, python_labels, python_labels_for_clusters
+from analytics.textprep import clean_text
+
+def _reference(texts):
+    # the per-cluster labeler python_labels replaced (without the YAKE fallback)
+    texts = [t for t in texts if isinstance(t, str)]
+    cnt = Counter(t for s in texts for t in clean_text(s).split() if len(t) > 2 and t not in STOPWORDS)
+    best_label, best_score = None, 0
+    for label, keys in CANON.items():
+        score = sum(cnt[k] for k in keys if k in cnt)
+        score += sum(v for k, v in cnt.items() if any(k.startswith(p) for p in keys))
+        if score > best_score:
+            best_label, best_score = label, score
+    if best_label and best_score >= 2:
+        return best_label, "Matched IT lexicon by keyword frequency."
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    try:
+        vec = TfidfVectorizer(stop_words="english", ngram_range=(1, 2), max_features=1000)
+        sums = vec.fit_transform(texts).sum(axis=0).A1
+        top = [t for _, t in sorted(zip(sums, vec.get_feature_names_out()), reverse=True)[:4] if t not in STOPWORDS]
+    except ValueError:
+        top = []
+    return (" / ".join(top) if top else "Other").title(), "Auto-labeled by keyword salience."
+
+def _clusters(n, seed=5):
+    rnd = random.Random(seed)
+    it = "password passwords reset locked vpn connecting laptop printer toner sap gui teams license update".split()
+    other = [f"w{i}x" for i in range(150)]
+    return {i: [" ".join(rnd.choice(it if i % 4 == 0 else other) for _ in range(rnd.randint(1, 30)))
+                for _ in range(rnd.randint(1, 60))] for i in range(n)}
+
+def test_batch_matches_per_cluster_reference(monkeypatch):
+    monkeypatch.setattr(py_label, "_yake_keywords", lambda texts, topk=5: [])
+    clusters = _clusters(80)
+    clusters["empty"] = [None, "the the"]
+    labels = python_labels_for_clusters(clusters)
+    assert labels == {k: _reference(v) for k, v in clusters.items()}
+    assert {k: python_label_for_cluster(v) for k, v in clusters.items()} == labels
+
+def test_aligned_ids():
+    texts = ["Password reset please", "VPN not connecting", "locked out, reset password", "vpn tunnel down"]
+    ids = ["a", "b", "a", "b"]
+    assert python_labels(texts, ids) == {"a": ("Password Reset / Unlock", "Matched IT lexicon by keyword frequency."),
+                                         "b": ("VPN / Network Access", "Matched IT lexicon by keyword frequency.")}
+
+def test_prepared_clean_text_not_cleaned_again(monkeypatch):
+    texts = ["Password reset please", None, "locked out, reset password", "vpn tunnel down"]
+    ids = ["a", "a", "a", "b"]
+    clean = [clean_text(t) if t else "" for t in texts]
+    want = python_labels(texts, ids), python_label_for_cluster(texts[:3]), python_labels_for_clusters({"b": texts[3:]})
+    monkeypatch.setattr(py_label, "clean_series", lambda s: (_ for _ in ()).throw(AssertionError("cleaned again")))
+    assert python_labels(texts, ids, clean) == want[0]
+    assert python_label_for_cluster(texts[:3], clean[:3]) == want[1]
+    assert python_labels_for_clusters({"b": texts[3:]}, {"b": clean[3:]}) == want[2]
+
+def test_prefix_trie_counts_whole_and_partial_keys():
+    assert py_label._score_against_canon(["password", "passwords"]) == ("Password Reset / Unlock", 3)
+    assert py_label._score_against_canon(["zzz"]) == (None, 0)
@@ -36,3 +36,44 @@ def test_driver_kpis_missing_optional_columns():
         'Reopen_Rate_%': [0.0, 0.0]
     })
     pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False)
+
+def test_driver_kpis_categorical_and_object_flags():
+    df = pd.DataFrame({
+        'final_driver': pd.Categorical(['B', 'A', 'A', None]),
+        'aht_min': [5, 3, 4, None],
+        'sla_breached_bool': [True, None, False, True],
+        'reopen_count_num': ['1', None, '0', '2'],
+    })
+    result = driver_kpis(df).reset_index(drop=True)
+    expected = pd.DataFrame({
+        'driver': ['A', 'B', 'nan'],
+        'Tickets': [2, 1, 1],
+        'With_AHT': [2, 1, 0],
+        'Median_AHT': [3.5, 5.0, 0.0],
+        'SLA_Breach_%': [0.0, 100.0, 100.0],
+        'Reopen_Rate_%': [0.0, 100.0, 100.0]
+    })
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+def _kpis(n=12):
+    return pd.DataFrame({"driver": [f"Driver {i}" for i in range(n)], "Tickets": list(range(n, 0, -1)),
+                         "With_AHT": n, "Median_AHT": 6.0, "SLA_Breach_%": 0.0, "Reopen_Rate_%": 0.0})
+
+def test_summary_pdf_vector_charts_need_no_plotly(monkeypatch):
+    from analytics import report
+    monkeypatch.setattr(report, "_plot_top_bar", None)  # the vector path must not touch plotly
+    monkeypatch.setattr(report, "_plot_cost_value", None)
+    pdf = report.summary_pdf(_kpis(), 8.0, charts="vector")
+    assert pdf.startswith(b"%PDF") and b"/Subtype /Image" not in pdf
+
+def test_bar_drawing_shape():
+    from analytics.report import _bar_drawing
+    d = _bar_drawing(["A very long driver name indeed", "B"], [3, 1], "Title")
+    chart = [x for x in d.contents if type(x).__name__ == "VerticalBarChart"][0]
+    assert chart.data == [[3.0, 1.0]] and chart.categoryAxis.categoryNames == ["A very long drive…", "B"]
+
+def test_unknown_chart_engine():
+    import pytest
+    from analytics import report
+    with pytest.raises(ValueError):
+        report.summary_pdf(_kpis(), 8.0, charts="svg")
@@ -0,0 +1,55 @@
+import sys, random
+from pathlib import Path
+import pandas as pd
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics.rule_engine import RuleMatcher
+from analytics.tcd import derive_drivers, load_rules
+
+def _loop_label(texts, rules):
+    out = []
+    for t in texts:
+        hit = None
+        for rule in rules:
+            if any(k in t for k in rule["keywords"]):
+                hit = rule["name"]; break
+        out.append(hit or "Other")
+    return out
+
+RULES = [
+    {"name": "Status", "keywords": ["status", "check status", "eta"]},
+    {"name": "Check", "keywords": ["check", "check status update"]},
+    {"name": "Password", "keywords": ["password", "reset"]},
+    {"name": "Access", "keywords": ["access", "add to group", "reset"]},
+]
+
+@pytest.mark.parametrize("backend", ["python", "ahocorasick"])
+def test_first_rule_wins_matches_loop(backend):
+    if backend == "ahocorasick":
+        pytest.importorskip("ahocorasick")
+    texts = pd.Series([
+        "check status update please", "password reset", "add to group", "reset access",
+        "nothing here", "", "please check", "etas and status", "check status update",
+    ])
+    m = RuleMatcher(RULES, backend=backend)
+    assert m.label(texts).tolist() == _loop_label(texts, RULES)
+
+@pytest.mark.parametrize("backend", ["python", "ahocorasick"])
+def test_random_corpus_matches_loop(backend):
+    if backend == "ahocorasick":
+        pytest.importorskip("ahocorasick")
+    rnd = random.Random(7)
+    vocab = [f"w{i}" for i in range(60)] + ["ab", "abc", "bc", "c"]
+    rules = [{"name": f"R{i}", "keywords": [" ".join(rnd.sample(vocab, rnd.randint(1, 2))) for _ in range(3)]}
+             for i in range(40)]
+    texts = pd.Series([" ".join(rnd.choices(vocab, k=8)) for _ in range(500)])
+    assert RuleMatcher(rules, backend=backend).label(texts).tolist() == _loop_label(texts, rules)
+
+def test_derive_drivers_uses_repo_rules():
+    rules = load_rules(str(Path(__file__).resolve().parents[1] / "analytics" / "rules.yaml"))
+    df = pd.DataFrame({"short_description": ["Password reset needed", "Check status on request", "printer jam"],
+                       "description": ["", "", None]})
+    out, counts = derive_drivers(df, rules)
+    assert out["driver"].tolist() == ["Password Reset / Unlock", "Status Checks", "Other"]
+    assert counts["tickets"].sum() == 3
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+import numpy as np, pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import cluster
+from analytics.sampling import cluster_examples, joined_prefix, pick_examples, representatives, spread_examples
+
+def test_mmr_prefers_central_but_skips_duplicates():
+    rnd = np.random.default_rng(0)
+    core = np.tile([1.0, 0.0, 0.0], (20, 1))               # 20 identical central tickets
+    spread = np.array([1.0, 0.0, 0.0]) + rnd.normal(0, 0.4, (30, 3))
+    far = np.array([[0.0, 0.0, 1.0]] * 3)
+    Xs = np.vstack([core, spread, far, [[0.0, 1.0, 0.0]]])
+    labels = np.array([0] * 53 + [-1])
+    reps = representatives(Xs, labels, k=6)
+    assert set(reps) == {0}
+    picked = reps[0]
+    U = Xs[:53] / np.linalg.norm(Xs[:53], axis=1, keepdims=True)
+    centroid = U.mean(axis=0)
+    assert picked[0] == int(np.argmax(U @ centroid))      # most central first
+    assert sum(p < 20 for p in picked) <= 1               # duplicates add nothing
+    assert len(set(map(tuple, Xs[picked].round(6)))) == 6
+    assert not (picked >= 50).any()                       # far-away members never make the candidate pool
+    assert np.array_equal(representatives(Xs, labels, k=6)[0], picked)
+
+def test_duplicates_filling_the_pool_widen_it():
+    # 500 identical central rows would fill a 12-row pool; the 5 distinct ones still get in
+    Xs = np.vstack([np.tile([1.0, 0.0], (500, 1)), [[1.0, 0.1], [1.0, 0.2], [1.0, 0.3], [1.0, -0.1], [1.0, -0.2]]])
+    picked = representatives(Xs, np.zeros(505, dtype=int), k=6, pool=2)[0]
+    assert sorted(picked) == [0, 500, 501, 502, 503, 504]
+
+def test_small_clusters_and_texts():
+    Xs = np.eye(4)
+    labels = np.array([3, 3, 7, -1])
+    reps = representatives(Xs, labels, k=12)
+    assert sorted(reps) == [3, 7] and sorted(reps[3]) == [0, 1] and list(reps[7]) == [2]
+    ex = cluster_examples(pd.Series(["a", "b", "c", "d"], index=[10, 11, 12, 13]), Xs, labels)
+    assert sorted(ex[3]) == ["a", "b"] and ex[7] == ["c"]
+
+def test_examples_from_other_reduction():
+    topics = ["vpn tunnel not connecting from home", "outlook mailbox full cannot send",
+              "printer toner empty third floor"]
+    df = pd.DataFrame({"text": [f"{topics[i % 3]} case {i % 17}" for i in range(300)], "driver": "Other"})
+    examples = {}
+    out = cluster.iterative_other_reduction(df, min_cluster_size=20, max_rounds=1, examples=examples, examples_k=5)
+    assert examples and set(examples) == set(d for d in out["driver"].unique() if d.startswith("cluster_"))
+    for driver, idx in examples.items():
+        assert 0 < len(idx) <= 5 and (out.loc[idx, "driver"] == driver).all()
+
+def test_prompt_helpers_stop_early():
+    texts = ["", "  ", None, "x" * 300] + [f"t{i}" for i in range(100)]
+    assert pick_examples(texts, 3) == ["x" * 280, "t0", "t1"]
+    members = [f"t{i}" for i in range(100)] + [" "]
+    assert spread_examples(members, 3) == ["t0", "t50", "t99"] == spread_examples(members, 3)
+    assert spread_examples(members[:2], 3) == ["t0", "t1"]
+    parts = [f"ticket {i}" for i in range(10000)]
+    assert joined_prefix(parts, 5000) == " ".join(parts)[:5000]
+    assert joined_prefix(["a", "b"], 5000) == "a b"
@@ -0,0 +1,63 @@
+import random
+import re
+import sys
+from pathlib import Path
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import config_cache
+from analytics.taxonomy import (ACCESS_PROV_PATTERNS, GENERIC_WEAK, NETWORK_AP_PATTERNS, TaxEntry, TaxonomyIndex,
+                                compile_taxonomy, load_taxonomy, match_taxonomy)
+
+def _reference(text, entries):
+    # the per-synonym scan TaxonomyIndex replaced
+    t = (text or "").lower()
+    scores = {e.name: 0 for e in entries}
+    for e in entries:
+        for syn in e.synonyms:
+            if " " in syn:
+                scores[e.name] += 3 if syn in t else 0
+            elif re.search(r"\b" + re.escape(syn) + r"\b", t):
+                scores[e.name] += 1 if syn not in GENERIC_WEAK else 0.25
+    if any(re.search(p, t) for p in NETWORK_AP_PATTERNS):
+        for name in scores:
+            if "Network Hardware" in name or "Interface" in name:
+                scores[name] += 5
+            if "Access Provisioning" in name:
+                scores[name] -= 2
+    if any(re.search(p, t) for p in ACCESS_PROV_PATTERNS):
+        for name in scores:
+            if "Access Provisioning" in name:
+                scores[name] += 4
+    best = max(scores.items(), key=lambda kv: kv[1]) if scores else ("Other", 0.0)
+    return (best[0], float(best[1]))
+
+ENTRIES = load_taxonomy(config_cache.TAXONOMY_PATH) + [
+    TaxEntry("Odd / Interface", ["sign-in", "c++", "-x", "", "access", "access", "thin", "th", "é-mail"]),
+    TaxEntry("Password Reset / Unlock", ["port", "port down", "port down now", "wn n"]),
+]
+VOCAB = ("password reset vpn access point ap thin ap sign-in sign in c++ c -x é-mail email teams chat port down "
+         "now wn n update status add to group request access gigabitethernet within apple - . , 2fa ACCESS").split()
+
+def _texts(n, seed=7):
+    rnd = random.Random(seed)
+    return ["".join(rnd.choice(VOCAB) + rnd.choice([" ", "", "-", "."]) for _ in range(rnd.randint(0, 20)))
+            for _ in range(n)] + ["", None]
+
+def test_index_scores_match_reference():
+    for entries in (ENTRIES, ENTRIES[:-2], []):
+        idx = TaxonomyIndex(entries)
+        for t in _texts(3000):
+            assert idx.match(t) == _reference(t, entries), t
+
+def test_match_series_and_compat_entry_point():
+    texts = pd.Series(_texts(300), index=range(100, 402))
+    out = TaxonomyIndex(ENTRIES).match_series(texts)
+    assert list(out.columns) == ["label", "score"] and out.index.equals(texts.index)
+    assert list(zip(out["label"], out["score"])) == [_reference(t, ENTRIES) for t in texts]
+    assert match_taxonomy("VPN via GlobalProtect", ENTRIES) == ("VPN / Network Access", 2.0)
+    assert compile_taxonomy(ENTRIES) is compile_taxonomy(ENTRIES)
+    assert compile_taxonomy(list(ENTRIES)) is not compile_taxonomy(ENTRIES)
+
+def test_index_cached_per_file():
+    assert config_cache.get_taxonomy_index() is config_cache.get_taxonomy_index()
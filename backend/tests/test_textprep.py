@@ -0,0 +1,28 @@
+import sys
+from pathlib import Path
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import textprep
+from analytics.tcd import derive_drivers
+
+def test_clean_series_matches_scalar_clean():
+    raw = pd.Series(["VPN  down!!_x000D_again", None, "Outlook: can't send", "VPN  down!!_x000D_again", "  "])
+    out = textprep.clean_series(raw)
+    assert out.tolist() == [textprep.clean_text(v if v is not None else "") for v in raw]
+    assert out.iloc[0] == "vpn down again"
+    assert out.index.equals(raw.index)
+
+def test_prepare_text_adds_column_once():
+    df = pd.DataFrame({"short_description": ["Password reset", "Teams audio"], "description": [None, "no sound"]})
+    textprep.prepare_text(df)
+    assert df[textprep.CLEAN_COL].tolist() == ["password reset", "teams audio no sound"]
+    df[textprep.CLEAN_COL] = ["printer", "printer"]
+    textprep.prepare_text(df)
+    assert df[textprep.CLEAN_COL].tolist() == ["printer", "printer"]
+
+def test_derive_drivers_reuses_clean_column():
+    rules = [{"name": "Print", "keywords": ["printer"]}]
+    df = pd.DataFrame({"short_description": ["vpn", "vpn"], textprep.CLEAN_COL: ["printer jam", "vpn"]})
+    out, _ = derive_drivers(df, rules)
+    assert out["driver"].tolist() == ["Print", "Other"]
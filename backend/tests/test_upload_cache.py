@@ -0,0 +1,63 @@
+import sys
+from pathlib import Path
+import pandas as pd
+from fastapi.testclient import TestClient
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import upload_cache
+from main import app
+
+CSV = "short_description,created\nPassword reset,2024-01-05\nVPN down,2024-01-06\n"
+
+def test_analysis_id_reused_by_exports():
+    upload_cache.cache.clear()
+    client = TestClient(app)
+    r1 = client.post("/api/analyze", files={"file": ("t.csv", CSV, "text/csv")})
+    aid = r1.json()["analysisId"]
+    misses = upload_cache.cache.misses
+    r2 = client.post("/api/analyze", files={"file": ("again.csv", CSV, "text/csv")})
+    assert r2.json() == r1.json() and upload_cache.cache.misses == misses
+    r3 = client.post("/api/analyze", data={"analysis_id": aid})
+    assert r3.json() == r1.json()
+    x = client.post("/api/export/xlsx", data={"analysis_id": aid})
+    assert x.status_code == 200 and x.content[:2] == b"PK"
+
+def test_unknown_analysis_id():
+    r = TestClient(app).post("/api/export/xlsx", data={"analysis_id": "nope"})
+    assert r.status_code == 404
+
+def test_lru_eviction_by_bytes():
+    c = upload_cache.AnalysisCache(max_mb=1)
+    big = pd.DataFrame({"x": range(60_000)})  # ~0.46 MB
+    for k in "abc":
+        c.put(upload_cache.Analysis(k, {}, pd.DataFrame(), big))
+    assert c.get("a") is None and c.get("c") is not None
+    assert c.nbytes <= c.max_bytes
+    huge = pd.DataFrame({"x": range(200_000)})
+    kept = c.put(upload_cache.Analysis("h", {"n": 1}, pd.DataFrame(), huge))
+    assert kept.df is None and c.get("h").payload == {"n": 1}
+
+def test_pdf_export_from_analysis_id():
+    client = TestClient(app)
+    aid = client.post("/api/analyze", files={"file": ("t.csv", CSV, "text/csv")}).json()["analysisId"]
+    r = client.post("/api/export/pdf", data={"analysis_id": aid})
+    assert r.status_code == 200 and r.content[:5] == b"%PDF-"
+
+def test_rules_change_relabels_cached_upload(tmp_path, monkeypatch):
+    import os, time
+    from analytics import config_cache
+    p = tmp_path / "rules.yaml"
+    p.write_text("rules:\n  - name: VPN\n    keywords: [vpn]\n")
+    get_rules, get_digest = config_cache.get_rules, config_cache.get_rules_digest
+    monkeypatch.setattr(config_cache, "get_rules", lambda path=str(p): get_rules(path))
+    monkeypatch.setattr(config_cache, "get_rules_digest", lambda path=str(p): get_digest(path))
+    client = TestClient(app)
+    csv = "short_description,created\nPrinter jam,2024-01-05\nVPN down,2024-01-06\n"
+    drivers = lambda r: {c["Driver"] for c in r.json()["categories"]}
+    r1 = client.post("/api/analyze", files={"file": ("t.csv", csv, "text/csv")})
+    assert "Printer" not in drivers(r1)
+    p.write_text("rules:\n  - name: VPN\n    keywords: [vpn]\n  - name: Printer\n    keywords: [printer]\n")
+    os.utime(p, ns=(time.time_ns(), time.time_ns() + 10**9))
+    r2 = client.post("/api/analyze", files={"file": ("t.csv", csv, "text/csv")})
+    assert r2.json()["analysisId"] != r1.json()["analysisId"] and "Printer" in drivers(r2)
+    assert client.post("/api/analyze", data={"analysis_id": r1.json()["analysisId"]}).json() == r1.json()
@@ -0,0 +1,43 @@
+import sys
+from pathlib import Path
+import numpy as np, pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics.validator import validate_and_normalize
+
+def _inputs():
+    inc = pd.DataFrame({"Title": ["Password reset", None, 3], "description": [None, "vpn drops", "x"],
+                        "opened_at": ["2024-01-05 10:00:00", "2024-01-06 11:00:00", None],
+                        "u_aht_minutes": ["5", None, "x"], "sla_breached": ["Yes", " no ", None]})
+    req = pd.DataFrame({"short_description": ["Need laptop"], "opened_dt": ["01/05/2024 09:00:00"],
+                        "resolved_dt": ["01/05/2024 12:00:00"], "sla_breached": [False]})
+    return inc, req
+
+def test_normalizes_without_touching_inputs():
+    inc, req = _inputs()
+    before = inc.copy(), req.copy()
+    df, notes = validate_and_normalize(inc, req, mapping={"short_description": "Title"})
+    assert inc.equals(before[0]) and req.equals(before[1]) and "Title" in inc.columns
+    assert list(df.index) == [0, 1, 2, 3]
+    assert df["source"].dtype == "category" and df["source"].tolist() == ["INC", "INC", "INC", "REQ"]
+    assert df["text"].tolist() == ["Password reset ", " vpn drops", "3 x", "Need laptop "]
+    assert df["sla_breached_bool"].dtype == "boolean"
+    assert df["sla_breached_bool"].tolist() == [True, False, pd.NA, False]
+    assert df["opened_dt"].tolist()[:2] == [pd.Timestamp("2024-01-05 10:00"), pd.Timestamp("2024-01-06 11:00")]
+    assert np.allclose(df["aht_min"].to_numpy(dtype=float), [5, np.nan, np.nan, 180], equal_nan=True)
+    assert notes["rows"] == 4 and notes["empty_text_pct"] == 0.0 and notes["peak_mb"] < 5
+
+def test_peak_measures_this_call():
+    spike = np.ones(40 << 20, dtype=np.uint8)  # an earlier 40 MB high-water mark is not reported
+    del spike
+    inc, req = _inputs()
+    assert validate_and_normalize(inc, req)[1]["peak_mb"] < 5
+    big = pd.concat([inc] * 20000, ignore_index=True)
+    assert validate_and_normalize(big, None)[1]["peak_mb"] > 1
+
+def test_one_side_missing():
+    inc, _ = _inputs()
+    df, notes = validate_and_normalize(inc, None)
+    assert len(df) == 3 and set(df["source"]) == {"INC"} and df["short_description"].tolist()[0] == ""
+    df, notes = validate_and_normalize(None, None)
+    assert len(df) == 0 and notes["rows"] == 0
@@ -0,0 +1,53 @@
+import os
+import sys
+from io import BytesIO
+from pathlib import Path
+import pandas as pd
+from openpyxl import load_workbook
+
+# add backend module to path for imports
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from analytics import xlsx_export
+
+def _frame(n):
+    return pd.DataFrame({
+        "number": [f"INC{i:05d}" for i in range(n)],
+        "driver": ["VPN" if i % 3 else "Password Reset" for i in range(n)],
+        "opened_dt": pd.to_datetime(["2024-01-05 10:30", None, "2024-02-10 08:00"] * (n // 3) +
+                                    ["2024-03-01 00:00"] * (n % 3)).tz_localize("UTC"),
+        "aht_min": [1.5, None, 3.0] * (n // 3) + [2.0] * (n % 3),
+    })
+
+def _sheet(wb, name):
+    return [list(r) for r in wb[name].iter_rows(values_only=True)]
+
+def test_constant_memory_matches_in_memory(tmp_path):
+    df = _frame(30)
+    legacy = load_workbook(BytesIO(xlsx_export.build_processed_workbook(df)))
+    path = str(tmp_path / "out.xlsx")
+    xlsx_export.write_processed_workbook(df, path, constant_memory=True)
+    streamed = load_workbook(path)
+    assert streamed.sheetnames == legacy.sheetnames == ["Data", "Summary_Drivers", "Summary_Driver_Month", "Summary"]
+    for name in streamed.sheetnames[:3]:
+        assert _sheet(streamed, name) == _sheet(legacy, name)
+    data = _sheet(streamed, "Data")
+    assert data[0] == ["number", "driver", "opened_dt", "aht_min", "Final Driver", "_month"]
+    assert data[1][2].isoformat() == "2024-01-05T10:30:00" and data[1][5] == "2024-01"
+    assert data[2][2] is None and data[2][3] is None and data[2][5] == "Unknown"
+
+def test_data_sheet_splits_at_row_limit(tmp_path):
+    df = _frame(25)
+    path = str(tmp_path / "out.xlsx")
+    xlsx_export.write_processed_workbook(df, path, constant_memory=True, max_rows=11)
+    wb = load_workbook(path)
+    assert wb.sheetnames[:3] == ["Data", "Data_2", "Data_3"]
+    parts = [_sheet(wb, n) for n in ("Data", "Data_2", "Data_3")]
+    assert [len(p) for p in parts] == [11, 11, 6]
+    assert all(p[0][0] == "number" for p in parts)
+    assert [r[0] for p in parts for r in p[1:]] == df["number"].tolist()
+    assert _sheet(wb, "Summary_Drivers")[1:] == [["VPN", 16], ["Password Reset", 9]]
+
+def test_temp_file_is_streamed_and_removed():
+    path = xlsx_export.build_processed_workbook_file(_frame(6))
+    body = b"".join(xlsx_export.iter_file(path, chunk_size=512))
+    assert body[:2] == b"PK" and not os.path.exists(path)